@@ -0,0 +1,118 @@
+"""Benchmark: CPU por GB servido, copia en Python vs sendfile.
+
+Sirve el mismo archivo por una conexión TCP local (localhost) con tres
+métodos y mide el tiempo de CPU del proceso (usuario + sistema, todos los
+hilos):
+
+- ``read8k``:   el bucle anterior (f.read(8192) -> wfile.write)
+- ``buffered``: common.http_files.copy_range (buffer de 1 MiB reusado)
+- ``sendfile``: common.http_files.transmit (socket.sendfile)
+
+El lector corre en un proceso aparte para que su CPU no se cuente.
+
+Uso:
+    python benchmarks/bench_sendfile.py [--size-mb 512] [--rounds 3]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from common.http_files import USE_SENDFILE, copy_range, transmit  # noqa: E402
+
+# Lector externo: consume todo lo que llega y termina.
+_READER = (
+    "import socket, sys\n"
+    "s = socket.create_connection(('127.0.0.1', int(sys.argv[1])))\n"
+    "buf = bytearray(1 << 20)\n"
+    "while s.recv_into(buf):\n"
+    "    pass\n"
+)
+
+
+class _Handler:
+    """Lo mínimo de un BaseHTTPRequestHandler que usa transmit()."""
+
+    def __init__(self, conn):
+        self.connection = conn
+        self.wfile = conn.makefile('wb', buffering=0)
+
+
+def _read8k(handler, f, size):
+    f.seek(0)
+    while True:
+        chunk = f.read(8192)
+        if not chunk:
+            break
+        handler.wfile.write(chunk)
+
+
+def _buffered(handler, f, size):
+    copy_range(f, handler.wfile, 0, size)
+
+
+def _sendfile(handler, f, size):
+    transmit(handler, f, 0, size)
+
+
+def _serve_once(method, path, size):
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    port = listener.getsockname()[1]
+    reader = subprocess.Popen([sys.executable, '-c', _READER, str(port)])
+    conn, _ = listener.accept()
+    handler = _Handler(conn)
+    with open(path, 'rb') as f:
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        method(handler, f, size)
+        cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    handler.wfile.close()
+    conn.close()
+    listener.close()
+    reader.wait()
+    return cpu, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=512)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    fd, path = tempfile.mkstemp(suffix='.bin')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(args.size_mb):
+                f.write(block)
+
+        methods = [('read8k', _read8k), ('buffered', _buffered)]
+        if USE_SENDFILE:
+            methods.append(('sendfile', _sendfile))
+        else:
+            print('os.sendfile no disponible: se omite el método sendfile')
+
+        gb = size / (1024 ** 3)
+        print(f'{args.size_mb} MB x {args.rounds} rondas')
+        print(f"{'método':<10} {'CPU s/GB':>10} {'GB/s':>8}")
+        for name, method in methods:
+            cpu = wall = 0.0
+            for _ in range(args.rounds):
+                c, w = _serve_once(method, path, size)
+                cpu += c
+                wall += w
+            print(f'{name:<10} {cpu / (gb * args.rounds):>10.3f} {gb * args.rounds / wall:>8.2f}')
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
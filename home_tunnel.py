@@ -10,6 +10,12 @@ Corre en TU PC (IP residencial). Flujo:
   3. La re-registra cada 2 min (heartbeat), por si Railway reinicia.
   4. Si cloudflared se cae, lo reinicia y actualiza la URL.
 
+Modo pull (`python home_tunnel.py --pull` o HOME_PULL=1): sin túnel. La PC
+hace long-poll a Railway (POST /api/worker/claim), se lleva los trabajos
+pendientes (varios por ida y vuelta), los resuelve contra la app local y
+devuelve los resultados (POST /api/worker/result). No hay URL pública que
+cambie ni salto entrante por Cloudflare.
+
 Requisitos: la app local ya escuchando en el puerto, y estas variables
 (por entorno o editando los defaults de abajo):
   ADMIN_SECRET  -> la misma clave del panel admin de Railway
@@ -21,7 +27,9 @@ import re
 import sys
 import time
 import shutil
+import socket
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
@@ -29,6 +37,13 @@ LOCAL_PORT = int(os.environ.get('PORT', '8000'))
 RAILWAY_URL = os.environ.get('RAILWAY_URL', 'https://redes-download.up.railway.app')
 ADMIN_SECRET = os.environ.get('ADMIN_SECRET', '')
 HEARTBEAT_SECONDS = 120
+PULL_MODE = os.environ.get('HOME_PULL', '0') == '1' or '--pull' in sys.argv
+PULL_WAIT = 25               # segundos de cada long-poll a Railway
+PULL_HEARTBEAT = 10          # con todos los slots ocupados: latido (max=0) cada tanto
+WORKER_CONCURRENCY = int(os.environ.get('WORKER_CONCURRENCY', '3'))
+# Un nombre por proceso: si el worker se reinicia, Railway no confunde al
+# nuevo con el viejo y re-encola lo que el viejo dejó colgado.
+WORKER_NAME = f"{os.environ.get('WORKER_NAME') or socket.gethostname()}-{os.getpid()}"
 _URL_RE = re.compile(r'https://[a-z0-9-]+\.trycloudflare\.com')
 
 
@@ -125,6 +140,69 @@ def _wait_for_url(proc, seconds=40):
     return False
 
 
+def run_pull():
+    """Worker residencial en modo pull: reclama trabajos de Railway con
+    long-poll y los resuelve contra la app local, hasta WORKER_CONCURRENCY a
+    la vez."""
+    base = RAILWAY_URL.rstrip('/')
+    railway = requests.Session()   # keep-alive hacia Railway
+    local = requests.Session()
+    pool = ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY)
+    busy = {'n': 0}
+    slot_freed = threading.Event()
+
+    def run_job(job):
+        try:
+            r = local.post(f"http://localhost:{LOCAL_PORT}{job['path']}", json=job['payload'],
+                           headers={'X-No-Forward': '1'}, timeout=120)
+            result = r.json()
+        except Exception as e:
+            # Sin frases de "login": el front no debe abrir el modal de cookies.
+            result = {'success': False, 'error': f'El backend residencial no pudo procesarlo: {e}'}
+        try:
+            railway.post(base + '/api/worker/result', timeout=20, json={
+                'secret': ADMIN_SECRET, 'results': [{'id': job['id'], 'result': result}],
+            })
+        except Exception as e:
+            print(f"[!] No se pudo devolver el resultado a Railway: {e}")
+        finally:
+            with _state_lock:
+                busy['n'] -= 1
+            slot_freed.set()
+
+    print(f"Modo pull: pidiendo trabajos a {base} como '{WORKER_NAME}'. (Ctrl+C para cortar)\n")
+    while True:
+        with _state_lock:
+            free = WORKER_CONCURRENCY - busy['n']
+            slot_freed.clear()
+        wait = PULL_WAIT
+        if free <= 0:
+            # Todo ocupado (un Threads puede tardar más de un minuto): no
+            # pedir trabajos pero seguir latiendo, si no Railway da al worker
+            # por caído y re-encola lo que está resolviendo.
+            slot_freed.wait(PULL_HEARTBEAT)
+            with _state_lock:
+                free = max(WORKER_CONCURRENCY - busy['n'], 0)
+            wait = PULL_WAIT if free else 0
+        try:
+            r = railway.post(base + '/api/worker/claim', timeout=PULL_WAIT + 15, json={
+                'secret': ADMIN_SECRET, 'worker': WORKER_NAME, 'max': free, 'wait': wait,
+            })
+            if r.status_code == 403:
+                print("[X] Railway rechazó la clave (ADMIN_SECRET).")
+                return
+            jobs = r.json().get('jobs', [])
+        except Exception as e:
+            print(f"[!] No se pudo pedir trabajos a Railway: {e}")
+            time.sleep(5)
+            continue
+        for job in jobs:
+            print(f"-> Trabajo {job['id'][:8]}: {job['payload'].get('url', '')}")
+            with _state_lock:
+                busy['n'] += 1
+            pool.submit(run_job, job)
+
+
 def main():
     secret = ADMIN_SECRET or input("Clave admin (ADMIN_SECRET): ").strip()
     globals()['ADMIN_SECRET'] = secret
@@ -137,6 +215,18 @@ def main():
     except Exception:
         pass
 
+    if PULL_MODE:
+        try:
+            run_pull()
+        except KeyboardInterrupt:
+            print("\nCortando worker...")
+        finally:
+            try:
+                os.remove(_PID_FILE)
+            except Exception:
+                pass
+        return
+
     cloudflared = _find_cloudflared()
     proc = _launch_cloudflared(cloudflared)
     if not _wait_for_url(proc):
@@ -0,0 +1,284 @@
+"""Front-end HTTP asyncio con keep-alive (HTTP/1.1) y concurrencia acotada.
+
+El ThreadedHTTPServer abre un hilo del SO por conexión y habla HTTP/1.0, así
+que cada poll de /api/download_status es una conexión + un hilo nuevos. Este
+front-end alternativo (SERVER_MODE=async) atiende miles de conexiones ociosas
+o de polling en un solo event loop:
+
+- Keep-alive y pipelining HTTP/1.1: los pedidos de una conexión se leen del
+  buffer y se responden en orden.
+- Tope de conexiones simultáneas (ASYNC_MAX_CONNECTIONS): por encima se
+  responde 503 en vez de aceptar sin límite.
+- Las rutas NO cambian: cada pedido se despacha al mismo
+  VideoDownloaderHandler. Las rutas livianas (estado de tareas) corren en el
+  loop; el resto (extracción, descargas, archivos) en un pool de hilos
+  acotado (ASYNC_WORKERS), escribiendo la respuesta al socket con
+  backpressure.
+- Los streams largos (SSE de progreso) tienen su propio pool
+  (ASYNC_STREAM_WORKERS): un stream abierto ocupa su hilo toda la descarga y
+  no debe quitarle hilos a /api/extract ni a los estáticos. Con el pool lleno
+  se responde 503 y el front cae a polling.
+"""
+
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', '2048'))
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', '32'))
+ASYNC_STREAM_WORKERS = int(os.environ.get('ASYNC_STREAM_WORKERS', '64'))
+# Segundos que una conexión keep-alive puede quedar ociosa entre pedidos.
+KEEPALIVE_TIMEOUT = 75
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+def _simple_response(status, reason):
+    body = f'{status} {reason}\n'.encode('utf-8')
+    return (f'HTTP/1.1 {status} {reason}\r\n'
+            f'Content-Type: text/plain; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n').encode('latin-1') + body
+
+
+def _parse_head(head):
+    """Devuelve (método, path, headers en minúscula) de la cabecera cruda."""
+    lines = head.decode('latin-1').split('\r\n')
+    parts = lines[0].split()
+    method, path = (parts[0], parts[1]) if len(parts) >= 2 else ('', '')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return method, path, headers
+
+
+class _TransportWriter(io.RawIOBase):
+    """wfile del handler: escribe en el StreamWriter del loop.
+
+    Desde un hilo del pool espera el drain (backpressure: un archivo grande no
+    se acumula en memoria). Desde el propio loop (rutas livianas) solo encola;
+    el drain se hace al terminar el pedido.
+    """
+
+    def __init__(self, writer, loop):
+        super().__init__()
+        self._writer = writer
+        self._loop = loop
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if not data:
+            return 0
+        data = bytes(data)
+        if self._writer.is_closing():
+            raise ConnectionResetError('Conexión cerrada por el cliente')
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._writer.write(data)
+        else:
+            asyncio.run_coroutine_threadsafe(self._write(data), self._loop).result()
+        return len(data)
+
+    async def _write(self, data):
+        self._writer.write(data)
+        await self._writer.drain()
+
+    def sendfile(self, src, offset, count):
+        """Envía parte de un archivo con loop.sendfile (sendfile del kernel o
+        copia en el loop si el transporte no lo soporta). Solo desde hilos del
+        pool, nunca desde el loop."""
+        if self._writer.is_closing():
+            raise ConnectionResetError('Conexión cerrada por el cliente')
+        future = asyncio.run_coroutine_threadsafe(
+            self._loop.sendfile(self._writer.transport, src, offset, count), self._loop)
+        future.result()
+
+    @property
+    def closed(self):
+        return self._writer.is_closing()
+
+
+def _bridge_handler(handler_cls):
+    """Subclase del handler que lee un pedido ya bufferizado y escribe en el
+    transporte asyncio, hablando HTTP/1.1."""
+
+    class _AsyncBridgeHandler(handler_cls):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            self.rfile, self.wfile = self.request
+            self.connection = None
+            self._framed = False
+            self._status = None
+
+        def handle(self):
+            self.close_connection = True
+            self.handle_one_request()
+
+        def finish(self):
+            pass
+
+        def send_response_only(self, code, message=None):
+            self._status = code
+            super().send_response_only(code, message)
+
+        def send_header(self, keyword, value):
+            if keyword.lower() in ('content-length', 'transfer-encoding'):
+                self._framed = True
+            super().send_header(keyword, value)
+
+        def end_headers(self):
+            # Sin largo ni chunked, el fin del cuerpo solo se puede marcar
+            # cerrando la conexión.
+            if (not self._framed and self.command != 'HEAD'
+                    and self._status not in (204, 304)):
+                super().send_header('Connection', 'close')
+            super().end_headers()
+
+    _AsyncBridgeHandler.__name__ = f'Async{handler_cls.__name__}'
+    return _AsyncBridgeHandler
+
+
+class AsyncHTTPServer:
+    """Misma interfaz que ThreadedHTTPServer (serve_forever/server_close)."""
+
+    def __init__(self, server_address, handler_cls, inline_paths=(), stream_paths=(),
+                 max_connections=ASYNC_MAX_CONNECTIONS, workers=ASYNC_WORKERS,
+                 stream_workers=ASYNC_STREAM_WORKERS):
+        self.server_address = server_address
+        self.handler_cls = _bridge_handler(handler_cls)
+        self.inline_paths = frozenset(inline_paths)
+        self.stream_paths = frozenset(stream_paths)
+        self.max_connections = max_connections
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='http-worker')
+        self.max_streams = max(stream_workers, 1)
+        self.stream_executor = ThreadPoolExecutor(max_workers=self.max_streams,
+                                                  thread_name_prefix='http-stream')
+        self.active_connections = 0
+        self.rejected_connections = 0
+        self.active_streams = 0
+        self.rejected_streams = 0
+        self.requests = 0
+        self._loop = None
+
+    def serve_forever(self):
+        asyncio.run(self._main())
+
+    def server_close(self):
+        self.executor.shutdown(wait=False)
+        self.stream_executor.shutdown(wait=False)
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        host, port = self.server_address
+        server = await asyncio.start_server(self._serve_connection, host, port,
+                                            limit=MAX_HEADER_BYTES, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_connection(self, reader, writer):
+        if self.active_connections >= self.max_connections:
+            self.rejected_connections += 1
+            writer.write(_simple_response(503, 'Service Unavailable'))
+            await self._close(writer)
+            return
+        self.active_connections += 1
+        peer = writer.get_extra_info('peername') or ('', 0)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                                  KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    writer.write(_simple_response(431, 'Request Header Fields Too Large'))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+
+                method, path, headers = _parse_head(head)
+                if 'transfer-encoding' in headers:
+                    writer.write(_simple_response(501, 'Not Implemented'))
+                    break
+                try:
+                    length = int(headers.get('content-length', '0'))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    writer.write(_simple_response(413, 'Payload Too Large'))
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b''
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                keep_alive = await self._dispatch(method, path, head + body, peer, writer)
+                if not keep_alive:
+                    break
+        finally:
+            self.active_connections -= 1
+            await self._close(writer)
+
+    async def _dispatch(self, method, path, raw, peer, writer):
+        """Ejecuta el handler para un pedido; True si la conexión sigue viva."""
+        self.requests += 1
+        request = (io.BytesIO(raw), _TransportWriter(writer, self._loop))
+        route = path.split('?')[0] if method == 'GET' else None
+        try:
+            if route in self.inline_paths:
+                handler = self.handler_cls(request, peer, self)
+            elif route in self.stream_paths:
+                # Contador tocado solo desde el loop: sin lock.
+                if self.active_streams >= self.max_streams:
+                    self.rejected_streams += 1
+                    writer.write(_simple_response(503, 'Service Unavailable'))
+                    await writer.drain()
+                    return False
+                self.active_streams += 1
+                try:
+                    handler = await self._loop.run_in_executor(
+                        self.stream_executor, self.handler_cls, request, peer, self)
+                finally:
+                    self.active_streams -= 1
+            else:
+                handler = await self._loop.run_in_executor(
+                    self.executor, self.handler_cls, request, peer, self)
+            await writer.drain()
+        except (ConnectionError, OSError):
+            return False
+        except Exception as e:
+            logger.error(f"Error en front-end asyncio: {e}")
+            return False
+        return not handler.close_connection
+
+    @staticmethod
+    async def _close(writer):
+        try:
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    def stats(self):
+        return {
+            'active_connections': self.active_connections,
+            'rejected_connections': self.rejected_connections,
+            'active_streams': self.active_streams,
+            'rejected_streams': self.rejected_streams,
+            'requests': self.requests,
+        }
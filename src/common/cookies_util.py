@@ -10,12 +10,23 @@ Reglas:
 - Se deduplica por (dominio, nombre); ante duplicados gana el archivo más
   nuevo (por fecha de modificación), así una cookie recién exportada pisa a la
   vieja.
+
+``CookieStore`` mantiene el resultado en memoria con la huella de las fuentes
+(ruta, mtime, tamaño): mientras no cambien, no se relee ni se reescribe nada.
+Cuando cambian, el combinado se escribe de forma atómica (temporal +
+os.replace), así dos pedidos simultáneos nunca ven un archivo a medio
+escribir. Da vistas listas para yt-dlp (ruta), requests (CookieJar) y
+Playwright (lista de dicts).
 """
 
-import os
 import glob
+import hashlib
+import os
+import threading
+from http.cookiejar import Cookie, CookieJar
 
 COMBINED_NAME = 'all_cookies.txt'
+_HTTPONLY_PREFIX = '#HttpOnly_'
 
 
 def _cookies_dir():
@@ -25,42 +36,163 @@ def _cookies_dir():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'cookies'))
 
 
-def combined_cookies_file():
-    """Devuelve la ruta de un archivo de cookies combinado, o None si no hay
-    ningún .txt en la carpeta."""
-    directory = _cookies_dir()
-    if not os.path.isdir(directory):
-        return None
+class _Snapshot:
+    """Cookies combinadas de una huella de fuentes (inmutable)."""
+    __slots__ = ('fingerprint', 'lines', 'cookies', 'path')
 
-    sources = [
-        p for p in glob.glob(os.path.join(directory, '*.txt'))
-        if os.path.basename(p) != COMBINED_NAME
-    ]
-    if not sources:
-        return None
+    def __init__(self, fingerprint, lines, cookies, path):
+        self.fingerprint = fingerprint
+        self.lines = lines      # líneas Netscape tal cual (con #HttpOnly_)
+        self.cookies = cookies  # (dominio, subdominios, path, secure, expira, nombre, valor, httponly)
+        self.path = path
 
-    # Más nuevos primero: sus cookies ganan ante duplicados.
-    sources.sort(key=lambda p: os.path.getmtime(p), reverse=True)
 
-    lines = ['# Netscape HTTP Cookie File', '# Combinado por cookies_util.py', '']
+def _parse_sources(sources):
+    """Lee las fuentes (más nuevas primero) y deduplica por (dominio, nombre)."""
+    lines = []
+    cookies = []
     seen = set()
     for path in sources:
         try:
             with open(path, encoding='utf-8', errors='ignore') as fh:
                 for raw in fh:
                     s = raw.rstrip('\r\n')
-                    if not s.strip() or s.lstrip().startswith('#'):
+                    httponly = s.startswith(_HTTPONLY_PREFIX)
+                    body = s[len(_HTTPONLY_PREFIX):] if httponly else s
+                    if not body.strip() or body.lstrip().startswith('#'):
                         continue
-                    parts = s.split('\t')
-                    key = (parts[0], parts[5]) if len(parts) >= 7 else s
+                    parts = body.split('\t')
+                    key = (parts[0], parts[5]) if len(parts) >= 7 else body
                     if key in seen:
                         continue
                     seen.add(key)
                     lines.append(s)
+                    if len(parts) >= 7:
+                        domain, subdomains, cpath, secure, expiry, name, value = parts[:7]
+                        cookies.append((domain, subdomains.upper() == 'TRUE', cpath or '/',
+                                        secure.upper() == 'TRUE',
+                                        int(expiry) if expiry.isdigit() and int(expiry) > 0 else None,
+                                        name, value, httponly))
         except Exception:
             continue
+    return lines, cookies
+
+
+class CookieStore:
+    def __init__(self, directory=None):
+        self._directory = directory
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.lookups = 0
+
+    def _sources(self, directory):
+        """[(ruta, mtime_ns, tamaño)] de las fuentes, más nuevas primero."""
+        found = []
+        for path in glob.glob(os.path.join(directory, '*.txt')):
+            if os.path.basename(path) == COMBINED_NAME:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((path, st.st_mtime_ns, st.st_size))
+        # Más nuevos primero: sus cookies ganan ante duplicados.
+        found.sort(key=lambda s: s[1], reverse=True)
+        return found
+
+    def snapshot(self):
+        """Cookies vigentes; se reconstruyen solo si cambiaron las fuentes
+        (o si alguien borró el combinado). None si no hay ninguna fuente."""
+        directory = self._directory or _cookies_dir()
+        if not os.path.isdir(directory):
+            return None
+        sources = self._sources(directory)
+        if not sources:
+            return None
+        fingerprint = hashlib.sha1(repr(sources).encode('utf-8')).hexdigest()[:16]
+
+        with self._lock:
+            self.lookups += 1
+            current = self._snapshot
+            if (current is not None and current.fingerprint == fingerprint
+                    and os.path.isfile(current.path)):
+                return current
+
+            lines, cookies = _parse_sources([s[0] for s in sources])
+            out_path = os.path.join(directory, COMBINED_NAME)
+            tmp = f'{out_path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                fh.write('\n'.join(['# Netscape HTTP Cookie File', '# Combinado por cookies_util.py', '']
+                                   + lines) + '\n')
+            os.replace(tmp, out_path)
+            self._snapshot = _Snapshot(fingerprint, lines, cookies, out_path)
+            self.rebuilds += 1
+            return self._snapshot
 
-    out_path = os.path.join(directory, COMBINED_NAME)
-    with open(out_path, 'w', encoding='utf-8') as fh:
-        fh.write('\n'.join(lines) + '\n')
-    return out_path
+    def file_path(self):
+        """Vista yt-dlp: ruta del archivo Netscape combinado, o None."""
+        snap = self.snapshot()
+        return snap.path if snap else None
+
+    def fingerprint(self):
+        """Huella de las fuentes actuales (cambia al exportar cookies nuevas)."""
+        snap = self.snapshot()
+        return snap.fingerprint if snap else None
+
+    def cookiejar(self, domains=None):
+        """Vista requests: CookieJar nuevo (el que llama lo puede modificar).
+        ``domains`` filtra por subcadena del dominio."""
+        jar = CookieJar()
+        snap = self.snapshot()
+        if not snap:
+            return jar
+        for domain, _subdomains, cpath, secure, expires, name, value, httponly in snap.cookies:
+            if domains and not any(d in domain for d in domains):
+                continue
+            jar.set_cookie(Cookie(
+                version=0, name=name, value=value, port=None, port_specified=False,
+                domain=domain, domain_specified=domain.startswith('.'),
+                domain_initial_dot=domain.startswith('.'),
+                path=cpath, path_specified=True, secure=secure, expires=expires,
+                discard=expires is None, comment=None, comment_url=None,
+                rest={'HttpOnly': None} if httponly else {},
+            ))
+        return jar
+
+    def playwright_cookies(self, domains=None):
+        """Vista Playwright: lista de dicts para context.add_cookies()."""
+        snap = self.snapshot()
+        if not snap:
+            return []
+        out = []
+        for domain, _subdomains, cpath, secure, expires, name, value, httponly in snap.cookies:
+            if domains and not any(d in domain for d in domains):
+                continue
+            cookie = {
+                'name': name, 'value': value, 'domain': domain, 'path': cpath,
+                'secure': secure, 'httpOnly': httponly,
+            }
+            if expires:
+                cookie['expires'] = expires
+            out.append(cookie)
+        return out
+
+    def stats(self):
+        with self._lock:
+            snap = self._snapshot
+            return {
+                'cookies': len(snap.cookies) if snap else 0,
+                'fingerprint': snap.fingerprint if snap else None,
+                'rebuilds': self.rebuilds,
+                'lookups': self.lookups,
+            }
+
+
+cookie_store = CookieStore()
+
+
+def combined_cookies_file():
+    """Devuelve la ruta de un archivo de cookies combinado, o None si no hay
+    ningún .txt en la carpeta."""
+    return cookie_store.file_path()
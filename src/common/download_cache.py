@@ -0,0 +1,183 @@
+"""Caché de descargas terminadas, por (medio canónico, perfil de formato).
+
+Antes cada /api/download_start volvía a correr yt-dlp, bajar y unir con
+ffmpeg aunque el mismo reel se hubiera bajado hace minutos, dejando un
+``yt_<uuid>.mp4`` nuevo por pedido. Acá el archivo final se registra con la
+clave ``(MediaRef.key, perfil)`` y el siguiente pedido del mismo medio y
+formato termina al instante apuntando al mismo archivo.
+
+- Conteo de referencias: cada tarea que usa el archivo tiene una referencia;
+  /api/download_delete (o el vencimiento de la tarea) la suelta con
+  ``release`` en vez de borrar un archivo que otra tarea está sirviendo.
+- Desalojo LRU por tamaño total (DOWNLOAD_CACHE_MAX_MB): solo se borran
+  archivos sin referencias.
+- Las entradas vencen a los DOWNLOAD_CACHE_TTL segundos (el medio puede
+  cambiar o borrarse en la plataforma). Un barrido periódico borra del disco
+  las vencidas sin referencias aunque nadie vuelva a pedir ese medio.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DOWNLOAD_CACHE_MAX_MB = int(os.environ.get('DOWNLOAD_CACHE_MAX_MB', '2048'))
+DOWNLOAD_CACHE_TTL = int(os.environ.get('DOWNLOAD_CACHE_TTL', str(6 * 60 * 60)))
+DOWNLOAD_CACHE_SWEEP_INTERVAL = 300
+
+
+class _Entry:
+    __slots__ = ('key', 'path', 'size', 'refs', 'created_at')
+
+    def __init__(self, key, path, size):
+        self.key = key
+        self.path = path
+        self.size = size
+        self.refs = 1
+        self.created_at = time.time()
+
+
+class DownloadCache:
+    def __init__(self, max_bytes=DOWNLOAD_CACHE_MAX_MB * 1024 * 1024, ttl=DOWNLOAD_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._by_key = OrderedDict()  # clave -> _Entry, de menos a más reciente
+        self._by_path = {}            # ruta -> _Entry (incluye las reemplazadas)
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, key):
+        """Ruta del archivo cacheado para key (tomando una referencia), o None."""
+        with self._lock:
+            entry = self._by_key.get(key)
+            exists = entry is not None and os.path.exists(entry.path)
+            if exists and time.time() - entry.created_at <= self.ttl:
+                entry.refs += 1
+                self._by_key.move_to_end(key)
+                self.hits += 1
+                return entry.path
+            self.misses += 1
+            trash = []
+            if entry is not None:
+                if exists and entry.refs:
+                    # Vencida pero otra tarea la está sirviendo: deja de
+                    # ofrecerse y queda contada en _by_path hasta que la
+                    # suelten (ahí _trim la borra como reemplazada).
+                    del self._by_key[key]
+                else:
+                    trash.append(self._drop(entry))
+            trash += self._trim()
+        self._delete(trash)
+        return None
+
+    def put(self, key, path):
+        """Registra el archivo recién descargado. La tarea que lo creó queda
+        con una referencia."""
+        size = os.path.getsize(path)
+        with self._lock:
+            old = self._by_key.pop(key, None)
+            entry = _Entry(key, path, size)
+            self._by_key[key] = entry
+            self._by_path[path] = entry
+            self.total_bytes += size
+            if old is not None and old.path == path:
+                # Mismo archivo registrado dos veces: conservar las referencias.
+                entry.refs += old.refs
+                self.total_bytes -= old.size
+            trash = self._trim()
+        self._delete(trash)
+
+    def release(self, path):
+        """Suelta la referencia de una tarea. False si el archivo no es de la
+        caché (el que llama lo borra como siempre)."""
+        with self._lock:
+            entry = self._by_path.get(path)
+            if entry is None:
+                return False
+            entry.refs = max(entry.refs - 1, 0)
+            trash = self._trim()
+        self._delete(trash)
+        return True
+
+    def _trim(self):
+        """Saca (con el lock tomado) lo que sobra; devuelve las rutas a borrar."""
+        trash = []
+        now = time.time()
+        # Entradas reemplazadas o vencidas que ya nadie usa.
+        for path, entry in list(self._by_path.items()):
+            if entry.refs:
+                continue
+            current = self._by_key.get(entry.key) is entry
+            if not current or now - entry.created_at > self.ttl:
+                trash.append(self._drop(entry))
+        # LRU por tamaño: las más viejas sin referencias primero.
+        if self.total_bytes > self.max_bytes:
+            for key, entry in list(self._by_key.items()):
+                if self.total_bytes <= self.max_bytes:
+                    break
+                if entry.refs == 0:
+                    trash.append(self._drop(entry))
+        return trash
+
+    def sweep(self):
+        """Borra lo vencido o sobrante sin referencias. Devuelve cuántos
+        archivos se borraron."""
+        with self._lock:
+            trash = self._trim()
+        self._delete(trash)
+        return len(trash)
+
+    def start_sweeper(self, interval=DOWNLOAD_CACHE_SWEEP_INTERVAL):
+        if self._sweeper is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=_loop, name='download-cache-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def _drop(self, entry):
+        """Saca la entrada de las tres estructuras (_by_key si es la vigente,
+        _by_path y total_bytes); devuelve la ruta a borrar."""
+        if self._by_key.get(entry.key) is entry:
+            del self._by_key[entry.key]
+        return self._forget(entry)
+
+    def _forget(self, entry):
+        self._by_path.pop(entry.path, None)
+        self.total_bytes -= entry.size
+        self.evictions += 1
+        return entry.path
+
+    @staticmethod
+    def _delete(paths):
+        for path in paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._by_key),
+                'files': len(self._by_path),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+download_cache = DownloadCache()
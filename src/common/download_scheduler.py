@@ -0,0 +1,102 @@
+"""Planificador de descargas: N workers fijos y una cola FIFO.
+
+Antes /api/download_start lanzaba un hilo por pedido, sin límite: una ráfaga
+de 50 descargas eran 50 yt-dlp + ffmpeg peleando por CPU, disco y ancho de
+banda en un contenedor chico, y todas terminaban tarde. Con un número fijo de
+workers (DOWNLOAD_WORKERS) las que entran corren a velocidad plena y el resto
+espera su turno; /api/download_status informa la posición en la cola.
+
+Los workers son hilos del mismo proceso: el progreso, la cancelación y el
+archivo resultante se comparten en memoria con los handlers HTTP.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+
+DOWNLOAD_WORKERS = int(os.environ.get('DOWNLOAD_WORKERS', '2'))
+# Tareas esperando como máximo; por encima se rechaza el pedido (503).
+DOWNLOAD_QUEUE_MAX = int(os.environ.get('DOWNLOAD_QUEUE_MAX', '100'))
+
+
+class DownloadScheduler:
+    def __init__(self, workers=DOWNLOAD_WORKERS, max_queued=DOWNLOAD_QUEUE_MAX):
+        self.workers = max(workers, 1)
+        self.max_queued = max_queued
+        self._queue = deque()  # (task_id, fn, args)
+        self._cond = threading.Condition()
+        self._threads = []
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _ensure_workers(self):
+        # Se arrancan en el primer submit: importar el módulo no crea hilos.
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f'download-worker-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, task_id, fn, *args):
+        """Encola fn(*args). Lanza queue.Full si la cola está llena."""
+        with self._cond:
+            if self.max_queued and len(self._queue) >= self.max_queued:
+                self.rejected += 1
+                raise queue.Full
+            self._ensure_workers()
+            self._queue.append((task_id, fn, args))
+            self.submitted += 1
+            self._cond.notify()
+
+    def position(self, task_id):
+        """Posición (1 = la próxima en arrancar) o None si no está en cola."""
+        with self._cond:
+            for i, (queued_id, _, _) in enumerate(self._queue):
+                if queued_id == task_id:
+                    return i + 1
+        return None
+
+    def cancel(self, task_id):
+        """Saca una tarea que todavía no arrancó. True si estaba en cola."""
+        with self._cond:
+            for item in self._queue:
+                if item[0] == task_id:
+                    self._queue.remove(item)
+                    return True
+        return False
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                _, fn, args = self._queue.popleft()
+                self.running += 1
+            try:
+                fn(*args)
+            except Exception:
+                # fn registra sus propios errores en la tarea; un fallo no
+                # puede matar al worker.
+                pass
+            finally:
+                with self._cond:
+                    self.running -= 1
+                    self.completed += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'running': self.running,
+                'queued': len(self._queue),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+
+download_scheduler = DownloadScheduler()
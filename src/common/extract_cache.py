@@ -0,0 +1,190 @@
+"""Caché de resultados de extracción (memoria LRU + disco opcional).
+
+Un mismo reel/Short viral lo piden decenas de usuarios en pocos minutos, y cada
+/api/extract cuesta 5-60 s de yt-dlp/scraping. Guardamos el resultado exitoso y
+lo devolvemos mientras sus URLs firmadas sigan vigentes.
+
+Reglas:
+- La vida de cada entrada sale de la expiración de la propia URL firmada del
+  CDN: ``oe=`` (timestamp hex) en cdninstagram/fbcdn y ``expire=`` (epoch) en
+  googlevideo. Se toma la MÍNIMA de todas las URLs del resultado y se le resta
+  un margen, para que el cliente alcance a descargar antes de que venza.
+- Si el resultado no trae URLs firmadas reconocibles, se usa un TTL por
+  defecto (EXTRACT_CACHE_TTL).
+- Una entrada vencida nunca se sirve: se descarta al leerla.
+- Tier de disco opcional (EXTRACT_CACHE_DIR): sobrevive reinicios del proceso
+  en la PC de casa. Un JSON por clave.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+# Cantidad máxima de resultados en memoria.
+EXTRACT_CACHE_SIZE = int(os.environ.get('EXTRACT_CACHE_SIZE', '256'))
+# TTL (segundos) cuando el resultado no trae URLs firmadas con expiración.
+EXTRACT_CACHE_TTL = int(os.environ.get('EXTRACT_CACHE_TTL', '900'))
+# Margen (segundos) antes de la expiración del CDN: el cliente todavía tiene
+# que descargar el video con esa URL después de recibirla.
+EXPIRY_MARGIN = 120
+# Directorio del tier de disco. Vacío = deshabilitado.
+EXTRACT_CACHE_DIR = os.environ.get('EXTRACT_CACHE_DIR', '')
+
+_URL_RE = re.compile(r'https?://[^\s"\'<>]+')
+
+
+def _url_expiry(url):
+    """Epoch en que vence la URL firmada del CDN, o None si no se reconoce."""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    host = parsed.hostname or ''
+    params = parse_qs(parsed.query)
+    try:
+        if 'cdninstagram.com' in host or 'fbcdn.net' in host:
+            if 'oe' in params:
+                return int(params['oe'][0], 16)
+        elif 'googlevideo.com' in host:
+            if 'expire' in params:
+                return int(params['expire'][0])
+    except ValueError:
+        return None
+    return None
+
+
+def _iter_urls(value):
+    """Recorre el resultado (dicts/listas anidados) y devuelve sus URLs."""
+    if isinstance(value, dict):
+        for v in value.values():
+            yield from _iter_urls(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _iter_urls(v)
+    elif isinstance(value, str) and '://' in value:
+        yield from _URL_RE.findall(value)
+
+
+def result_expires_at(result, now=None):
+    """Epoch hasta el que el resultado puede servirse desde caché."""
+    now = now or time.time()
+    expiries = [e for e in (_url_expiry(u) for u in _iter_urls(result)) if e]
+    if expiries:
+        return min(expiries) - EXPIRY_MARGIN
+    return now + EXTRACT_CACHE_TTL
+
+
+class ExtractCache:
+    """LRU en memoria con tier de disco opcional. Thread-safe."""
+
+    def __init__(self, max_entries=EXTRACT_CACHE_SIZE, disk_dir=EXTRACT_CACHE_DIR):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f'{digest}.json')
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding='utf-8') as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        if entry.get('expires_at', 0) <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry['expires_at'], entry['result']
+
+    def _write_disk(self, key, expires_at, result):
+        path = self._disk_path(key)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump({'key': key, 'expires_at': expires_at, 'result': result},
+                          fh, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def get(self, key):
+        """Devuelve una COPIA del resultado cacheado, o None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry[1])
+                del self._entries[key]
+                self.expired += 1
+
+        entry = self._read_disk(key) if self.disk_dir else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return copy.deepcopy(entry[1])
+
+    def put(self, key, result):
+        """Guarda un resultado exitoso. Los ya vencidos (o casi) se ignoran."""
+        if not result.get('success'):
+            return
+        expires_at = result_expires_at(result)
+        if expires_at <= time.time():
+            return
+        stored = copy.deepcopy(result)
+        with self._lock:
+            self._remember(key, (expires_at, stored))
+            self.stores += 1
+        if self.disk_dir:
+            self._write_disk(key, expires_at, stored)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'stores': self.stores,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+
+extract_cache = ExtractCache()
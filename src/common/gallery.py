@@ -0,0 +1,194 @@
+"""Descarga de galerías (carruseles, listas JSON de URLs) directo a un ZIP.
+
+Antes cada imagen se bajaba de a una con ``requests.get`` (una conexión
+nueva por imagen), se escribía a un temporal, después se releían todas para
+armar el ZIP y se borraban. Acá:
+
+- Las imágenes se piden en paralelo (GALLERY_WORKERS) sobre los pools con
+  keep-alive de common/http_client.py: el carrusel tarda lo que la imagen
+  más lenta.
+- Cada respuesta se escribe en el ZIP apenas llega (desde un solo hilo, el
+  consumidor), sin temporales intermedios.
+- Entradas STORED: las imágenes/videos ya vienen comprimidos.
+
+``iter_gallery_items`` es el núcleo: entrega los ítems a medida que llegan,
+con una ventana acotada de pedidos adelantados (si el consumidor no lee, se
+deja de pedir). Lo usan tanto el ZIP en disco como ``GalleryFetch``, que
+alimenta el ZIP en streaming (common/zip_stream.py): la tarea baja hasta el
+primer ítem bueno y queda lista; /api/download_file sigue consumiendo el
+mismo generador y cada imagen pasa de la respuesta HTTP al ZIP sin tocar el
+disco. Un segundo GET de la misma tarea (reintento del cliente) vuelve a
+pedir los ítems: guardarlos en disco por las dudas costaría una escritura
+por imagen en todas las galerías.
+"""
+
+import logging
+import os
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from common import http_client
+
+logger = logging.getLogger(__name__)
+
+GALLERY_WORKERS = int(os.environ.get('GALLERY_WORKERS', '6'))
+
+_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+
+
+class DownloadCancelled(Exception):
+    """La tarea se canceló mientras se bajaba la galería."""
+
+    def __init__(self):
+        super().__init__('DownloadCancelled')
+
+
+def item_filename(base_name, idx, url):
+    """Nombre dentro del ZIP: base-1.jpg, base-2.mp4, ..."""
+    ext = os.path.splitext(urlparse(url).path)[1]
+    if not ext:
+        ext = '.jpg'
+    return f'{base_name}-{idx + 1}{ext}'
+
+
+def fetch_item(url, is_cancelled=None):
+    """Contenido de un ítem, o None si el servidor no lo devolvió."""
+    if is_cancelled and is_cancelled():
+        raise DownloadCancelled
+    r = http_client.get(url, headers=_HEADERS, timeout=30)
+    if r.status_code != 200:
+        logger.warning(f"Failed to download gallery item: {url} ({r.status_code})")
+        return None
+    return r.content
+
+
+def iter_gallery_items(urls, is_cancelled=None):
+    """Genera (índice, contenido) por cada ítem en orden de llegada; el
+    contenido es None si ese ítem no se pudo bajar. En memoria hay como mucho
+    el doble de GALLERY_WORKERS ítems pedidos o bajados sin consumir. Si el
+    consumidor deja de iterar, los pedidos pendientes se cancelan."""
+    workers = max(min(GALLERY_WORKERS, len(urls)), 1)
+    window = workers * 2
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = {}
+    queued = iter(enumerate(urls))
+    try:
+        while True:
+            for idx, url in queued:
+                futures[pool.submit(fetch_item, url, is_cancelled)] = idx
+                if len(futures) >= window:
+                    break
+            if not futures:
+                return
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = futures.pop(future)
+                try:
+                    data = future.result()
+                except DownloadCancelled:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Failed to download gallery item {idx}: {e}")
+                    data = None
+                yield idx, data
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_gallery_to_zip(urls, zip_path, base_name, on_progress=None, is_cancelled=None):
+    """Baja todos los ítems en paralelo y los escribe en zip_path a medida
+    que llegan. Devuelve cuántos ítems se escribieron. Si no se pudo bajar
+    ninguno, borra el ZIP y lanza Exception."""
+    total = len(urls)
+    done = 0
+    written = 0
+
+    try:
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zipf:
+            for idx, data in iter_gallery_items(urls, is_cancelled):
+                if data is not None:
+                    zipf.writestr(item_filename(base_name, idx, urls[idx]), data)
+                    written += 1
+                done += 1
+                if on_progress:
+                    on_progress(int(done / total * 99))
+    except BaseException:
+        _remove(zip_path)
+        raise
+
+    if not written:
+        _remove(zip_path)
+        raise Exception("No images could be downloaded from gallery")
+    return written
+
+
+class GalleryFetch:
+    """Galería que se baja mientras se envía como ZIP: la tarea espera solo
+    el primer ítem bueno y el resto va de los pedidos HTTP al consumidor en
+    memoria, por la ventana acotada de ``iter_gallery_items``."""
+
+    def __init__(self, urls, is_cancelled=None):
+        self.urls = urls
+        self.is_cancelled = is_cancelled
+        self._items = None
+        self._first = None
+        self._claimed = False
+        self._lock = threading.Lock()
+
+    def start(self, on_progress=None):
+        """Baja hasta el primer ítem bueno (en el hilo de la tarea), con
+        progreso. False si no se pudo bajar ninguno."""
+        total = len(self.urls)
+        done = 0
+        self._items = iter_gallery_items(self.urls, self.is_cancelled)
+        for idx, data in self._items:
+            done += 1
+            if data is not None:
+                self._first = (idx, data)
+                return True
+            if on_progress:
+                on_progress(int(done / total * 99))
+        return False
+
+    def items(self):
+        """Genera (índice, contenido) de los ítems bajados, en orden de
+        llegada. El primer consumidor se lleva los que ya están en camino;
+        uno posterior los vuelve a pedir."""
+        with self._lock:
+            claimed, self._claimed = self._claimed, True
+        if claimed or self._items is None:
+            return self._refetch()
+        return self._drain()
+
+    def _drain(self):
+        try:
+            first, self._first = self._first, None
+            yield first
+            for idx, data in self._items:
+                if data is not None:
+                    yield idx, data
+        finally:
+            self._items.close()
+
+    def _refetch(self):
+        for idx, data in iter_gallery_items(self.urls):
+            if data is not None:
+                yield idx, data
+
+    def close(self):
+        """Suelta los pedidos en curso si nadie llegó a consumirlos (tarea
+        borrada o vencida). Si ya hay consumidor, él los cierra al terminar."""
+        with self._lock:
+            claimed, self._claimed = self._claimed, True
+        if not claimed and self._items is not None:
+            self._items.close()
+            self._first = None
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,140 @@
+"""Ejecución "hedged": estrategias en paralelo escalonadas, gana la primera.
+
+Cuando hay varias formas independientes de obtener lo mismo (yt-dlp,
+scraping, servicios externos) y cada una puede tardar 5-30 s en fallar,
+correrlas en serie suma todos los timeouts. Acá cada estrategia arranca a su
+``delay`` desde el inicio (o antes, si todas las que están corriendo ya
+fallaron) y el primer resultado válido gana:
+
+- Las que todavía no arrancaron no arrancan nunca.
+- Las que están corriendo reciben el aviso por ``cancelled`` (un
+  threading.Event) y su resultado se descarta; un hilo no se puede matar,
+  así que cada estrategia debe mirar el evento entre pasos.
+- Por estrategia se cuentan lanzamientos, victorias y latencia de la
+  victoria: con ``stats()`` se ajusta el escalonamiento.
+"""
+
+import queue
+import threading
+import time
+
+
+class _StrategyStats:
+    __slots__ = ('launched', 'wins', 'failures', 'errors', 'skipped', 'win_seconds')
+
+    def __init__(self):
+        self.launched = 0
+        self.wins = 0
+        self.failures = 0
+        self.errors = 0
+        self.skipped = 0
+        self.win_seconds = 0.0
+
+
+class HedgedRunner:
+    def __init__(self, name='hedge'):
+        self.name = name
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.no_winner = 0
+
+    def _stat(self, strategy):
+        stat = self._stats.get(strategy)
+        if stat is None:
+            stat = self._stats[strategy] = _StrategyStats()
+        return stat
+
+    def run(self, strategies, is_valid, timeout=None):
+        """Corre ``strategies`` (lista de (nombre, delay, fn)) escalonadas.
+
+        ``fn(cancelled)`` devuelve un resultado; ``is_valid(resultado)`` dice
+        si gana. Devuelve (nombre ganador, resultado) o (None, resultados)
+        con la lista de (nombre, resultado o excepción) de las que fallaron.
+        """
+        pending = sorted(strategies, key=lambda s: s[1])
+        results = queue.Queue()
+        cancelled = threading.Event()
+        started = time.monotonic()
+        deadline = started + timeout if timeout else None
+        running = 0
+        failures = []
+        with self._lock:
+            self.runs += 1
+
+        def launch(name, fn):
+            with self._lock:
+                self._stat(name).launched += 1
+
+            def target():
+                try:
+                    results.put((name, fn(cancelled), None))
+                except Exception as e:
+                    results.put((name, None, e))
+
+            threading.Thread(target=target, name=f'{self.name}-{name}', daemon=True).start()
+
+        try:
+            while pending or running:
+                now = time.monotonic()
+                # Arrancar las que ya cumplieron su delay, o la siguiente si
+                # no queda ninguna corriendo (esperar no tendría sentido).
+                while pending and (pending[0][1] <= now - started or not running):
+                    name, _, fn = pending.pop(0)
+                    launch(name, fn)
+                    running += 1
+
+                wait = pending[0][1] - (now - started) if pending else None
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        break
+                    wait = remaining if wait is None else min(wait, remaining)
+                try:
+                    name, result, error = results.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                running -= 1
+
+                if error is None and is_valid(result):
+                    elapsed = time.monotonic() - started
+                    with self._lock:
+                        stat = self._stat(name)
+                        stat.wins += 1
+                        stat.win_seconds += elapsed
+                        for other, _, _ in pending:
+                            self._stat(other).skipped += 1
+                    return name, result
+
+                with self._lock:
+                    stat = self._stat(name)
+                    if error is not None:
+                        stat.errors += 1
+                    else:
+                        stat.failures += 1
+                failures.append((name, error if error is not None else result))
+        finally:
+            cancelled.set()
+
+        with self._lock:
+            self.no_winner += 1
+        return None, failures
+
+    def stats(self):
+        with self._lock:
+            strategies = {}
+            for name, stat in self._stats.items():
+                strategies[name] = {
+                    'launched': stat.launched,
+                    'wins': stat.wins,
+                    'failures': stat.failures,
+                    'errors': stat.errors,
+                    'skipped': stat.skipped,
+                    'win_rate': round(stat.wins / stat.launched, 3) if stat.launched else 0.0,
+                    'avg_win_seconds': round(stat.win_seconds / stat.wins, 2) if stat.wins else None,
+                }
+            return {
+                'runs': self.runs,
+                'no_winner': self.no_winner,
+                'strategies': strategies,
+            }
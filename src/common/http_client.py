@@ -0,0 +1,145 @@
+"""Cliente HTTP compartido: pools por host con keep-alive, reintentos y timeout.
+
+Antes cada extractor (y el servidor) llamaba a ``requests.get``/``post``/
+``head`` sueltos: cada llamada crea una sesión descartable, así que cada
+pedido repetía DNS + TCP + TLS aunque fuera al mismo host que el anterior
+(fbcdn, cdninstagram, el túnel de casa...). Acá:
+
+- Una sola sesión con adaptadores compartidos: pools por host (hasta
+  HTTP_POOL_MAXSIZE conexiones vivas por host) reusados entre hilos.
+- Timeout por defecto (HTTP_TIMEOUT) para los pedidos que no pasan uno.
+- Reintentos con backoff solo para GET/HEAD ante errores de conexión o
+  502/503/504; un POST nunca se repite solo.
+- La sesión compartida NO guarda cookies entre pedidos (lo que setea un sitio
+  no se filtra a otro pedido); quien necesita un jar propio usa
+  ``new_session()``, que igual comparte los pools.
+- ``stats()`` expone pedidos, conexiones nuevas y la tasa de reuso.
+
+Se llama ``http_client`` y no ``http`` para no tapar el paquete ``http`` de
+la stdlib cuando un script de este directorio corre con él en sys.path.
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', '15'))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '16'))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+
+# Cantidad de hosts distintos con pool vivo a la vez (LRU de urllib3).
+_POOL_HOSTS = 32
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter con timeout por defecto y contadores que sobreviven al
+    desalojo de pools (urllib3 cierra el pool del host menos usado)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._retired_requests = 0
+        self._retired_connections = 0
+        retry = Retry(
+            total=HTTP_RETRIES,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            # Agotados los reintentos se devuelve la última respuesta: los
+            # llamadores siguen mirando status_code como antes.
+            raise_on_status=False,
+        )
+        super().__init__(pool_connections=_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                         max_retries=retry)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+
+        def retire(pool):
+            with self._lock:
+                self._retired_requests += pool.num_requests
+                self._retired_connections += pool.num_connections
+            if dispose:
+                dispose(pool)
+
+        pools.dispose_func = retire
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = HTTP_TIMEOUT
+        return super().send(request, timeout=timeout, **kwargs)
+
+    def counters(self):
+        """(pedidos, conexiones abiertas, hosts con pool vivo)."""
+        pools = self.poolmanager.pools
+        with pools.lock:
+            live = list(pools._container.values())
+        with self._lock:
+            requests_ = self._retired_requests + sum(p.num_requests for p in live)
+            connections = self._retired_connections + sum(p.num_connections for p in live)
+        return requests_, connections, len(live)
+
+
+class _NoCookieJar(requests.cookies.RequestsCookieJar):
+    """Jar que descarta lo que setean las respuestas (las cookies pasadas con
+    ``cookies=`` en cada pedido se siguen mandando)."""
+
+    def set_cookie(self, cookie, *args, **kwargs):
+        pass
+
+    def extract_cookies(self, response, request):
+        pass
+
+
+_adapter = _PooledAdapter()
+
+
+def _mount(session):
+    session.mount('https://', _adapter)
+    session.mount('http://', _adapter)
+    return session
+
+
+_session = _mount(requests.Session())
+_session.cookies = _NoCookieJar()
+
+
+def new_session():
+    """Sesión con su propio jar de cookies sobre los pools compartidos."""
+    return _mount(requests.Session())
+
+
+def request(method, url, **kwargs):
+    return _session.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    kwargs.setdefault('allow_redirects', True)
+    return _session.request('GET', url, **kwargs)
+
+
+def head(url, **kwargs):
+    kwargs.setdefault('allow_redirects', False)
+    return _session.request('HEAD', url, **kwargs)
+
+
+def post(url, data=None, json=None, **kwargs):
+    return _session.request('POST', url, data=data, json=json, **kwargs)
+
+
+def stats():
+    total_requests, connections, hosts = _adapter.counters()
+    reused = max(total_requests - connections, 0)
+    return {
+        'requests': total_requests,
+        'connections_opened': connections,
+        'reused': reused,
+        'reuse_rate': round(reused / total_requests, 3) if total_requests else 0.0,
+        'pooled_hosts': hosts,
+        'pool_maxsize': HTTP_POOL_MAXSIZE,
+        'timeout': HTTP_TIMEOUT,
+    }
@@ -0,0 +1,239 @@
+"""Envío de archivos por HTTP con soporte de rangos (206), HEAD y validadores.
+
+Sin rangos, un celular que pierde la conexión a mitad de un VOD de cientos de
+MB reinicia la descarga desde cero, y el <video> de la vista previa no puede
+adelantar. Acá:
+
+- ``Range: bytes=...`` simple (206 + Content-Range) y múltiple
+  (multipart/byteranges); 416 si ningún rango es satisfacible.
+- ``If-Range`` con el ETag o el Last-Modified: si el archivo cambió, se
+  ignora el rango y se manda completo (nunca se mezclan versiones).
+- ``Accept-Ranges``, ``ETag`` y ``Last-Modified`` en todas las respuestas.
+- HEAD: los mismos headers, sin cuerpo.
+- El cuerpo sale con sendfile (copia en el kernel, sin pasar por Python) si
+  la plataforma lo tiene; si no, con lecturas de 1 MiB en un buffer reusado.
+  Ver benchmarks/bench_sendfile.py.
+"""
+
+import os
+import socket
+import uuid
+from email.utils import formatdate
+
+# Más rangos que esto en un pedido no es un cliente legítimo: se responde el
+# archivo completo en vez de armar cientos de partes.
+MAX_RANGES = 16
+COPY_CHUNK = 1024 * 1024
+# sendfile(2) existe en Linux/macOS; en Windows os.sendfile no está.
+USE_SENDFILE = hasattr(os, 'sendfile') and os.environ.get('DISABLE_SENDFILE') != '1'
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def file_etag(st):
+    """ETag fuerte a partir de tamaño y mtime (los temporales no se reescriben)."""
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """Interpreta un header Range para un recurso de ``size`` bytes.
+
+    Devuelve None si hay que ignorarlo (ausente, mal formado, otra unidad o
+    demasiados rangos) o una lista de (inicio, fin) inclusivos, ordenada y
+    con los rangos solapados fusionados. Lanza RangeNotSatisfiable si ninguno
+    cae dentro del archivo.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
+    specs = [s.strip() for s in spec.split(',') if s.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for item in specs:
+        first, sep, last = item.partition('-')
+        if not sep:
+            return None
+        try:
+            if first == '':
+                # Sufijo: los últimos N bytes
+                length = int(last)
+                if length <= 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else start
+                if end < start:
+                    return None
+                end = size - 1 if not last else min(end, size - 1)
+        except ValueError:
+            return None
+        if start < 0:
+            return None
+        if start < size:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def copy_range(src, wfile, start, length):
+    """Copia ``length`` bytes de src (desde ``start``) a wfile con un buffer
+    grande reusado (camino sin sendfile)."""
+    src.seek(start)
+    buf = bytearray(min(COPY_CHUNK, max(length, 1)))
+    view = memoryview(buf)
+    remaining = length
+    while remaining > 0:
+        n = src.readinto(view[:min(len(buf), remaining)])
+        if not n:
+            break
+        wfile.write(view[:n])
+        remaining -= n
+
+
+def transmit(handler, src, start, length):
+    """Envía ``length`` bytes de src (desde ``start``) por la conexión del
+    handler, con sendfile cuando se puede."""
+    if length <= 0:
+        return
+    if USE_SENDFILE:
+        # Front-end asyncio: el wfile sabe hacer sendfile sobre el transporte.
+        if hasattr(handler.wfile, 'sendfile'):
+            handler.wfile.sendfile(src, start, length)
+            return
+        sock = getattr(handler, 'connection', None)
+        if isinstance(sock, socket.socket):
+            handler.wfile.flush()
+            sock.sendfile(src, start, length)
+            return
+    copy_range(src, handler.wfile, start, length)
+
+
+class ChunkedWriter:
+    """Cuerpo con ``Transfer-Encoding: chunked`` (HTTP/1.1) cuando el largo no
+    se conoce de antemano. Junta escrituras chicas en chunks de ~64 KB."""
+
+    def __init__(self, wfile, chunk_size=64 * 1024):
+        self._wfile = wfile
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            self._wfile.write(b'%x\r\n' % len(self._buffer) + bytes(self._buffer) + b'\r\n')
+            self._buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._wfile.write(b'0\r\n\r\n')
+
+
+def _range_applies(handler, etag, last_modified):
+    if_range = handler.headers.get('If-Range')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('W/'):
+        return False  # If-Range exige un validador fuerte
+    if if_range.startswith('"'):
+        return if_range == etag
+    return if_range == last_modified
+
+
+def send_file(handler, path, content_type, headers=None, head_only=False):
+    """Responde con el archivo ``path`` respetando Range/If-Range.
+
+    ``headers`` son headers extra (ej. Content-Disposition) que van en toda
+    respuesta exitosa.
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        etag = file_etag(st)
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+
+        ranges = None
+        if _range_applies(handler, etag, last_modified):
+            try:
+                ranges = parse_range(handler.headers.get('Range'), size)
+            except RangeNotSatisfiable:
+                handler.send_response(416)
+                handler.send_header('Content-Range', f'bytes */{size}')
+                handler.send_header('Accept-Ranges', 'bytes')
+                handler.send_header('Content-Length', '0')
+                handler.end_headers()
+                return
+
+        def common_headers():
+            handler.send_header('Accept-Ranges', 'bytes')
+            handler.send_header('ETag', etag)
+            handler.send_header('Last-Modified', last_modified)
+            for name, value in (headers or {}).items():
+                handler.send_header(name, value)
+
+        if not ranges:
+            handler.send_response(200)
+            handler.send_header('Content-Type', content_type)
+            handler.send_header('Content-Length', str(size))
+            common_headers()
+            handler.end_headers()
+            if not head_only:
+                transmit(handler, f, 0, size)
+            return
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            handler.send_response(206)
+            handler.send_header('Content-Type', content_type)
+            handler.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            handler.send_header('Content-Length', str(end - start + 1))
+            common_headers()
+            handler.end_headers()
+            if not head_only:
+                transmit(handler, f, start, end - start + 1)
+            return
+
+        # Varios rangos: multipart/byteranges con el largo total precalculado.
+        boundary = uuid.uuid4().hex
+        parts = []
+        for start, end in ranges:
+            part_head = (f'\r\n--{boundary}\r\n'
+                         f'Content-Type: {content_type}\r\n'
+                         f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n').encode('latin-1')
+            parts.append((part_head, start, end - start + 1))
+        closing = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+        total = sum(len(h) + n for h, _, n in parts) + len(closing)
+
+        handler.send_response(206)
+        handler.send_header('Content-Type', f'multipart/byteranges; boundary={boundary}')
+        handler.send_header('Content-Length', str(total))
+        common_headers()
+        handler.end_headers()
+        if head_only:
+            return
+        for part_head, start, length in parts:
+            handler.wfile.write(part_head)
+            transmit(handler, f, start, length)
+        handler.wfile.write(closing)
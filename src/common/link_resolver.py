@@ -0,0 +1,197 @@
+"""Resolución de links cortos con mapa persistente (link corto -> URL canónica).
+
+Los links de compartir (facebook.com/share/v/..., fb.watch, vm.tiktok.com,
+tiktok.com/t/..., pin.it) no dicen qué medio son: antes cada pedido los
+resolvía de nuevo (HEAD o GET completo en el extractor de Facebook, o dentro
+de yt-dlp), aunque el mismo link viral llegara cien veces. Acá:
+
+- Solo se resuelven los links que ``normalize`` marca como cortos; el resto
+  pasa sin tocar la red.
+- Las redirecciones se siguen salto a salto con HEAD (sin bajar cuerpos) y
+  se corta apenas el destino coincide con un patrón conocido del normalizador
+  (ej. facebook.com/reel/<id>): no hace falta llegar al HTML final.
+- El resultado se guarda por ``MediaRef.key`` del link corto (el mismo link
+  con distinto tracking es la misma entrada) en memoria y en un JSON en disco
+  (LINK_CACHE_FILE, escritura atómica): un link repetido no cuesta ninguna
+  ida y vuelta, ni siquiera después de reiniciar.
+- Pedidos simultáneos del mismo link esperan una única resolución;
+  ``resolve_many`` resuelve lotes en paralelo sobre los pools de
+  common/http_client.py (las listas de URLs de las galerías: los ítems que
+  no son links cortos pasan sin tocar la red ni lanzar hilos).
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from common import http_client
+from common.single_flight import SingleFlight
+from common.url_normalizer import normalize, strip_tracking
+
+# Archivo del mapa persistente. Vacío = solo en memoria.
+LINK_CACHE_FILE = os.environ.get(
+    'LINK_CACHE_FILE',
+    os.path.join(os.path.dirname(__file__), '..', '..', 'link_cache.json')
+)
+# Vida (s) de una resolución: los links de compartir no cambian de destino.
+LINK_CACHE_TTL = int(os.environ.get('LINK_CACHE_TTL', str(30 * 24 * 60 * 60)))
+LINK_CACHE_MAX = int(os.environ.get('LINK_CACHE_MAX', '20000'))
+LINK_RESOLVER_WORKERS = int(os.environ.get('LINK_RESOLVER_WORKERS', '8'))
+
+MAX_HOPS = 8
+_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+
+
+class LinkResolver:
+    def __init__(self, path=LINK_CACHE_FILE, ttl=LINK_CACHE_TTL, max_entries=LINK_CACHE_MAX):
+        self.path = os.path.abspath(path) if path else ''
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._map = None  # clave del link corto -> [URL canónica, epoch]
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.hops = 0
+
+    def _entries(self):
+        """El mapa en memoria, cargado del disco la primera vez (con el lock)."""
+        if self._map is None:
+            self._map = {}
+            if self.path and os.path.isfile(self.path):
+                try:
+                    with open(self.path, encoding='utf-8') as fh:
+                        self._map = json.load(fh)
+                except (OSError, ValueError):
+                    self._map = {}
+        return self._map
+
+    def _save(self, snapshot):
+        if not self.path:
+            return
+        tmp = f'{self.path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(snapshot, fh, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def lookup(self, url):
+        """URL canónica ya conocida de un link corto, sin tocar la red."""
+        key = normalize(url).key
+        with self._lock:
+            entry = self._entries().get(key)
+            if entry and time.time() - entry[1] <= self.ttl:
+                return entry[0]
+        return None
+
+    def resolve(self, url):
+        """URL canónica del link (o la misma URL si no es un link corto o no
+        se pudo resolver)."""
+        ref = normalize(url)
+        if not ref.is_short_link:
+            return url
+        cached = self.lookup(url)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached
+        with self._lock:
+            self.misses += 1
+        resolved = self._flight.do(ref.key, lambda: self._follow_and_store(ref))
+        return resolved if resolved is not None else url
+
+    def resolve_ref(self, url):
+        """MediaRef del medio al que apunta url, resolviendo links cortos."""
+        ref = normalize(url)
+        if ref.is_short_link:
+            resolved = self.resolve(url)
+            if resolved != url:
+                return normalize(resolved)
+        return ref
+
+    def resolve_many(self, urls):
+        """Resuelve un lote en paralelo; devuelve las URLs en el mismo orden."""
+        pending = [u for u in dict.fromkeys(urls) if normalize(u).is_short_link]
+        resolved = {}
+        if pending:
+            workers = max(min(LINK_RESOLVER_WORKERS, len(pending)), 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for url, result in zip(pending, pool.map(self.resolve, pending)):
+                    resolved[url] = result
+        return [resolved.get(u, u) for u in urls]
+
+    def _follow_and_store(self, ref):
+        resolved = self._follow(ref.canonical_url)
+        if resolved is not None:
+            self._store(ref.key, resolved)
+        return resolved
+
+    def _follow(self, url):
+        """Sigue las redirecciones con HEAD. None si no hubo ninguna."""
+        current = url
+        try:
+            for _ in range(MAX_HOPS):
+                r = http_client.head(current, headers=_HEADERS, timeout=8)
+                r.close()
+                location = r.headers.get('Location')
+                if not (r.is_redirect and location):
+                    break
+                with self._lock:
+                    self.hops += 1
+                current = urljoin(current, location)
+                ref = normalize(current)
+                if ref.media_id and not ref.is_short_link:
+                    return ref.canonical_url
+        except Exception as e:
+            print(f"⚠️ No se pudo resolver link corto {url}: {e}")
+            with self._lock:
+                self.failures += 1
+            return None
+        # Un link que termina en el login no se guarda: con sesión (o más
+        # tarde) puede llevar al medio.
+        if current == url or '/login' in urlsplit(current).path:
+            with self._lock:
+                self.failures += 1
+            return None
+        return strip_tracking(current)
+
+    def _store(self, key, resolved):
+        with self._lock:
+            entries = self._entries()
+            entries[key] = [resolved, int(time.time())]
+            if len(entries) > self.max_entries:
+                # Los dicts conservan el orden de inserción: fuera los más viejos.
+                for old in list(entries)[:len(entries) - self.max_entries]:
+                    del entries[old]
+        # La foto se toma dentro del lock de escritura: el último en escribir
+        # siempre deja el mapa más nuevo.
+        with self._save_lock:
+            with self._lock:
+                snapshot = dict(self._entries())
+            self._save(snapshot)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._map or {}),
+                'hits': self.hits,
+                'misses': self.misses,
+                'failures': self.failures,
+                'hops': self.hops,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'persistent': bool(self.path),
+            }
+
+
+link_resolver = LinkResolver()
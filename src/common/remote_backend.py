@@ -0,0 +1,229 @@
+"""Conexión al backend residencial (la PC de casa) con sondeo y circuit breaker.
+
+El contenido con login (y Threads) se reenvía a la URL de túnel que registra
+home_tunnel.py. Antes cada reenvío era un POST suelto con timeout de 90 s:
+si la PC estaba apagada pero su registro tenía menos de
+REMOTE_FALLBACK_TTL, cada usuario esperaba el timeout completo. Acá:
+
+- Una sesión propia sobre los pools de common/http_client.py: la conexión
+  TLS al túnel queda viva entre reenvíos.
+- Sondeo activo: mientras hay una URL registrada, un hilo pide
+  ``/api/health`` cada REMOTE_HEALTH_INTERVAL segundos.
+- Circuit breaker:
+  * ``closed``: se reenvía normalmente.
+  * ``open``: tras REMOTE_BREAKER_THRESHOLD fallos seguidos (reenvíos o
+    sondeos); los reenvíos fallan al instante, sin tocar la red.
+  * ``half_open``: pasados REMOTE_BREAKER_COOLDOWN segundos, UN reenvío de
+    prueba; si sale bien se cierra, si no vuelve a abrirse. Un sondeo exitoso
+    también lo cierra, y una URL nueva registrada arranca de cero.
+- ``stats()`` expone estado, RTT (promedio móvil y último) y tasa de error.
+"""
+
+import os
+import threading
+import time
+
+from common import http_client
+
+# Vigencia de la URL registrada (segundos). Si la casa dejó de latir hace más
+# que esto, dejamos de reenviar (la PC probablemente está apagada).
+REMOTE_FALLBACK_TTL = int(os.environ.get('REMOTE_FALLBACK_TTL', '600'))
+REMOTE_TIMEOUT = float(os.environ.get('REMOTE_TIMEOUT', '90'))
+REMOTE_CONNECT_TIMEOUT = float(os.environ.get('REMOTE_CONNECT_TIMEOUT', '5'))
+REMOTE_HEALTH_INTERVAL = float(os.environ.get('REMOTE_HEALTH_INTERVAL', '15'))
+REMOTE_BREAKER_THRESHOLD = int(os.environ.get('REMOTE_BREAKER_THRESHOLD', '3'))
+REMOTE_BREAKER_COOLDOWN = float(os.environ.get('REMOTE_BREAKER_COOLDOWN', '30'))
+
+HEALTH_TIMEOUT = 4
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Respuestas del túnel de Cloudflare cuando la app de casa no contesta.
+_TUNNEL_DOWN = frozenset({502, 503, 504, 530})
+_EWMA = 0.3
+
+
+class RemoteBackend:
+    def __init__(self, ttl=REMOTE_FALLBACK_TTL, threshold=REMOTE_BREAKER_THRESHOLD,
+                 cooldown=REMOTE_BREAKER_COOLDOWN, health_interval=REMOTE_HEALTH_INTERVAL):
+        self.ttl = ttl
+        self.threshold = max(threshold, 1)
+        self.cooldown = cooldown
+        self.health_interval = health_interval
+        self._session = http_client.new_session()
+        self._lock = threading.Lock()
+        self._prober = None
+        self.url = None
+        self.updated_at = 0.0
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.forwards = 0
+        self.successes = 0
+        self.failures = 0
+        self.fast_fails = 0
+        self.probes = 0
+        self.probe_failures = 0
+        self.rtt_ms = None
+        self.last_rtt_ms = None
+        self.probe_rtt_ms = None
+
+    # -- registro --------------------------------------------------------------
+
+    def register(self, url):
+        """La casa registra (o renueva) su URL de túnel."""
+        with self._lock:
+            if url != self.url:
+                # Túnel nuevo: lo que se sabía del anterior no aplica.
+                self._state = CLOSED
+                self._consecutive_failures = 0
+                self._trial_running = False
+            self.url = url
+            self.updated_at = time.time()
+            if self._prober is None and self.health_interval > 0:
+                self._prober = threading.Thread(target=self._probe_loop,
+                                                name='remote-health', daemon=True)
+                self._prober.start()
+
+    def _fresh_url(self):
+        if self.url and time.time() - self.updated_at < self.ttl:
+            return self.url
+        return None
+
+    def available(self):
+        """True si hay backend registrado y el breaker dejaría pasar un pedido."""
+        with self._lock:
+            if not self._fresh_url():
+                return False
+            if self._state == OPEN:
+                return time.monotonic() - self._opened_at >= self.cooldown
+            return not (self._state == HALF_OPEN and self._trial_running)
+
+    # -- breaker ---------------------------------------------------------------
+
+    def _admit(self):
+        """Decide (con el lock) si un reenvío pasa. True/False."""
+        if self._state == OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._state = HALF_OPEN
+            self._trial_running = False
+        if self._state == HALF_OPEN:
+            if self._trial_running:
+                return False
+            self._trial_running = True
+        return True
+
+    def _on_success(self):
+        if self._state != CLOSED:
+            print("🏠 Backend residencial respondió: circuito cerrado")
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._trial_running = False
+
+    def _on_failure(self):
+        self._consecutive_failures += 1
+        self._trial_running = False
+        if self._state == HALF_OPEN or (self._state == CLOSED
+                                        and self._consecutive_failures >= self.threshold):
+            if self._state != OPEN:
+                print(f"🔌 Backend residencial sin respuesta: circuito abierto "
+                      f"por {self.cooldown:.0f}s")
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+        elif self._state == OPEN:
+            self._opened_at = time.monotonic()
+
+    def _record_rtt(self, ms):
+        self.last_rtt_ms = ms
+        self.rtt_ms = ms if self.rtt_ms is None else self.rtt_ms + _EWMA * (ms - self.rtt_ms)
+
+    # -- reenvío ---------------------------------------------------------------
+
+    def forward(self, path, payload, headers=None, timeout=REMOTE_TIMEOUT):
+        """POST JSON al backend residencial. Devuelve el JSON de respuesta, o
+        None si no hay backend vigente, el circuito está abierto o falló."""
+        with self._lock:
+            base = self._fresh_url()
+            if not base:
+                return None
+            if not self._admit():
+                self.fast_fails += 1
+                return None
+            self.forwards += 1
+        started = time.monotonic()
+        try:
+            r = self._session.post(base.rstrip('/') + path, json=payload, headers=headers,
+                                   timeout=(REMOTE_CONNECT_TIMEOUT, timeout))
+            if r.status_code in _TUNNEL_DOWN:
+                raise RuntimeError(f'HTTP {r.status_code} del túnel')
+            result = r.json()
+        except Exception as e:
+            print(f"⚠️ Falló el reenvío al backend residencial: {e}")
+            with self._lock:
+                self.failures += 1
+                self._on_failure()
+            return None
+        with self._lock:
+            self.successes += 1
+            self._record_rtt((time.monotonic() - started) * 1000)
+            self._on_success()
+        return result
+
+    # -- sondeo ----------------------------------------------------------------
+
+    def probe(self):
+        """GET /api/health al backend registrado. True si respondió bien."""
+        with self._lock:
+            base = self._fresh_url()
+        if not base:
+            return False
+        started = time.monotonic()
+        try:
+            r = self._session.get(base.rstrip('/') + '/api/health', timeout=HEALTH_TIMEOUT)
+            ok = r.status_code == 200
+        except Exception:
+            ok = False
+        with self._lock:
+            self.probes += 1
+            if ok:
+                self.probe_rtt_ms = (time.monotonic() - started) * 1000
+                self._on_success()
+            else:
+                self.probe_failures += 1
+                self._on_failure()
+        return ok
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"⚠️ Sondeo del backend residencial: {e}")
+
+    def stats(self):
+        with self._lock:
+            attempts = self.successes + self.failures
+            return {
+                'registered': bool(self.url),
+                'fresh': bool(self._fresh_url()),
+                'age': int(time.time() - self.updated_at) if self.url else None,
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'forwards': self.forwards,
+                'successes': self.successes,
+                'failures': self.failures,
+                'fast_fails': self.fast_fails,
+                'error_rate': round(self.failures / attempts, 3) if attempts else 0.0,
+                'rtt_ms': round(self.rtt_ms, 1) if self.rtt_ms is not None else None,
+                'last_rtt_ms': round(self.last_rtt_ms, 1) if self.last_rtt_ms is not None else None,
+                'probes': self.probes,
+                'probe_failures': self.probe_failures,
+                'probe_rtt_ms': round(self.probe_rtt_ms, 1) if self.probe_rtt_ms is not None else None,
+            }
+
+
+remote_backend = RemoteBackend()
@@ -0,0 +1,167 @@
+"""Ruteo predictivo: mandar directo al backend residencial lo que va a necesitarlo.
+
+En Railway la extracción local corre siempre primero y recién después se
+reenvía por ``needs_remote`` o por un error de login. Para una story de
+Instagram o un Threads sin Playwright, esos 10-60 s de intentos locales
+están condenados de antemano. Acá se predice por clase de URL:
+
+- ``route_class``: plataforma + forma de la URL (``instagram:story``,
+  ``facebook:share`` sin resolver, ``threads:post``...).
+- Priors fijos mientras no hay datos: stories de Instagram, links de
+  compartir de Facebook que no se pudieron resolver (terminan en el login) y
+  Threads cuando este proceso no tiene Playwright van a la casa.
+- Con ROUTING_MIN_SAMPLES resultados locales de la clase manda la
+  estadística: promedio móvil de "hizo falta la casa"; si supera
+  ROUTING_REMOTE_THRESHOLD, la clase se reenvía directo.
+- Cada ROUTING_EXPLORE_EVERY pedidos reenviados de una clase, uno corre local
+  igual (si la plataforma cambió, la estadística se entera).
+- Con ROUTING_HEDGE=1 el reenvío va acompañado de un intento local
+  escalonado (common/hedge.py): gana el primero que extrae bien.
+"""
+
+import importlib.util
+import os
+import threading
+
+from common.hedge import HedgedRunner
+
+ROUTING = os.environ.get('ROUTING', '1') != '0'
+ROUTING_HEDGE = os.environ.get('ROUTING_HEDGE', '0') == '1'
+ROUTING_HEDGE_DELAY = float(os.environ.get('ROUTING_HEDGE_DELAY', '2'))
+ROUTING_MIN_SAMPLES = int(os.environ.get('ROUTING_MIN_SAMPLES', '5'))
+ROUTING_REMOTE_THRESHOLD = float(os.environ.get('ROUTING_REMOTE_THRESHOLD', '0.7'))
+ROUTING_EXPLORE_EVERY = int(os.environ.get('ROUTING_EXPLORE_EVERY', '20'))
+
+LOCAL = 'local'
+REMOTE = 'remote'
+HEDGE = 'hedge'
+
+_EWMA = 0.2
+_HAS_PLAYWRIGHT = importlib.util.find_spec('playwright') is not None
+
+
+def route_class(ref):
+    """Clase de ruteo de un MediaRef: plataforma + forma de la URL."""
+    platform = ref.platform or 'other'
+    url = ref.canonical_url.lower()
+    if platform == 'instagram':
+        if '/stories/' in url:
+            return 'instagram:story'
+        return 'instagram:post' if '/p/' in url else 'instagram:reel'
+    if platform == 'facebook':
+        if ref.is_short_link:
+            # Sigue corto después de link_resolver: redirigía al login.
+            return 'facebook:share'
+        return 'facebook:reel' if '/reel/' in url else 'facebook:video'
+    if platform == 'threads':
+        return 'threads:post'
+    return platform
+
+
+def _prior(cls):
+    """Predicción sin datos: True si la clase casi seguro necesita la casa."""
+    if cls in ('instagram:story', 'facebook:share'):
+        return True
+    if cls == 'threads:post':
+        return not _HAS_PLAYWRIGHT
+    return False
+
+
+class _ClassStats:
+    __slots__ = ('samples', 'rate', 'routed', 'explored')
+
+    def __init__(self):
+        self.samples = 0
+        self.rate = 0.0
+        self.routed = 0
+        self.explored = 0
+
+
+class RoutingPolicy:
+    def __init__(self, min_samples=ROUTING_MIN_SAMPLES, threshold=ROUTING_REMOTE_THRESHOLD,
+                 explore_every=ROUTING_EXPLORE_EVERY, hedge=ROUTING_HEDGE):
+        self.min_samples = min_samples
+        self.threshold = threshold
+        self.explore_every = explore_every
+        self.hedge_enabled = hedge
+        self._classes = {}
+        self._lock = threading.Lock()
+        self._runner = HedgedRunner('routing')
+        self.decisions = {LOCAL: 0, REMOTE: 0, HEDGE: 0}
+
+    def _stat(self, cls):
+        stat = self._classes.get(cls)
+        if stat is None:
+            stat = self._classes[cls] = _ClassStats()
+        return stat
+
+    def _predict_remote(self, cls, stat):
+        if stat.samples >= self.min_samples:
+            return stat.rate >= self.threshold
+        return _prior(cls)
+
+    def decide(self, ref):
+        """LOCAL, REMOTE (reenviar ya) o HEDGE (reenviar + local escalonado).
+        Solo tiene sentido preguntar si hay backend residencial disponible."""
+        if not ROUTING:
+            return LOCAL
+        cls = route_class(ref)
+        with self._lock:
+            stat = self._stat(cls)
+            route = LOCAL
+            if self._predict_remote(cls, stat):
+                stat.routed += 1
+                if self.explore_every and stat.routed % self.explore_every == 0:
+                    stat.explored += 1
+                else:
+                    route = HEDGE if self.hedge_enabled else REMOTE
+            self.decisions[route] += 1
+            return route
+
+    def record(self, ref, needed_remote):
+        """Resultado de una extracción local: ¿terminó necesitando la casa?"""
+        cls = route_class(ref)
+        with self._lock:
+            stat = self._stat(cls)
+            value = 1.0 if needed_remote else 0.0
+            stat.rate = value if stat.samples == 0 else stat.rate + _EWMA * (value - stat.rate)
+            stat.samples += 1
+
+    def hedge(self, forward, local, timeout=None):
+        """Reenvío y extracción local escalonada; gana el primer éxito.
+
+        Devuelve (ganador, resultado) o (None, {nombre: resultado}) con los
+        resultados (dicts) de las que terminaron sin éxito.
+        """
+        winner, result = self._runner.run(
+            [('remote', 0, lambda cancelled: forward()),
+             ('local', ROUTING_HEDGE_DELAY, lambda cancelled: local())],
+            is_valid=lambda r: bool(r and r.get('success')),
+            timeout=timeout,
+        )
+        if winner is not None:
+            return winner, result
+        return None, {name: r for name, r in result if isinstance(r, dict)}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': ROUTING,
+                'hedge': self.hedge_enabled,
+                'playwright': _HAS_PLAYWRIGHT,
+                'decisions': dict(self.decisions),
+                'classes': {
+                    cls: {
+                        'samples': stat.samples,
+                        'remote_rate': round(stat.rate, 3),
+                        'predict_remote': self._predict_remote(cls, stat),
+                        'routed': stat.routed,
+                        'explored': stat.explored,
+                    }
+                    for cls, stat in self._classes.items()
+                },
+                'hedge_runs': self._runner.stats(),
+            }
+
+
+routing_policy = RoutingPolicy()
@@ -0,0 +1,75 @@
+"""Coalescencia de llamadas concurrentes ("single-flight").
+
+Cuando un link se viraliza, muchos clientes piden /api/extract del mismo video
+al mismo tiempo y cada hilo arrancaría su propio yt-dlp / navegador. Con esto,
+el primero que llega ejecuta la extracción y el resto espera ese mismo
+resultado: una sola llamada al upstream por clave en vuelo.
+"""
+
+import copy
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Agrupa las llamadas concurrentes con la misma clave en una sola."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Ejecuta fn() una sola vez por clave en vuelo.
+
+        Los que llegan mientras la llamada está en curso reciben una copia del
+        mismo resultado (o la misma excepción). La copia evita que un hilo que
+        modifica su resultado (ej. server_off) afecte a los demás.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        if leader and not call.waiters:
+            return call.result
+        return copy.deepcopy(call.result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+            }
@@ -0,0 +1,146 @@
+"""Caché en memoria de los archivos estáticos (index.html, JS, CSS, íconos).
+
+Antes cada carga de página leía todo de disco y lo mandaba sin comprimir y
+con ``Cache-Control: no-cache`` pero sin validador, así que el navegador (y la
+app Capacitor por datos móviles) volvía a bajar todo en cada visita.
+
+- Cada archivo se carga una vez, con su huella (ETag por contenido) y sus
+  variantes gzip/brotli comprimidas UNA sola vez (brotli solo si el paquete
+  ``brotli`` está instalado).
+- Si cambia el mtime o el tamaño en disco, se recarga en el siguiente pedido.
+- ``If-None-Match`` con el ETag vigente se responde 304 sin cuerpo.
+"""
+
+import glob
+import gzip
+import hashlib
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.ico': 'image/x-icon',
+    '.svg': 'image/svg+xml',
+}
+# Tipos de texto que vale la pena comprimir (los .ico ya son binarios).
+COMPRESSIBLE = ('.html', '.js', '.css', '.svg')
+MIN_COMPRESS_SIZE = 512
+
+# Lo que se carga al arrancar (relativo a la raíz servida).
+PRELOAD_PATTERNS = ('index.html', 'favicon.svg', 'src/**/*.js', 'src/**/*.css', 'src/**/*.svg')
+
+
+class StaticAsset:
+    __slots__ = ('content_type', 'mtime_ns', 'size', 'variants')
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            body = f.read()
+        ext = os.path.splitext(path)[1].lower()
+        self.content_type = CONTENT_TYPES.get(ext, 'application/octet-stream')
+        self.mtime_ns = st.st_mtime_ns
+        self.size = st.st_size
+
+        fingerprint = hashlib.sha1(body).hexdigest()[:16]
+        # encoding -> (cuerpo, ETag). Cada variante tiene su propio ETag.
+        self.variants = {'identity': (body, f'"{fingerprint}"')}
+        if ext in COMPRESSIBLE and len(body) >= MIN_COMPRESS_SIZE:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.variants['gzip'] = (gz, f'"{fingerprint}-gz"')
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.variants['br'] = (br, f'"{fingerprint}-br"')
+
+    def matches(self, st):
+        return st.st_mtime_ns == self.mtime_ns and st.st_size == self.size
+
+    def select(self, accept_encoding):
+        """(encoding, cuerpo, ETag) de la mejor variante que acepta el
+        cliente: brotli > gzip > sin comprimir."""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return (encoding,) + self.variants[encoding]
+        return ('identity',) + self.variants['identity']
+
+
+def _parse_accept_encoding(header):
+    accepted = {}
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def etag_matches(if_none_match, etag):
+    """True si el header If-None-Match incluye el ETag (o es ``*``)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag or tag == '*':
+            return True
+    return False
+
+
+class StaticAssetCache:
+    def __init__(self):
+        self._assets = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def preload(self, root, patterns=PRELOAD_PATTERNS):
+        """Carga los assets de la app al arrancar. Devuelve cuántos cargó."""
+        count = 0
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(root, pattern), recursive=True):
+                if os.path.isfile(path):
+                    self.get(os.path.realpath(path))
+                    count += 1
+        return count
+
+    def get(self, path):
+        """Asset de ``path`` (ruta real ya validada). Lanza OSError si no existe."""
+        st = os.stat(path)
+        asset = self._assets.get(path)
+        if asset is not None and asset.matches(st):
+            return asset
+        asset = StaticAsset(path)
+        with self._lock:
+            self._assets[path] = asset
+            self.loads += 1
+        return asset
+
+    def stats(self):
+        with self._lock:
+            return {
+                'assets': len(self._assets),
+                'loads': self.loads,
+                'bytes': sum(a.size for a in self._assets.values()),
+                'brotli': brotli is not None,
+            }
+
+
+static_assets = StaticAssetCache()
@@ -0,0 +1,208 @@
+"""Registro de tareas de descarga: thread-safe, compacto y con vencimiento.
+
+Reemplaza al dict global ``download_tasks``:
+
+- Un lock protege todas las lecturas/escrituras (handlers HTTP y workers de
+  descarga las tocan a la vez).
+- Cada tarea es un TaskRecord con ``__slots__`` (sin dict por instancia).
+- Las tareas terminadas (completed/error/cancelled) vencen a los
+  TASK_TTL segundos y, además, se conservan como máximo TASK_MAX_FINISHED
+  (LRU). Un hilo "reaper" las barre periódicamente y ``on_evict`` borra su
+  archivo temporal: la memoria y el disco quedan planos aunque el cliente
+  nunca llame a /api/download_delete.
+- ``stream`` (privado, fuera del JSON) guarda lo necesario para generar el
+  archivo al vuelo en vez de servirlo de disco (galerías en ZIP streaming).
+- Cada cambio incrementa la versión de la tarea y despierta a quien espere
+  en ``wait_for_change`` (stream SSE de progreso).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TASK_TTL = int(os.environ.get('TASK_TTL', '3600'))
+TASK_MAX_FINISHED = int(os.environ.get('TASK_MAX_FINISHED', '500'))
+TASK_REAP_INTERVAL = 60
+
+FINAL_STATUSES = frozenset(('completed', 'error', 'cancelled'))
+
+# Campos públicos, en el orden del JSON de /api/download_status.
+_FIELDS = ('status', 'progress', 'file_path', 'filename', 'error')
+
+
+class TaskRecord:
+    __slots__ = _FIELDS + ('finished_at', 'version', 'stream')
+
+    def __init__(self, filename, status):
+        self.status = status
+        self.progress = 0
+        self.file_path = None
+        self.filename = filename
+        self.error = None
+        self.finished_at = None
+        self.version = 1
+        self.stream = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in _FIELDS}
+
+    def detach(self):
+        """Copia de una tarea que sale del registro: incluye ``stream`` para
+        que quien la suelta pueda cerrarlo."""
+        task = self.to_dict()
+        if self.stream is not None:
+            task['stream'] = self.stream
+        return task
+
+
+class TaskRegistry:
+    def __init__(self, ttl=TASK_TTL, max_finished=TASK_MAX_FINISHED, on_evict=None):
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self.on_evict = on_evict
+        self._tasks = {}
+        # task_id de las tareas terminadas, de la menos a la más reciente.
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._reaper = None
+        self.evicted = 0
+
+    def create(self, task_id, filename, status='queued'):
+        with self._lock:
+            self._tasks[task_id] = TaskRecord(filename, status)
+
+    def get(self, task_id):
+        """Copia de la tarea como dict, o None si no existe."""
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is None:
+                return None
+            if task_id in self._finished:
+                self._finished.move_to_end(task_id)
+            return record.to_dict()
+
+    def __contains__(self, task_id):
+        with self._lock:
+            return task_id in self._tasks
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tasks)
+
+    def status(self, task_id):
+        with self._lock:
+            record = self._tasks.get(task_id)
+            return record.status if record else None
+
+    def is_cancelled(self, task_id):
+        return self.status(task_id) == 'cancelled'
+
+    def stream(self, task_id):
+        """Datos del archivo generado al vuelo, o None si se sirve de disco."""
+        with self._lock:
+            record = self._tasks.get(task_id)
+            return record.stream if record else None
+
+    def update(self, task_id, **fields):
+        """Actualiza campos de la tarea. False si ya no existe (borrada o
+        vencida)."""
+        evicted = []
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is None:
+                return False
+            for name, value in fields.items():
+                setattr(record, name, value)
+            record.version += 1
+            if record.status in FINAL_STATUSES:
+                if record.finished_at is None:
+                    record.finished_at = time.time()
+                self._finished[task_id] = None
+                self._finished.move_to_end(task_id)
+                while len(self._finished) > self.max_finished:
+                    old_id, _ = self._finished.popitem(last=False)
+                    evicted.append(self._tasks.pop(old_id).detach())
+            else:
+                record.finished_at = None
+                self._finished.pop(task_id, None)
+            self._changed.notify_all()
+        self._evict(evicted)
+        return True
+
+    def wait_for_change(self, task_id, version, timeout):
+        """Espera (hasta timeout) a que la tarea supere ``version``.
+
+        Devuelve (copia de la tarea, versión actual); (None, 0) si la tarea ya
+        no existe. Si vence el timeout sin cambios, la versión es la misma.
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                record = self._tasks.get(task_id)
+                if record is None:
+                    return None, 0
+                remaining = deadline - time.monotonic()
+                if record.version > version or remaining <= 0:
+                    return record.to_dict(), record.version
+                self._changed.wait(remaining)
+
+    def pop(self, task_id):
+        """Quita la tarea y devuelve su copia (o None). No llama a on_evict."""
+        with self._lock:
+            record = self._tasks.pop(task_id, None)
+            self._finished.pop(task_id, None)
+            self._changed.notify_all()
+            return record.detach() if record else None
+
+    def reap(self, now=None):
+        """Quita las tareas terminadas hace más de ttl segundos."""
+        now = now or time.time()
+        evicted = []
+        with self._lock:
+            while self._finished:
+                task_id = next(iter(self._finished))
+                record = self._tasks[task_id]
+                # El orden es de uso, no de fin: alcanza con parar en la
+                # primera vigente, las demás se revisan en la próxima pasada.
+                if now - record.finished_at < self.ttl:
+                    break
+                del self._finished[task_id]
+                evicted.append(self._tasks.pop(task_id).detach())
+            if evicted:
+                self._changed.notify_all()
+        self._evict(evicted)
+        return len(evicted)
+
+    def _evict(self, evicted):
+        if not evicted:
+            return
+        with self._lock:
+            self.evicted += len(evicted)
+        if self.on_evict:
+            for task in evicted:
+                try:
+                    self.on_evict(task)
+                except Exception:
+                    pass
+
+    def start_reaper(self, interval=TASK_REAP_INTERVAL):
+        if self._reaper is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                self.reap()
+
+        self._reaper = threading.Thread(target=_loop, name='task-reaper', daemon=True)
+        self._reaper.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tasks': len(self._tasks),
+                'finished': len(self._finished),
+                'evicted': self.evicted,
+            }
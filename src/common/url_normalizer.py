@@ -0,0 +1,157 @@
+"""Normalización de URLs: (plataforma, id del medio, URL canónica).
+
+Los usuarios pegan el mismo video con ruido distinto (``?igsh=``,
+``is_from_webapp=1&sender_device=pc``, ``si=``, ``/reels/`` vs ``/reel/``,
+``m.`` / ``web.``, ``youtu.be``...). Sin normalizar, cada variante es una clave
+distinta para la caché, la coalescencia y las descargas. Acá una única tabla
+de patrones compilados traduce cualquier variante a la misma identidad.
+
+Reglas:
+- Si la URL coincide con un patrón de la tabla se reconstruye la URL canónica
+  a partir del id (sin query de tracking).
+- Los links cortos que no se pueden resolver sin red (vm.tiktok.com, pin.it,
+  fb.watch, facebook.com/share/...) conservan su código como id, con prefijo
+  ``short:``; el resolvedor de links cortos los traduce después.
+- Si no coincide ningún patrón, la URL se conserva tal cual salvo los
+  parámetros de tracking conocidos (NUNCA se tocan las firmas de un CDN).
+"""
+
+import re
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+class MediaRef(NamedTuple):
+    platform: Optional[str]
+    media_id: Optional[str]
+    canonical_url: str
+
+    @property
+    def key(self):
+        """Clave estable para cachés/deduplicación."""
+        if self.platform and self.media_id:
+            return f'{self.platform}:{self.media_id}'
+        return self.canonical_url
+
+    @property
+    def is_short_link(self):
+        return bool(self.media_id and self.media_id.startswith('short:'))
+
+
+# Parámetros de query que solo identifican al que compartió el link.
+_TRACKING_PARAMS = {
+    'igsh', 'igshid', 'img_index', 'si', 'feature', 'pp', 'is_from_webapp',
+    'sender_device', 'sender_web_id', 'share_app_id', 'share_link_id',
+    'share_item_id', 'social_share_type', 'source', 'embed_source', 'web_id',
+    '_r', '_t', 'tt_from', 'u_code', 'mibextid', 'rdid', 'fbclid', 'gclid',
+    's', 't', 'ref', 'ref_src', 'ref_url', 'invite_code', 'utm_source',
+    'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'xmt', 'slof',
+}
+
+# CDNs con URLs firmadas: su query es la firma, no se toca.
+_CDN_HOSTS = ('cdninstagram.com', 'fbcdn.net', 'googlevideo.com', 'twimg.com',
+              'pinimg.com', 'tiktokcdn.com', 'tiktokcdn-us.com', 'licdn.com',
+              'ttvnw.net', 'jtvnw.net')
+
+# Dominios -> plataforma (mismo orden que el selector de extractores).
+_PLATFORM_HOSTS = [(platform, re.compile(rx, re.I)) for platform, rx in (
+    ('threads', r'(?:^|\.)threads\.(?:com|net)$'),
+    ('instagram', r'(?:^|\.)(?:cdn)?instagram\.com$'),
+    ('twitch', r'(?:^|\.)twitch\.(?:tv|com)$'),
+    ('linkedin', r'(?:^|\.)linkedin\.com$'),
+    ('x', r'(?:^|\.)(?:x|twitter)\.com$'),
+    ('tiktok', r'(?:^|\.)tiktok\.com$'),
+    ('facebook', r'(?:^|\.)(?:facebook\.com|fb\.watch)$'),
+    ('youtube', r'(?:^|\.)(?:youtube\.com|youtu\.be)$'),
+    ('pinterest', r'(?:^|\.)(?:pinterest\.[a-z]{2,3}(?:\.[a-z]{2})?|pin\.it)$'),
+)]
+
+# (plataforma, patrón sobre host+path[+query], plantilla canónica o None).
+# Los grupos con nombre se usan en la plantilla; ``id`` es el id del medio.
+_PATTERNS = [(platform, re.compile(rx, re.I), template) for platform, rx, template in (
+    ('youtube', r'^(?:www\.|m\.|music\.)?youtube\.com/shorts/(?P<id>[\w-]{11})',
+     'https://www.youtube.com/shorts/{id}'),
+    ('youtube', r'^(?:www\.|m\.|music\.)?youtube\.com/(?:watch/?\?(?:.*&)?v=|embed/|live/|v/)(?P<id>[\w-]{11})',
+     'https://www.youtube.com/watch?v={id}'),
+    ('youtube', r'^youtu\.be/(?P<id>[\w-]{11})',
+     'https://www.youtube.com/watch?v={id}'),
+    ('instagram', r'^(?:www\.|m\.)?instagram\.com/(?:[\w.]+/)?(?:reels?|tv)/(?P<id>[\w-]+)',
+     'https://www.instagram.com/reel/{id}/'),
+    ('instagram', r'^(?:www\.|m\.)?instagram\.com/(?:[\w.]+/)?p/(?P<id>[\w-]+)',
+     'https://www.instagram.com/p/{id}/'),
+    ('instagram', r'^(?:www\.|m\.)?instagram\.com/stories/(?P<user>[\w.]+)/(?P<id>\d+)',
+     'https://www.instagram.com/stories/{user}/{id}/'),
+    ('threads', r'^(?:www\.)?threads\.(?:net|com)/@(?P<user>[\w.]+)/post/(?P<id>[\w-]+)',
+     'https://www.threads.com/@{user}/post/{id}'),
+    ('tiktok', r'^(?:www\.|m\.)?tiktok\.com/@(?P<user>[\w.-]+)/(?P<kind>video|photo)/(?P<id>\d+)',
+     'https://www.tiktok.com/@{user}/{kind}/{id}'),
+    ('tiktok', r'^(?:vm|vt)\.tiktok\.com/(?P<short>[\w-]+)', None),
+    ('tiktok', r'^(?:www\.|m\.)?tiktok\.com/t/(?P<short>[\w-]+)', None),
+    ('x', r'^(?:www\.|mobile\.)?(?:x|twitter)\.com/(?P<user>\w+)/status(?:es)?/(?P<id>\d+)',
+     'https://x.com/{user}/status/{id}'),
+    ('facebook', r'^(?:www\.|m\.|web\.|mbasic\.)?facebook\.com/reel/(?P<id>\d+)',
+     'https://www.facebook.com/reel/{id}'),
+    ('facebook', r'^(?:www\.|m\.|web\.|mbasic\.)?facebook\.com/(?:watch/?\?(?:.*&)?v=|[\w.-]+/videos/(?:[\w.-]+/)?)(?P<id>\d+)',
+     'https://www.facebook.com/watch/?v={id}'),
+    ('facebook', r'^(?:www\.|m\.|web\.)?facebook\.com/share/(?P<kind>[vrp])/(?P<short>[\w-]+)', None),
+    ('facebook', r'^fb\.watch/(?P<short>[\w-]+)', None),
+    ('pinterest', r'^(?:[a-z]{2,3}\.|www\.)?pinterest\.[a-z.]+/pin/(?:[\w-]*--)?(?P<id>\d+)',
+     'https://www.pinterest.com/pin/{id}/'),
+    ('pinterest', r'^pin\.it/(?P<short>[\w-]+)', None),
+    ('twitch', r'^clips\.twitch\.tv/(?P<id>[\w-]+)',
+     'https://clips.twitch.tv/{id}'),
+    ('twitch', r'^(?:www\.|m\.)?twitch\.tv/[\w]+/clip/(?P<id>[\w-]+)',
+     'https://clips.twitch.tv/{id}'),
+    ('twitch', r'^(?:www\.|m\.)?twitch\.tv/videos/(?P<id>\d+)',
+     'https://www.twitch.tv/videos/{id}'),
+    ('linkedin', r'^(?:www\.)?linkedin\.com/posts/[^?#]*?(?P<kind>activity|ugcPost|share)-(?P<id>\d+)', None),
+    ('linkedin', r'^(?:www\.)?linkedin\.com/feed/update/urn:li:(?P<kind>activity|ugcPost|share):(?P<id>\d+)', None),
+)]
+
+
+def detect_platform(url):
+    """Plataforma por dominio, o None si no es soportada."""
+    host = (urlsplit(url).hostname or '').lower()
+    for platform, pattern in _PLATFORM_HOSTS:
+        if pattern.search(host):
+            return platform
+    return None
+
+
+def _is_cdn(host):
+    return any(host == d or host.endswith('.' + d) for d in _CDN_HOSTS)
+
+
+def strip_tracking(url):
+    """Quita los parámetros de tracking y el fragmento, conservando el resto.
+    Las URLs de CDN y de dominios no soportados se devuelven intactas."""
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if _is_cdn(host) or not detect_platform(url):
+        return url
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith('utm_')]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def normalize(url):
+    """Mapea una URL a MediaRef(plataforma, id del medio, URL canónica)."""
+    url = (url or '').strip()
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    target = host + parts.path + (f'?{parts.query}' if parts.query else '')
+
+    for platform, pattern, template in _PATTERNS:
+        m = pattern.match(target)
+        if not m:
+            continue
+        groups = m.groupdict()
+        if groups.get('short'):
+            return MediaRef(platform, f"short:{groups['short']}", strip_tracking(url))
+        media_id = groups['id']
+        if groups.get('kind') and platform == 'linkedin':
+            media_id = f"{groups['kind']}:{media_id}"
+        canonical = template.format(**groups) if template else strip_tracking(url)
+        return MediaRef(platform, media_id, canonical)
+
+    return MediaRef(detect_platform(url), None, strip_tracking(url))
@@ -0,0 +1,265 @@
+"""Cola de trabajos para backends residenciales en modo "pull".
+
+Con el túnel, cada reenvío es un pedido HTTPS entrante a la PC de casa a
+través de una URL trycloudflare.com que cambia y se re-registra cada pocos
+minutos. En modo pull la casa es la que llama: home_tunnel.py --pull mantiene
+un long-poll contra Railway (``/api/worker/claim``), se lleva los trabajos
+pendientes (varios por ida y vuelta), los resuelve contra su app local y
+devuelve los resultados (``/api/worker/result``). Sin túnel ni URL que cambie.
+
+- ``submit``: el hilo del pedido encola y espera el resultado (o el timeout).
+- ``claim``: espera hasta ``wait`` segundos a que haya trabajos y entrega
+  hasta ``max_jobs``. Si el worker que reclamó un trabajo deja de pedir y
+  de latir durante WORKER_LEASE segundos (se cayó), el trabajo se re-encola
+  una vez para otro worker. WORKER_LEASE tiene que ser menor que la mitad de
+  la espera de ``submit`` (REMOTE_TIMEOUT): el re-encolado solo sirve si el
+  pedido original todavía espera.
+- ``available``: hay un worker vivo si alguno reclamó (o latió con
+  ``max=0`` mientras tiene todos sus slots ocupados) hace menos de
+  WORKER_STALE segundos; si no, el servidor usa el túnel como antes. Los
+  workers vencidos se olvidan (cada reinicio de home_tunnel trae otro nombre).
+- Circuit breaker (mismos umbrales que common/remote_backend.py): un worker
+  que reclama pero se cuelga sigue latiendo, así que también cuentan los
+  resultados. Tras REMOTE_BREAKER_THRESHOLD trabajos seguidos sin resultado
+  (timeout del pedido o lease abandonado dos veces) la cola deja de estar
+  disponible por REMOTE_BREAKER_COOLDOWN segundos; después pasa UN trabajo
+  de prueba y el primer resultado la vuelve a cerrar.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from common.remote_backend import (CLOSED, HALF_OPEN, OPEN, REMOTE_BREAKER_COOLDOWN,
+                                   REMOTE_BREAKER_THRESHOLD)
+
+WORKER_POLL_WAIT = float(os.environ.get('WORKER_POLL_WAIT', '25'))
+WORKER_STALE = float(os.environ.get('WORKER_STALE', '60'))
+WORKER_LEASE = float(os.environ.get('WORKER_LEASE', '30'))
+WORKER_MAX_BATCH = int(os.environ.get('WORKER_MAX_BATCH', '4'))
+
+
+class _Job:
+    __slots__ = ('id', 'path', 'payload', 'created', 'claimed_at', 'worker',
+                 'attempts', 'result', 'done')
+
+    def __init__(self, path, payload):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.payload = payload
+        self.created = time.monotonic()
+        self.claimed_at = None
+        self.worker = None
+        self.attempts = 0
+        self.result = None
+        self.done = threading.Event()
+
+
+class JobQueue:
+    def __init__(self, lease=WORKER_LEASE, stale=WORKER_STALE,
+                 threshold=REMOTE_BREAKER_THRESHOLD, cooldown=REMOTE_BREAKER_COOLDOWN):
+        self.lease = lease
+        self.stale = stale
+        self.threshold = max(threshold, 1)
+        self.cooldown = cooldown
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.fast_fails = 0
+        self._pending = deque()
+        self._inflight = {}
+        self._jobs = {}     # id -> trabajo todavía esperado (pendiente o reclamado)
+        self._workers = {}  # nombre -> último claim o latido (monotonic)
+        self._polling = {}  # nombre -> long-polls abiertos ahora mismo
+        self._cond = threading.Condition()
+        self.submitted = 0
+        self.completed = 0
+        self.expired = 0
+        self.requeued = 0
+        self.claims = 0
+        self.heartbeats = 0
+        self.claim_wait_ms = 0.0
+        self.round_trip_ms = 0.0
+
+    def _prune(self, now):
+        """Olvida (con el lock) los workers que no dan señales hace rato."""
+        for worker, seen in list(self._workers.items()):
+            if now - seen >= self.stale and not self._polling.get(worker):
+                del self._workers[worker]
+                self._polling.pop(worker, None)
+
+    def available(self):
+        """True si algún worker reclamó trabajos (o latió) hace poco y el
+        breaker dejaría pasar un trabajo."""
+        now = time.monotonic()
+        with self._cond:
+            self._prune(now)
+            if not self._workers:
+                return False
+            if self._state == OPEN:
+                return now - self._opened_at >= self.cooldown
+            return not (self._state == HALF_OPEN and self._trial_running)
+
+    # -- breaker (con el lock) ---------------------------------------------------
+
+    def _admit(self, now):
+        if self._state == OPEN:
+            if now - self._opened_at < self.cooldown:
+                return False
+            self._state = HALF_OPEN
+            self._trial_running = False
+        if self._state == HALF_OPEN:
+            if self._trial_running:
+                return False
+            self._trial_running = True
+        return True
+
+    def _on_success(self):
+        if self._state != CLOSED:
+            print("🏠 Worker residencial respondió: cola habilitada")
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._trial_running = False
+
+    def _on_failure(self):
+        self._consecutive_failures += 1
+        self._trial_running = False
+        if self._state == HALF_OPEN or (self._state == CLOSED
+                                        and self._consecutive_failures >= self.threshold):
+            if self._state != OPEN:
+                print(f"🔌 Worker residencial sin resultados: cola deshabilitada "
+                      f"por {self.cooldown:.0f}s")
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+
+    def submit(self, path, payload, timeout):
+        """Encola un trabajo y espera su resultado. None si no volvió a tiempo
+        (o al instante, si el breaker está abierto)."""
+        job = _Job(path, payload)
+        with self._cond:
+            if not self._admit(time.monotonic()):
+                self.fast_fails += 1
+                return None
+            self._pending.append(job)
+            self._jobs[job.id] = job
+            self.submitted += 1
+            self._cond.notify_all()
+        if job.done.wait(timeout):
+            return job.result
+        with self._cond:
+            # Sin resultado: que ningún worker lo tome (o lo devuelva) tarde.
+            try:
+                self._pending.remove(job)
+            except ValueError:
+                pass
+            self._inflight.pop(job.id, None)
+            if self._jobs.pop(job.id, None) is not None:
+                self.expired += 1
+                self._on_failure()
+        return None
+
+    def _worker_lost(self, worker, now):
+        if self._polling.get(worker):
+            return False
+        return now - self._workers.get(worker, 0.0) > self.lease
+
+    def _reclaim_expired(self, now):
+        """Re-encola (una vez) los trabajos de workers que dejaron de dar
+        señales; el segundo abandono se da por fallido."""
+        for job_id, job in list(self._inflight.items()):
+            if not self._worker_lost(job.worker, now):
+                continue
+            del self._inflight[job_id]
+            # El worker que lo tenía no vuelve a contar como disponible.
+            self._workers.pop(job.worker, None)
+            if job.attempts < 2:
+                self._pending.appendleft(job)
+                self.requeued += 1
+            else:
+                del self._jobs[job_id]
+                self._on_failure()
+                job.done.set()  # result None: el pedido no espera hasta el timeout
+
+    def claim(self, worker, max_jobs=WORKER_MAX_BATCH, wait=WORKER_POLL_WAIT):
+        """Hasta max_jobs trabajos [(id, path, payload)], esperando como mucho
+        ``wait`` segundos a que aparezca alguno. ``max_jobs=0`` es solo un
+        latido: el worker está vivo pero sin lugar para más."""
+        max_jobs = max(0, min(int(max_jobs), WORKER_MAX_BATCH))
+        if max_jobs == 0:
+            with self._cond:
+                self._workers[worker] = time.monotonic()
+                self.heartbeats += 1
+            return []
+        deadline = time.monotonic() + max(0.0, min(float(wait), WORKER_POLL_WAIT))
+        with self._cond:
+            self._polling[worker] = self._polling.get(worker, 0) + 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._workers[worker] = now
+                    self._reclaim_expired(now)
+                    if self._pending or now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+            finally:
+                self._polling[worker] -= 1
+                # Visto hasta el final del long-poll (el próximo empieza ya).
+                self._workers[worker] = time.monotonic()
+                self._prune(self._workers[worker])
+            jobs = []
+            while self._pending and len(jobs) < max_jobs:
+                job = self._pending.popleft()
+                job.claimed_at = now
+                job.worker = worker
+                job.attempts += 1
+                self._inflight[job.id] = job
+                self.claim_wait_ms += (now - job.created) * 1000
+                self.claims += 1
+                jobs.append((job.id, job.path, job.payload))
+            return jobs
+
+    def complete(self, job_id, result):
+        """Resultado de un trabajo reclamado. False si ya no se esperaba.
+        Se acepta aunque el trabajo se haya re-encolado (el worker lento
+        igual terminó)."""
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return False
+            self._inflight.pop(job_id, None)
+            try:
+                self._pending.remove(job)
+            except ValueError:
+                pass
+            self.completed += 1
+            self.round_trip_ms += (time.monotonic() - job.created) * 1000
+            self._on_success()
+        job.result = result
+        job.done.set()
+        return True
+
+    def stats(self):
+        now = time.monotonic()
+        with self._cond:
+            self._prune(now)
+            return {
+                'workers': sorted(self._workers),
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'fast_fails': self.fast_fails,
+                'pending': len(self._pending),
+                'inflight': len(self._inflight),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'expired': self.expired,
+                'requeued': self.requeued,
+                'heartbeats': self.heartbeats,
+                'avg_claim_wait_ms': round(self.claim_wait_ms / self.claims, 1) if self.claims else None,
+                'avg_round_trip_ms': round(self.round_trip_ms / self.completed, 1) if self.completed else None,
+            }
+
+
+job_queue = JobQueue()
@@ -0,0 +1,267 @@
+"""Pool de procesos yt-dlp "calientes" para extraer metadatos.
+
+Antes cada extracción hacía ``subprocess.run(YTDLP_CMD + [...])``: arrancar el
+intérprete e importar el registro de extractores de yt-dlp cuesta 1-2 s por
+intento (y Facebook hace hasta 4 intentos por link). Las llamadas en proceso
+(``YoutubeDL(...).extract_info``) además retienen el GIL mientras parsean y
+frenan a los demás hilos del servidor.
+
+Este pool mantiene N procesos worker (common/ytdlp_worker.py) con yt-dlp ya
+importado, que reciben trabajos por un pipe y devuelven el info dict
+proyectado.
+
+- Timeout por trabajo: si vence, el worker se mata (no queda colgado) y se
+  lanza subprocess.TimeoutExpired, igual que hacía subprocess.run.
+- Cancelación: ``run(..., cancelled=evento)`` (estrategias perdedoras de
+  common/hedge.py) deja de esperar el slot o mata al worker a mitad del
+  trabajo apenas se marca el evento; el slot queda libre para otro pedido.
+- Reciclado: un worker se reemplaza tras YTDLP_POOL_MAX_JOBS trabajos o si su
+  memoria residente supera YTDLP_POOL_MAX_RSS_MB.
+- YTDLP_POOL_SIZE=0 desactiva el pool: se extrae en el proceso actual.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+from common.ytdlp_worker import normalize_opts, project_info
+
+YTDLP_POOL_SIZE = int(os.environ.get('YTDLP_POOL_SIZE', '2'))
+YTDLP_POOL_MAX_JOBS = int(os.environ.get('YTDLP_POOL_MAX_JOBS', '50'))
+YTDLP_POOL_MAX_RSS_MB = int(os.environ.get('YTDLP_POOL_MAX_RSS_MB', '400'))
+
+# Cada cuánto se mira el evento de cancelación mientras se espera.
+_CANCEL_POLL = 0.25
+
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ytdlp_worker.py')
+
+
+class YtdlpError(Exception):
+    """Error de extracción reportado por yt-dlp (el mensaje es el de yt-dlp)."""
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class YtdlpResult:
+    """Resultado con la misma forma que usaban los extractores con
+    subprocess.run: returncode 0 = éxito, stderr = mensaje de error."""
+
+    __slots__ = ('returncode', 'info', 'stderr')
+
+    def __init__(self, returncode, info=None, stderr=''):
+        self.returncode = returncode
+        self.info = info
+        self.stderr = stderr
+
+
+class _Worker:
+    def __init__(self):
+        env = dict(os.environ, PYTHONIOENCODING='utf-8')
+        self.proc = subprocess.Popen(
+            [sys.executable, _WORKER_SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', env=env,
+        )
+        self.replies = queue.Queue()
+        self.jobs = 0
+        self.rss_mb = 0.0
+        threading.Thread(target=self._read_replies, daemon=True).start()
+
+    def _read_replies(self):
+        for line in self.proc.stdout:
+            self.replies.put(line)
+        self.replies.put(None)  # EOF: el proceso murió
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def _wait_reply(self, timeout, cancelled):
+        if cancelled is None:
+            return self.replies.get(timeout=timeout)
+        deadline = time.monotonic() + timeout
+        while True:
+            if cancelled.is_set():
+                raise _Cancelled()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise queue.Empty()
+            try:
+                return self.replies.get(timeout=min(_CANCEL_POLL, remaining))
+            except queue.Empty:
+                continue
+
+    def run(self, request, timeout, cancelled=None):
+        """Manda un trabajo ya serializado (una línea JSON) y espera la respuesta."""
+        self.proc.stdin.write(request + '\n')
+        self.proc.stdin.flush()
+        line = self._wait_reply(timeout, cancelled)
+        if line is None:
+            raise EOFError('El worker de yt-dlp terminó inesperadamente')
+        self.jobs += 1
+        reply = json.loads(line)
+        self.rss_mb = reply.get('rss_mb') or 0.0
+        return reply
+
+    def close(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class YtdlpPool:
+    def __init__(self, size=YTDLP_POOL_SIZE, max_jobs=YTDLP_POOL_MAX_JOBS,
+                 max_rss_mb=YTDLP_POOL_MAX_RSS_MB):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self._slots = threading.Semaphore(max(size, 1))
+        self._idle = []
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.spawned = 0
+        self.cancelled = 0
+
+    def warm(self):
+        """Arranca los workers de antemano para que el primer pedido no pague
+        el import de yt-dlp."""
+        if self.size <= 0:
+            return
+        with self._lock:
+            missing = self.size - len(self._idle)
+        for _ in range(missing):
+            worker = _Worker()
+            with self._lock:
+                self.spawned += 1
+                self._idle.append(worker)
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive():
+                    return worker
+        worker = _Worker()
+        with self._lock:
+            self.spawned += 1
+        return worker
+
+    def _checkin(self, worker):
+        if (not worker.alive() or worker.jobs >= self.max_jobs
+                or (self.max_rss_mb and worker.rss_mb > self.max_rss_mb)):
+            worker.close()
+            with self._lock:
+                self.recycled += 1
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def _acquire_slot(self, cancelled):
+        if cancelled is None:
+            self._slots.acquire()
+            return True
+        while not self._slots.acquire(timeout=_CANCEL_POLL):
+            if cancelled.is_set():
+                return False
+        return True
+
+    def _cancelled_result(self):
+        with self._lock:
+            self.cancelled += 1
+        return YtdlpResult(1, stderr='ERROR: cancelado')
+
+    def run(self, url, opts=None, timeout=60, cancelled=None):
+        """Extrae metadatos de url (sin descargar). Nunca lanza por errores de
+        yt-dlp: devuelve YtdlpResult con returncode != 0 y el mensaje en
+        stderr. Lanza subprocess.TimeoutExpired si vence el timeout.
+
+        ``cancelled`` (threading.Event, opcional): si se marca, se abandona la
+        espera del slot o se mata al worker y se devuelve un error."""
+        opts = opts or {}
+        with self._lock:
+            self.jobs += 1
+        if self.size <= 0:
+            return self._run_in_process(url, opts)
+        # Serializar antes de tomar slot y worker: un opts no serializable no
+        # debe dejar un worker prestado para siempre.
+        try:
+            request = json.dumps({'url': url, 'opts': opts})
+        except (TypeError, ValueError) as e:
+            return YtdlpResult(1, stderr=f'ERROR: opciones no serializables: {e}')
+
+        if not self._acquire_slot(cancelled):
+            return self._cancelled_result()
+        try:
+            if cancelled is not None and cancelled.is_set():
+                return self._cancelled_result()
+            worker = self._checkout()
+            try:
+                reply = worker.run(request, timeout, cancelled)
+            except _Cancelled:
+                # La respuesta llegaría tarde y a nadie: matar y liberar el slot.
+                worker.close()
+                return self._cancelled_result()
+            except queue.Empty:
+                worker.close()
+                with self._lock:
+                    self.timeouts += 1
+                raise subprocess.TimeoutExpired(['yt-dlp', url], timeout)
+            except (OSError, EOFError, ValueError) as e:
+                worker.close()
+                return YtdlpResult(1, stderr=f'ERROR: {e}')
+            except BaseException:
+                # Estado desconocido (trabajo a medias): no vuelve al pool.
+                worker.close()
+                raise
+            self._checkin(worker)
+        finally:
+            self._slots.release()
+
+        if reply.get('ok'):
+            return YtdlpResult(0, info=reply.get('info'))
+        return YtdlpResult(1, stderr=reply.get('error', ''))
+
+    def extract_info(self, url, opts=None, timeout=60):
+        """Como YoutubeDL.extract_info(url, download=False): devuelve el info
+        dict proyectado o lanza YtdlpError con el mensaje de yt-dlp."""
+        result = self.run(url, opts, timeout)
+        if result.returncode != 0:
+            raise YtdlpError(result.stderr)
+        return result.info
+
+    @staticmethod
+    def _run_in_process(url, opts):
+        from yt_dlp import YoutubeDL
+        params = dict({'quiet': True, 'no_warnings': True, 'skip_download': True},
+                      **normalize_opts(opts))
+        try:
+            with YoutubeDL(params) as ydl:
+                info = ydl.extract_info(url, download=False)
+                info = ydl.sanitize_info(info) if info else None
+            return YtdlpResult(0, info=project_info(info))
+        except Exception as e:
+            return YtdlpResult(1, stderr=str(e))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'jobs': self.jobs,
+                'timeouts': self.timeouts,
+                'recycled': self.recycled,
+                'spawned': self.spawned,
+                'cancelled': self.cancelled,
+            }
+
+
+ytdlp_pool = YtdlpPool()
@@ -0,0 +1,108 @@
+"""Proceso worker de yt-dlp de larga vida (lo lanza ytdlp_pool.py).
+
+Importa yt-dlp y su registro de extractores UNA vez al arrancar y después
+atiende trabajos de extracción por stdin/stdout, una línea JSON por trabajo:
+
+    -> {"url": "...", "opts": {...}}
+    <- {"ok": true, "info": {...}, "rss_mb": 123.4}
+    <- {"ok": false, "error": "ERROR: ...", "rss_mb": 123.4}
+
+Devuelve un info dict PROYECTADO (solo los campos que usan los extractores),
+así el pipe no transporta los cientos de KB de un info dict completo. La
+forma se conserva: ``_type`` y ``entries`` (proyectadas igual, para
+playlists y carruseles) y ``requested_formats`` (selecciones
+bestvideo+bestaudio) siguen ahí, como con ``--dump-json``.
+
+Se ejecuta como script (``python ytdlp_worker.py``): no depende del paquete
+``common`` para que arranque rápido y sin efectos secundarios.
+"""
+
+import json
+import os
+import sys
+
+# Campos del info dict que leen los extractores (ver */*_extractor.py).
+INFO_KEYS = (
+    '_type', 'playlist_count', 'format_id', 'id', 'title', 'description', 'uploader', 'uploader_id', 'uploader_url',
+    'channel', 'upload_date', 'duration', 'view_count', 'like_count',
+    'comment_count', 'tags', 'thumbnail', 'thumbnails', 'webpage_url',
+    'url', 'video_url', 'ext', 'width', 'height', 'filesize', 'filesize_approx',
+    'abr', 'tbr', 'vcodec', 'acodec', 'protocol', 'format_note',
+)
+FORMAT_KEYS = (
+    'format_id', 'url', 'ext', 'protocol', 'width', 'height', 'fps', 'tbr',
+    'abr', 'vcodec', 'acodec', 'audio_channels', 'filesize', 'filesize_approx',
+    'format_note',
+)
+
+
+def project_info(info):
+    """Reduce un info dict de yt-dlp a los campos que usamos."""
+    if not info:
+        return info
+    out = {k: info[k] for k in INFO_KEYS if k in info}
+    if 'thumbnails' in out:
+        out['thumbnails'] = [{'url': t.get('url')} for t in out['thumbnails'] or []]
+    for key in ('formats', 'requested_formats'):
+        if info.get(key):
+            out[key] = [{k: f[k] for k in FORMAT_KEYS if k in f} for f in info[key]]
+    if info.get('entries'):
+        out['entries'] = [project_info(entry) for entry in info['entries'] if entry]
+    return out
+
+
+def normalize_opts(opts):
+    """JSON no tiene tuplas: yt-dlp espera cookiesfrombrowser como tupla."""
+    opts = dict(opts)
+    if isinstance(opts.get('cookiesfrombrowser'), list):
+        opts['cookiesfrombrowser'] = tuple(opts['cookiesfrombrowser'])
+    return opts
+
+
+def rss_mb():
+    """Memoria residente actual del proceso (MB). 0 si no se puede medir."""
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa KB, macOS bytes.
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except Exception:
+        return 0.0
+
+
+def main():
+    # stdout es el canal del protocolo: cualquier print de yt-dlp va a stderr.
+    proto = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    sys.stdout = sys.stderr
+
+    from yt_dlp import YoutubeDL
+    from yt_dlp.extractor import gen_extractor_classes
+    # Cargar el registro completo de extractores ahora y no en el primer job.
+    gen_extractor_classes()
+
+    base_opts = {'quiet': True, 'no_warnings': True, 'skip_download': True}
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            opts = dict(base_opts, **normalize_opts(job.get('opts') or {}))
+            with YoutubeDL(opts) as ydl:
+                info = ydl.extract_info(job['url'], download=False)
+                info = ydl.sanitize_info(info) if info else None
+            reply = {'ok': True, 'info': project_info(info)}
+        except Exception as e:
+            reply = {'ok': False, 'error': str(e)}
+        reply['rss_mb'] = rss_mb()
+        proto.write(json.dumps(reply) + '\n')
+        proto.flush()
+
+
+if __name__ == '__main__':
+    main()
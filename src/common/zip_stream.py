@@ -0,0 +1,79 @@
+"""ZIP en streaming: se escribe a medida que llegan los ítems, sin archivo.
+
+Con el ZIP armado en disco, el cliente no recibe ni un byte hasta que se bajó
+la última imagen del carrusel. Este escritor emite cada entrada apenas se
+tiene su contenido:
+
+- Entradas STORED (sin comprimir: fotos y videos ya vienen comprimidos).
+- Bit 3 de flags + "data descriptor": el CRC y el tamaño van DESPUÉS de los
+  datos, así no hace falta conocerlos (ni hacer seek) antes de empezar.
+- Al cerrar se escribe el directorio central con los offsets acumulados.
+
+No soporta ZIP64: cada entrada y el archivo total deben ser < 4 GiB (sobra
+para galerías de imágenes).
+"""
+
+import struct
+import time
+import zlib
+
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_DATA_DESCRIPTOR = struct.Struct('<IIII')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_OF_CENTRAL_DIR = struct.Struct('<IHHHHIIH')
+
+# Bit 3: CRC/tamaños en el data descriptor. Bit 11: nombre en UTF-8.
+_FLAGS = 0x0008 | 0x0800
+_VERSION = 20
+_MAX_32 = 0xFFFFFFFF
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipStreamWriter:
+    """Escribe un ZIP a través de ``write(bytes)`` sin necesitar seek."""
+
+    def __init__(self, write):
+        self._write = write
+        self._offset = 0
+        self._entries = []
+
+    def _emit(self, data):
+        self._write(data)
+        self._offset += len(data)
+
+    def add(self, name, data, mtime=None):
+        """Agrega una entrada. ``data`` son bytes o un iterable de bytes."""
+        encoded = name.encode('utf-8')
+        dos_time, dos_date = _dos_datetime(mtime or time.time())
+        header_offset = self._offset
+        self._emit(_LOCAL_HEADER.pack(0x04034b50, _VERSION, _FLAGS, 0, dos_time, dos_date,
+                                      0, 0, 0, len(encoded), 0) + encoded)
+        crc = 0
+        size = 0
+        for chunk in ([data] if isinstance(data, (bytes, bytearray, memoryview)) else data):
+            if not chunk:
+                continue
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            self._emit(chunk)
+        if size > _MAX_32 or header_offset > _MAX_32:
+            raise ValueError('ZIP64 no soportado: entrada o archivo > 4 GiB')
+        self._emit(_DATA_DESCRIPTOR.pack(0x08074b50, crc, size, size))
+        self._entries.append((encoded, dos_time, dos_date, crc, size, header_offset))
+
+    def close(self):
+        """Escribe el directorio central y el fin de archivo."""
+        central_start = self._offset
+        for encoded, dos_time, dos_date, crc, size, header_offset in self._entries:
+            self._emit(_CENTRAL_HEADER.pack(0x02014b50, _VERSION, _VERSION, _FLAGS, 0,
+                                            dos_time, dos_date, crc, size, size,
+                                            len(encoded), 0, 0, 0, 0, 0, header_offset) + encoded)
+        count = len(self._entries)
+        self._emit(_END_OF_CENTRAL_DIR.pack(0x06054b50, 0, 0, count, count,
+                                            self._offset - central_start, central_start, 0))
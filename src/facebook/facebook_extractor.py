@@ -7,7 +7,10 @@ import sys
 import os
 import re
 
-from common.ytdlp_cmd import YTDLP_CMD
+from common.ytdlp_pool import ytdlp_pool
+from common import http_client
+from common.hedge import HedgedRunner
+from common.link_resolver import link_resolver
 from common.cookies_util import combined_cookies_file
 
 # Archivo de cookies compartido (Netscape). Aunque el nombre histórico dice
@@ -18,6 +21,27 @@ COOKIES_FILE = os.environ.get(
     os.path.join(os.path.dirname(__file__), '..', '..', 'cookies', 'instagram.txt')
 )
 
+# Modo "hedged": en vez de probar las estrategias en serie (cada una con su
+# timeout de 5-30 s), arrancarlas en paralelo escalonadas y quedarse con la
+# primera que devuelva video_url. Opt-in: multiplica el tráfico saliente.
+FACEBOOK_HEDGED = os.environ.get('FACEBOOK_HEDGED', '0') == '1'
+# Multiplicador del escalonamiento de HEDGE_SCHEDULE (0 = todas a la vez).
+FACEBOOK_HEDGE_STAGGER = float(os.environ.get('FACEBOOK_HEDGE_STAGGER', '1'))
+FACEBOOK_HEDGE_TIMEOUT = float(os.environ.get('FACEBOOK_HEDGE_TIMEOUT', '90'))
+
+# Estrategia -> segundos desde el inicio en que arranca (si las anteriores
+# no ganaron antes). Ajustar mirando facebook_hedge.stats() en /api/stats.
+HEDGE_SCHEDULE = {
+    'ytdlp': 0,
+    'scrape_www': 1,
+    'ytdlp_cookies': 2,
+    'scrape_mobile': 3,
+    'fdown': 5,
+    'getmyfb': 7,
+}
+
+facebook_hedge = HedgedRunner('facebook')
+
 
 class FacebookExtractor:
     def __init__(self):
@@ -29,6 +53,9 @@ class FacebookExtractor:
         Extrae información de videos de Facebook usando yt-dlp con fallback manual y reintento por ID
         """
         try:
+            if FACEBOOK_HEDGED:
+                return self._extract_hedged(url)
+
             # 1. Intentar primero con yt-dlp normal
             result = self._extract_with_ytdlp(url)
             if result.get('success'):
@@ -78,44 +105,77 @@ class FacebookExtractor:
                 "suggestion": "Verifica que el enlace sea válido y el video esté público"
             }
 
-    def _extract_with_ytdlp(self, url):
+    def _extract_hedged(self, url):
+        """
+        Corre las estrategias independientes en paralelo según HEDGE_SCHEDULE;
+        gana el primer resultado con video_url y el resto se descarta.
+        """
+        strategies = {
+            # Sin el reintento con cookies: eso es la estrategia ytdlp_cookies.
+            'ytdlp': lambda cancelled: self._extract_with_ytdlp(url, cookie_retry=False, cancelled=cancelled),
+            'scrape_www': lambda cancelled: self._parse_page(self._fetch_page(url)[0]),
+            'scrape_mobile': lambda cancelled: self._scrape_mobile(self._resolve_share(url)),
+            'fdown': lambda cancelled: self._via_fdown(url),
+            'getmyfb': lambda cancelled: self._via_getmyfb(url),
+        }
+        if combined_cookies_file():
+            strategies['ytdlp_cookies'] = lambda cancelled: self._extract_with_cookies(url, cancelled)
+
+        schedule = [(name, HEDGE_SCHEDULE[name] * FACEBOOK_HEDGE_STAGGER, fn)
+                    for name, fn in strategies.items()]
+        winner, result = facebook_hedge.run(
+            schedule,
+            is_valid=lambda r: bool(r and r.get('success') and r.get('video_url')),
+            timeout=FACEBOOK_HEDGE_TIMEOUT,
+        )
+        if winner:
+            print(f"🏁 Facebook hedged: ganó {winner}")
+            return result
+        return self._login_required()
+
+    # Opciones yt-dlp optimizadas para Facebook
+    _YDL_OPTS = {
+        'noplaylist': True,
+        'http_headers': {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Referer': 'https://www.facebook.com/',
+        },
+    }
+
+    def _resolve_share(self, url):
+        """URL canónica de un link /share/ o fb.watch (mapa persistente de
+        common/link_resolver.py: un link repetido no toca la red)."""
+        final_url = link_resolver.resolve(url)
+        if final_url != url:
+            print(f"🔄 Redirección resuelta: {url} -> {final_url}")
+        return final_url
+
+    def _extract_with_cookies(self, url, cancelled=None):
+        """
+        yt-dlp directo con las cookies compartidas (reels que exigen login)
+        """
+        cookies_path = combined_cookies_file()
+        if not cookies_path:
+            return {"success": False, "error": "Sin cookies compartidas"}
+        opts_with_cookies = dict(self._YDL_OPTS, cookiefile=cookies_path)
+        result = ytdlp_pool.run(self._resolve_share(url), opts_with_cookies, timeout=30,
+                                 cancelled=cancelled)
+        if result.returncode != 0:
+            return {"success": False, "error": f"Error: {result.stderr.lower()[:150]}"}
+        return self._build_result(result.info or {})
+
+    def _extract_with_ytdlp(self, url, cookie_retry=True, cancelled=None):
         """
         Extrae video usando yt-dlp
         """
         try:
             # Intentar resolver redirección si es una URL corta de share
-            final_url = url
-            if '/share/' in url:
-                try:
-                    import requests
-                    # Usar HEAD para seguir redirecciones sin bajar el cuerpo
-                    response = requests.head(url, allow_redirects=True, timeout=5, headers={
-                         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                    })
-                    if response.url != url:
-                        print(f"🔄 Redirección resuelta: {url} -> {response.url}")
-                        final_url = response.url
-                except Exception as e:
-                    print(f"⚠️ No se pudo resolver redirección: {e}")
-
-            # Comando yt-dlp optimizado para Facebook
-            cmd = YTDLP_CMD + [
-                '--dump-json',
-                '--no-warnings',
-                '--no-playlist',
-                '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                '--add-header', 'Referer:https://www.facebook.com/',
-                final_url
-            ]
-
-            # Ejecutar yt-dlp
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30,
-                encoding='utf-8'
-            )
+            final_url = self._resolve_share(url)
+            ydl_opts = self._YDL_OPTS
+
+            # Ejecutar yt-dlp (worker caliente del pool)
+            target_url = final_url
+            result = ytdlp_pool.run(target_url, ydl_opts, timeout=30, cancelled=cancelled)
 
             if result.returncode != 0:
                 error_msg = result.stderr.lower()
@@ -128,9 +188,9 @@ class FacebookExtractor:
                      video_id = id_match_err.group(1)
                      print(f"⚠️ Detectado ID {video_id} en error, intentando URL directa de Reel...")
                      reel_url = f"https://www.facebook.com/reel/{video_id}"
-                     if reel_url not in final_url:
-                         cmd[-1] = reel_url
-                         result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, encoding='utf-8')
+                     if reel_url not in final_url and not (cancelled and cancelled.is_set()):
+                         target_url = reel_url
+                         result = ytdlp_pool.run(target_url, ydl_opts, timeout=30, cancelled=cancelled)
                          if result.returncode == 0:
                              # Si funcionó, genial
                              pass
@@ -139,16 +199,17 @@ class FacebookExtractor:
                              error_msg = result.stderr.lower()
 
                 # Si sigue fallando y es "cannot parse data", intentar modo móvil
-                if result.returncode != 0 and 'cannot parse data' in error_msg and 'm.facebook.com' not in final_url:
+                if (result.returncode != 0 and 'cannot parse data' in error_msg and 'm.facebook.com' not in final_url
+                        and not (cancelled and cancelled.is_set())):
                      # Intentar con versión móvil si falló la versión de escritorio
                      print("⚠️ Fallo con www.facebook.com, intentando con m.facebook.com...")
                      mobile_url = final_url.replace('www.facebook.com', 'm.facebook.com').replace('web.facebook.com', 'm.facebook.com')
                      if 'm.facebook.com' not in mobile_url:
                          mobile_url = mobile_url.replace('facebook.com', 'm.facebook.com')
                      
-                     cmd[-1] = mobile_url
+                     target_url = mobile_url
                      # Reintentar
-                     result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, encoding='utf-8')
+                     result = ytdlp_pool.run(target_url, ydl_opts, timeout=30, cancelled=cancelled)
                      if result.returncode != 0:
                          # Solo sobreescribir error si hay nuevo error explicito
                          if result.stderr:
@@ -157,11 +218,12 @@ class FacebookExtractor:
                 # Si sigue fallando (típicamente reels que exigen login), reintentar
                 # con las cookies compartidas antes de rendirse. Combina todos
                 # los .txt de cookies/ (soporta los per-dominio de la extensión).
-                _cookies_path = combined_cookies_file()
+                _cookies_path = combined_cookies_file() if cookie_retry else None
                 if result.returncode != 0 and _cookies_path:
                     print("🍪 Reintentando con cookies compartidas (reel puede requerir login)...")
-                    cmd_with_cookies = cmd[:-1] + ['--cookies', _cookies_path, cmd[-1]]
-                    result = subprocess.run(cmd_with_cookies, capture_output=True, text=True, timeout=30, encoding='utf-8')
+                    opts_with_cookies = dict(ydl_opts, cookiefile=_cookies_path)
+                    result = ytdlp_pool.run(target_url, opts_with_cookies, timeout=30,
+                                             cancelled=cancelled)
                     if result.returncode != 0 and result.stderr:
                         error_msg = result.stderr.lower()
 
@@ -175,56 +237,7 @@ class FacebookExtractor:
                         ret['detected_id'] = id_match_err.group(1)
                     return ret
 
-            # Parsear la respuesta JSON
-            video_info = json.loads(result.stdout)
-
-            # Procesar formatos para obtener el mejor MP4
-            formats = video_info.get('formats', [])
-            best_format = None
-
-            # Buscar formato MP4 con audio y video
-            for fmt in formats:
-                if (fmt.get('ext') == 'mp4' and
-                    fmt.get('acodec') != 'none' and
-                        fmt.get('vcodec') != 'none'):
-                    best_format = fmt
-                    break
-
-            # Si no hay formato completo, buscar cualquier MP4
-            if not best_format:
-                for fmt in formats:
-                    if fmt.get('ext') == 'mp4':
-                        best_format = fmt
-                        break
-
-            if not best_format:
-                return {
-                    "success": False,
-                    "error": "No se encontraron formatos de video compatibles",
-                    "suggestion": "Este video podría usar un formato no soportado"
-                }
-
-            # Extraer metadatos
-            title = video_info.get('title', 'Video de Facebook')
-            description = video_info.get('description', '')
-            duration = video_info.get('duration', 0)
-            uploader = video_info.get('uploader', 'Usuario de Facebook')
-            thumbnail = video_info.get('thumbnail', '')
-            view_count = video_info.get('view_count', 0)
-
-            return {
-                "success": True,
-                "title": title,
-                "description": description,
-                "duration": duration,
-                "uploader": uploader,
-                "thumbnail": thumbnail,
-                "view_count": view_count,
-                "video_url": best_format["url"],
-                "video_quality": f"{best_format.get('width', 'N/A')}x{best_format.get('height', 'N/A')}",
-                "platform": "Facebook",
-                "formats": [best_format]
-            }
+            return self._build_result(result.info or {})
 
         except subprocess.TimeoutExpired:
             return {
@@ -245,227 +258,293 @@ class FacebookExtractor:
                 "suggestion": "Intenta con otro enlace de Facebook"
             }
 
+    def _build_result(self, video_info):
+        """Resultado de la API a partir del info dict de yt-dlp."""
+        # Procesar formatos para obtener el mejor MP4
+        formats = video_info.get('formats', [])
+        best_format = None
+
+        # Buscar formato MP4 con audio y video
+        for fmt in formats:
+            if (fmt.get('ext') == 'mp4' and
+                fmt.get('acodec') != 'none' and
+                    fmt.get('vcodec') != 'none'):
+                best_format = fmt
+                break
+
+        # Si no hay formato completo, buscar cualquier MP4
+        if not best_format:
+            for fmt in formats:
+                if fmt.get('ext') == 'mp4':
+                    best_format = fmt
+                    break
+
+        if not best_format:
+            return {
+                "success": False,
+                "error": "No se encontraron formatos de video compatibles",
+                "suggestion": "Este video podría usar un formato no soportado"
+            }
+
+        # Extraer metadatos
+        title = video_info.get('title', 'Video de Facebook')
+        description = video_info.get('description', '')
+        duration = video_info.get('duration', 0)
+        uploader = video_info.get('uploader', 'Usuario de Facebook')
+        thumbnail = video_info.get('thumbnail', '')
+        view_count = video_info.get('view_count', 0)
+
+        return {
+            "success": True,
+            "title": title,
+            "description": description,
+            "duration": duration,
+            "uploader": uploader,
+            "thumbnail": thumbnail,
+            "view_count": view_count,
+            "video_url": best_format["url"],
+            "video_quality": f"{best_format.get('width', 'N/A')}x{best_format.get('height', 'N/A')}",
+            "platform": "Facebook",
+            "formats": [best_format]
+        }
+
+    _MANUAL_HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Connection': 'keep-alive',
+    }
+
     def _extract_manual(self, url):
         """
         Intenta extraer el video usando requests y regex básicos para obtener og:video o 'playable_url'
         """
         try:
-            import requests
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Connection': 'keep-alive',
+            html, scrape_url, final_url, canonical_url = self._fetch_page(url)
+            # Los servicios externos reciben la URL canónica si se detectó
+            if canonical_url:
+                url = canonical_url
+
+            result = self._parse_page(html)
+            if result:
+                return result
+
+            # Fallback a m.facebook.com si www falló
+            if 'm.facebook.com' not in scrape_url:
+                result = self._scrape_mobile(final_url)
+                if result:
+                    return result
+
+            # 4. ÚLTIMO RECURSO: servicios externos (fdown.net, getmyfb.com)
+            for external in (self._via_fdown, self._via_getmyfb):
+                result = external(url)
+                if result:
+                    return result
+
+            return self._login_required()
+
+        except Exception as e:
+            print(f"❌ Error en scrape manual: {e}")
+            return {
+                 "success": False,
+                 "error": f"Error manual: {str(e)}",
+                "suggestion": "Intenta con otro video"
             }
 
-            html = None
-            # Intentar resolver redirección primero CON GET
-            final_url = url
-            if '/share/' in url:
-                try:
-                    # Usar GET en lugar de HEAD para mejor manejo de redirecciones en sitios JS
-                    r_head = requests.get(url, allow_redirects=True, timeout=10, headers=headers)
-                    if r_head.url != url:
-                         print(f"🔄 Redirección resuelta (manual): {url} -> {r_head.url}")
-                         final_url = r_head.url
-                    # Usar el contenido ya descargado si es útil
-                    if 'playable_url' in r_head.text or 'og:video' in r_head.text:
-                        html = r_head.text
-                        scrape_url = final_url
-                    else:
-                        html = None
-                except: 
-                    html = None
-                    pass
-
-            # Si no obtuvimos HTML válido de la redirección HTTP, intentamos www directo
-            if not html:
-                scrape_url = final_url
-                print(f"🕵️ Intentando scrape manual (www): {scrape_url}")
-                r = requests.get(scrape_url, headers=headers, timeout=10)
-                html = r.text
+    def _fetch_page(self, url):
+        """Baja el HTML de la página (resolviendo antes los links cortos).
+        Devuelve (html, scrape_url, final_url, canonical_url o None)."""
+        # Resolver primero el link corto (sin red si ya se conoce)
+        final_url = self._resolve_share(url)
+        scrape_url = final_url
+        print(f"🕵️ Intentando scrape manual (www): {scrape_url}")
+        r = http_client.get(scrape_url, headers=self._MANUAL_HEADERS, timeout=10)
+        html = r.text
+        
+        # Buscar URL canónica o real en el HTML (porque FB usa redirección JS)
+        # Ej: <link rel="canonical" href="https://www.facebook.com/reel/123456" />
+        # Ej: <meta property="og:url" content="..." />
+        canonical_url = None
+        canonical_match = re.search(r'<link\s+rel="canonical"\s+href="([^"]+)"', html)
+        if not canonical_match:
+             canonical_match = re.search(r'<meta\s+property="og:url"\s+content="([^"]+)"', html)
+        
+        if canonical_match:
+            real_url = canonical_match.group(1).replace("&amp;", "&")
+            if real_url != final_url and 'facebook.com' in real_url:
+                print(f"🔄 URL Canónica detectada: {real_url}")
+                final_url = real_url
+                canonical_url = real_url
+
+        # Diagnóstico: Ver si es página de login
+        if 'login_form' in html or 'Inicia sesión' in html or 'Log In' in html:
+            print("⚠️ Detectada página de login/bloqueo.")
+
+        return html, scrape_url, final_url, canonical_url
+
+    def _parse_page(self, html):
+        """Busca el video en el HTML de www (og:video, playable_url HD/SD)."""
+        # 1. Buscar meta tag og:video
+        video_url = None
+        og_match = re.search(r'<meta\s+property="og:video"\s+content="([^"]+)"', html)
+        if not og_match:
+             og_match = re.search(r'<meta\s+property="og:video:url"\s+content="([^"]+)"', html)
+        
+        if og_match:
+            video_url = og_match.group(1).replace("&amp;", "&")
+            print(f"✅ Encontrado og:video: {video_url[:50]}...")
+        
+        # 2. Si no, buscar playable_url_quality_hd en JSON incrustado
+        if not video_url:
+            hd_match = re.search(r'"playable_url_quality_hd":"([^"]+)"', html)
+            if hd_match:
+                video_url = hd_match.group(1).replace("\\/", "/")
+                print(f"✅ Encontrado playable_url_quality_hd: {video_url[:50]}...")
+        
+        # 3. Si no, buscar playable_url (SD)
+        if not video_url:
+            sd_match = re.search(r'"playable_url":"([^"]+)"', html)
+            if sd_match:
+                video_url = sd_match.group(1).replace("\\/", "/")
+                print(f"✅ Encontrado playable_url: {video_url[:50]}...")
+
+        if not video_url:
+            return None
+
+        # Extraer título y thumbnail básicos
+        title_match = re.search(r'<title>(.*?)</title>', html)
+        title = title_match.group(1) if title_match else "Facebook Video"
+        
+        thumb_match = re.search(r'<meta\s+property="og:image"\s+content="([^"]+)"', html)
+        thumbnail = thumb_match.group(1).replace("&amp;", "&") if thumb_match else ""
+
+        return {
+            "success": True,
+            "title": title,
+            "description": "Video extraído manualmente",
+            "duration": 0,
+            "uploader": "Facebook Generic",
+            "thumbnail": thumbnail,
+            "view_count": 0,
+            "video_url": video_url,
+            "video_quality": "Manual Extract",
+            "platform": "Facebook",
+            "formats": [{"url": video_url, "ext": "mp4"}]
+        }
+
+    def _scrape_mobile(self, url):
+        """Scrape de m.facebook.com buscando el enlace /video_redirect/."""
+        mobile_url = url.replace('www.facebook.com', 'm.facebook.com').replace('web.facebook.com', 'm.facebook.com')
+        print(f"🕵️ Reintentando scrape manual (mobile): {mobile_url}")
+        r_mobile = http_client.get(mobile_url, headers=self._MANUAL_HEADERS, timeout=10)
+        html_mobile = r_mobile.text
+        # (Para no hacer el código gigante, solo checkeo un pattern comùn en mobile)
+        m_match = re.search(r'href="(/video_redirect/\?src=.*?)"', html_mobile)
+        if m_match:
+            import urllib.parse
+            raw_url = m_match.group(1)
+            # Decodificar URL
+            if 'src=' in raw_url:
+                video_url = urllib.parse.unquote(raw_url.split('src=')[1].split('&')[0])
+                print(f"✅ Encontrado video redirect mobile: {video_url[:50]}...")
+                return {
+                    "success": True,
+                    "title": "Facebook Video (Mobile)", "description": "", "duration": 0, "uploader": "", "thumbnail": "", "view_count": 0,
+                    "video_url": video_url, "video_quality": "Mobile", "platform": "Facebook", "formats": [{"url": video_url, "ext": "mp4"}]
+                }
+        return None
+
+    def _via_fdown(self, url):
+        """Servicio externo fdown.net. None si no devolvió enlace."""
+        try:
+            print("🕵️ Intentando con servicio externo (fdown.net)...")
+            fdown_url = "https://fdown.net/download.php"
+            fdown_data = {'URL': url}
+            fdown_headers = dict(self._MANUAL_HEADERS)
+            fdown_headers['Origin'] = 'https://fdown.net'
+            fdown_headers['Referer'] = 'https://fdown.net/'
             
-            # Buscar URL canónica o real en el HTML (porque FB usa redirección JS)
-            # Ej: <link rel="canonical" href="https://www.facebook.com/reel/123456" />
-            # Ej: <meta property="og:url" content="..." />
-            canonical_match = re.search(r'<link\s+rel="canonical"\s+href="([^"]+)"', html)
-            if not canonical_match:
-                 canonical_match = re.search(r'<meta\s+property="og:url"\s+content="([^"]+)"', html)
+            r_fdown = http_client.post(fdown_url, data=fdown_data, headers=fdown_headers, timeout=15)
+            fdown_html = r_fdown.text
             
-            if canonical_match:
-                real_url = canonical_match.group(1).replace("&amp;", "&")
-                if real_url != final_url and 'facebook.com' in real_url:
-                    print(f"🔄 URL Canónica detectada: {real_url}")
-                    final_url = real_url
-                    # Actualizar fdown_data con la URL real si es diferente
-                    url = real_url 
-
-            # Diagnóstico: Ver si es página de login
-            if 'login_form' in html or 'Inicia sesión' in html or 'Log In' in html:
-                print("⚠️ Detectada página de login/bloqueo.")
-
-            # 1. Buscar meta tag og:video
             video_url = None
-            og_match = re.search(r'<meta\s+property="og:video"\s+content="([^"]+)"', html)
-            if not og_match:
-                 og_match = re.search(r'<meta\s+property="og:video:url"\s+content="([^"]+)"', html)
-            
-            if og_match:
-                video_url = og_match.group(1).replace("&amp;", "&")
-                print(f"✅ Encontrado og:video: {video_url[:50]}...")
-            
-            # 2. Si no, buscar playable_url_quality_hd en JSON incrustado
-            if not video_url:
-                hd_match = re.search(r'"playable_url_quality_hd":"([^"]+)"', html)
-                if hd_match:
-                    video_url = hd_match.group(1).replace("\\/", "/")
-                    print(f"✅ Encontrado playable_url_quality_hd: {video_url[:50]}...")
-            
-            # 3. Si no, buscar playable_url (SD)
-            if not video_url:
-                sd_match = re.search(r'"playable_url":"([^"]+)"', html)
-                if sd_match:
-                    video_url = sd_match.group(1).replace("\\/", "/")
-                    print(f"✅ Encontrado playable_url: {video_url[:50]}...")
+            # Buscar enlace HD
+            hd_link_match = re.search(r'<a href="([^"]+)"\s+[^>]*id="hdlink"', fdown_html)
+            if hd_link_match:
+                video_url = hd_link_match.group(1).replace("&amp;", "&")
+                quality = "HD"
+                print(f"✅ Encontrado enlace fdown (HD)")
+            else:
+                # Buscar enlace SD
+                sd_link_match = re.search(r'<a href="([^"]+)"\s+[^>]*id="sdlink"', fdown_html)
+                if sd_link_match:
+                    video_url = sd_link_match.group(1).replace("&amp;", "&")
+                    quality = "SD"
+                    print(f"✅ Encontrado enlace fdown (SD)")
 
             if video_url:
-                # Extraer título y thumbnail básicos
-                title_match = re.search(r'<title>(.*?)</title>', html)
-                title = title_match.group(1) if title_match else "Facebook Video"
-                
-                thumb_match = re.search(r'<meta\s+property="og:image"\s+content="([^"]+)"', html)
-                thumbnail = thumb_match.group(1).replace("&amp;", "&") if thumb_match else ""
+                 return {
+                    "success": True,
+                    "title": "Facebook Video (External)",
+                    "description": "Extraído vía fdown.net",
+                    "duration": 0,
+                    "uploader": "Facebook User",
+                    "thumbnail": "",  # fdown no da thumbnail fácil
+                    "view_count": 0,
+                    "video_url": video_url,
+                    "video_quality": quality,
+                    "platform": "Facebook",
+                    "formats": [{"url": video_url, "ext": "mp4"}]
+                }
+        except Exception as e_ext:
+            print(f"⚠️ Fallo servicio externo: {e_ext}")
+        return None
 
+    def _via_getmyfb(self, url):
+        """Servicio externo getmyfb.com (maneja URLs share/v/). None si no
+        devolvió enlace."""
+        try:
+            print("🕵️ Intentando con servicio externo (getmyfb.com)...")
+            r_gmf = http_client.post(
+                'https://getmyfb.com/process',
+                data={'id': url, 'locale': 'es'},
+                headers={
+                    'User-Agent': self._MANUAL_HEADERS['User-Agent'],
+                    'Origin': 'https://getmyfb.com',
+                    'Referer': 'https://getmyfb.com/es/facebook-to-mp4',
+                    'HX-Request': 'true',
+                },
+                timeout=30,
+            )
+            gmf_links = re.findall(r'href="(https://ssscdn\.io/[^"]+)"', r_gmf.text)
+            gmf_title_match = re.search(r'class="results-item-text"[^>]*>([^<]+)<', r_gmf.text)
+            if gmf_links:
+                video_url = gmf_links[0].replace('&amp;', '&')
+                gmf_title = gmf_title_match.group(1).strip() if gmf_title_match else "Facebook Video (External)"
+                print("✅ Encontrado enlace getmyfb")
                 return {
                     "success": True,
-                    "title": title,
-                    "description": "Video extraído manualmente",
+                    "title": gmf_title,
+                    "description": "Extraído vía getmyfb.com",
                     "duration": 0,
-                    "uploader": "Facebook Generic",
-                    "thumbnail": thumbnail,
+                    "uploader": "Facebook User",
+                    "thumbnail": "",
                     "view_count": 0,
                     "video_url": video_url,
-                    "video_quality": "Manual Extract",
+                    "video_quality": "HD",
                     "platform": "Facebook",
                     "formats": [{"url": video_url, "ext": "mp4"}]
                 }
-            
-            # Fallback a m.facebook.com si www falló
-            if 'm.facebook.com' not in scrape_url:
-                 mobile_url = final_url.replace('www.facebook.com', 'm.facebook.com').replace('web.facebook.com', 'm.facebook.com')
-                 print(f"🕵️ Reintentando scrape manual (mobile): {mobile_url}")
-                 r_mobile = requests.get(mobile_url, headers=headers, timeout=10)
-                 html_mobile = r_mobile.text
-                 # Repetir busqueda en mobile... (simplificado para no duplicar código mucho, podríamos hacer un loop pero por ahora copy-paste logico breve)
-                 # ... buscar patterns en html_mobile ...
-                 # (Para no hacer el código gigante, solo checkeo un pattern comùn en mobile)
-                 m_match = re.search(r'href="(/video_redirect/\?src=.*?)"', html_mobile)
-                 if m_match:
-                     import urllib.parse
-                     raw_url = m_match.group(1)
-                     # Decodificar URL
-                     if 'src=' in raw_url:
-                         video_url = urllib.parse.unquote(raw_url.split('src=')[1].split('&')[0])
-                         print(f"✅ Encontrado video redirect mobile: {video_url[:50]}...")
-                         return {
-                             "success": True,
-                             "title": "Facebook Video (Mobile)", "description": "", "duration": 0, "uploader": "", "thumbnail": "", "view_count": 0,
-                             "video_url": video_url, "video_quality": "Mobile", "platform": "Facebook", "formats": [{"url": video_url, "ext": "mp4"}]
-                         }
-
-            # 4. ÚLTIMO RECURSO: Intentar usar fdown.net (servicio externo)
-            if not video_url:
-                try:
-                    print("🕵️ Intentando con servicio externo (fdown.net)...")
-                    fdown_url = "https://fdown.net/download.php"
-                    fdown_data = {'URL': url}
-                    fdown_headers = headers.copy()
-                    fdown_headers['Origin'] = 'https://fdown.net'
-                    fdown_headers['Referer'] = 'https://fdown.net/'
-                    
-                    r_fdown = requests.post(fdown_url, data=fdown_data, headers=fdown_headers, timeout=15)
-                    fdown_html = r_fdown.text
-                    
-                    # Buscar enlace HD
-                    hd_link_match = re.search(r'<a href="([^"]+)"\s+[^>]*id="hdlink"', fdown_html)
-                    if hd_link_match:
-                        video_url = hd_link_match.group(1).replace("&amp;", "&")
-                        quality = "HD"
-                        print(f"✅ Encontrado enlace fdown (HD)")
-                    else:
-                        # Buscar enlace SD
-                        sd_link_match = re.search(r'<a href="([^"]+)"\s+[^>]*id="sdlink"', fdown_html)
-                        if sd_link_match:
-                            video_url = sd_link_match.group(1).replace("&amp;", "&")
-                            quality = "SD"
-                            print(f"✅ Encontrado enlace fdown (SD)")
-
-                    if video_url:
-                         return {
-                            "success": True,
-                            "title": "Facebook Video (External)",
-                            "description": "Extraído vía fdown.net",
-                            "duration": 0,
-                            "uploader": "Facebook User",
-                            "thumbnail": "",  # fdown no da thumbnail fácil
-                            "view_count": 0,
-                            "video_url": video_url,
-                            "video_quality": quality,
-                            "platform": "Facebook",
-                            "formats": [{"url": video_url, "ext": "mp4"}]
-                        }
-                except Exception as e_ext:
-                    print(f"⚠️ Fallo servicio externo: {e_ext}")
-
-            # 5. ÚLTIMO RECURSO: getmyfb.com (servicio externo, maneja URLs share/v/)
-            if not video_url:
-                try:
-                    print("🕵️ Intentando con servicio externo (getmyfb.com)...")
-                    r_gmf = requests.post(
-                        'https://getmyfb.com/process',
-                        data={'id': url, 'locale': 'es'},
-                        headers={
-                            'User-Agent': headers.get('User-Agent', 'Mozilla/5.0'),
-                            'Origin': 'https://getmyfb.com',
-                            'Referer': 'https://getmyfb.com/es/facebook-to-mp4',
-                            'HX-Request': 'true',
-                        },
-                        timeout=30,
-                    )
-                    gmf_links = re.findall(r'href="(https://ssscdn\.io/[^"]+)"', r_gmf.text)
-                    gmf_title_match = re.search(r'class="results-item-text"[^>]*>([^<]+)<', r_gmf.text)
-                    if gmf_links:
-                        video_url = gmf_links[0].replace('&amp;', '&')
-                        gmf_title = gmf_title_match.group(1).strip() if gmf_title_match else "Facebook Video (External)"
-                        print("✅ Encontrado enlace getmyfb")
-                        return {
-                            "success": True,
-                            "title": gmf_title,
-                            "description": "Extraído vía getmyfb.com",
-                            "duration": 0,
-                            "uploader": "Facebook User",
-                            "thumbnail": "",
-                            "view_count": 0,
-                            "video_url": video_url,
-                            "video_quality": "HD",
-                            "platform": "Facebook",
-                            "formats": [{"url": video_url, "ext": "mp4"}]
-                        }
-                except Exception as e_ext:
-                    print(f"⚠️ Fallo servicio externo (getmyfb): {e_ext}")
-
-            return {
-                "success": False,
-                "needs_login": True,
-                "login_platform": "facebook",
-                "error": "No se pudo extraer la URL del video manualmente ni con servicios externos.",
-                "suggestion": "Este contenido probablemente exige iniciar sesión. Inicia sesión para este video, o actualiza la cookie compartida."
-            }
-
-        except Exception as e:
-            print(f"❌ Error en scrape manual: {e}")
-            return {
-                 "success": False,
-                 "error": f"Error manual: {str(e)}",
-                "suggestion": "Intenta con otro video"
-            }
+        except Exception as e_ext:
+            print(f"⚠️ Fallo servicio externo (getmyfb): {e_ext}")
+        return None
+
+    @staticmethod
+    def _login_required():
+        return {
+            "success": False,
+            "needs_login": True,
+            "login_platform": "facebook",
+            "error": "No se pudo extraer la URL del video manualmente ni con servicios externos.",
+            "suggestion": "Este contenido probablemente exige iniciar sesión. Inicia sesión para este video, o actualiza la cookie compartida."
+        }
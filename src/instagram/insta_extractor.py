@@ -6,8 +6,10 @@ from typing import Dict, Any, Optional
 
 import requests
 
-from common.ytdlp_cmd import YTDLP_CMD
+from common import http_client
+from common.ytdlp_pool import YtdlpResult, ytdlp_pool
 from common.cookies_util import combined_cookies_file
+from instagram.login_gate import login_gate
 
 # Optional Netscape-format cookies file (export with a browser extension while
 # logged into Instagram). Checked before browser cookies since it works even
@@ -35,7 +37,7 @@ class InstagramExtractor:
             'User-Agent': 'Mozilla/5.0 (compatible; Discordbot/2.0; +https://discordapp.com)'
         }
         try:
-            r = requests.get(
+            r = http_client.get(
                 f'https://kkinstagram.com/reel/{shortcode}/',
                 headers=headers, timeout=30, allow_redirects=True, stream=True
             )
@@ -74,27 +76,31 @@ class InstagramExtractor:
                     }
                 }
 
-            def run_ytdlp(extra_args=None):
-                cmd = YTDLP_CMD + [
-                    '--dump-json',
-                    '--no-download',
-                    '--format', 'best[ext=mp4]/best',
-                    url
-                ]
-                if extra_args:
-                    cmd.extend(extra_args)
-                
-                return subprocess.run(
-                    cmd, capture_output=True, text=True, timeout=60)
+            def run_ytdlp(extra_opts=None):
+                opts = {'format': 'best[ext=mp4]/best'}
+                if extra_opts:
+                    opts.update(extra_opts)
 
-            # 1. Intentar método estándar
-            result = run_ytdlp()
+                return ytdlp_pool.run(url, opts, timeout=60)
+
+            # 1. Intentar método estándar, salvo que ya se sepa que este medio
+            # (o su cuenta) exige login: el anónimo solo perdería segundos.
+            known_gated = login_gate.status(url) is not None
+            if known_gated:
+                print("⏭️ Medio conocido con login obligatorio: salteando intento anónimo.")
+                login_gate.count_skip()
+                result = YtdlpResult(1, stderr='login required (login_gate)')
+            else:
+                result = run_ytdlp()
+                if result.returncode == 0:
+                    login_gate.record_public(url)
 
             # 2. Si falla por contenido que requiere autenticación, reintentar con cookies.
             # Instagram devuelve "empty media response" cuando exige login (comportamiento
             # desde 2026 para la mayoría de los reels).
             stderr_lower = result.stderr.lower()
             needs_cookies = result.returncode != 0 and (
+                known_gated or
                 'stories' in url or
                 'unable to extract user info' in stderr_lower or
                 'private' in stderr_lower or
@@ -112,7 +118,7 @@ class InstagramExtractor:
                 cookies_path = combined_cookies_file()
                 if cookies_path:
                     print(f"🍪 Usando archivo de cookies: {cookies_path}")
-                    result = run_ytdlp(['--cookies', cookies_path])
+                    result = run_ytdlp({'cookiefile': cookies_path})
 
             # 3. Fallback anónimo rápido: proxy de embeds (kkinstagram).
             # Va antes que las cookies del navegador porque estas suelen fallar
@@ -122,6 +128,8 @@ class InstagramExtractor:
                 cdn_url = self._extract_via_embed_proxy(url)
                 if cdn_url:
                     print("✅ Video obtenido vía proxy de embeds (CDN directo).")
+                    if needs_cookies:
+                        login_gate.record_login_required(url)
                     return {
                         "success": True,
                         "data": {
@@ -146,10 +154,14 @@ class InstagramExtractor:
                     if result.returncode == 0:
                         break
                     print(f"🍪 Intentando con cookies de {browser}...")
-                    result = run_ytdlp(['--cookies-from-browser', browser])
+                    result = run_ytdlp({'cookiesfrombrowser': (browser,)})
 
             if result.returncode != 0:
                 error_msg = result.stderr.strip()
+                if needs_cookies or 'empty media response' in error_msg.lower():
+                    # Nada local funcionó: el próximo pedido va directo al
+                    # backend residencial.
+                    login_gate.record_local_failed(url)
                 if needs_cookies:
                     # El contenido requiere login y ningún método de cookies funcionó.
                     return {
@@ -192,8 +204,12 @@ class InstagramExtractor:
                         "suggestion": "Intenta con otro video o verifica tu conexión"
                     }
 
-            # Parsear la respuesta JSON
-            video_info = json.loads(result.stdout)
+            video_info = result.info or {}
+            if needs_cookies:
+                # Funcionó con sesión: recordar el medio y su cuenta. 'channel'
+                # es el nombre de usuario (el mismo que aparece en las URLs);
+                # 'uploader_id' es el pk numérico y nunca coincidiría.
+                login_gate.record_login_required(url, account=video_info.get('channel') or None)
 
             # Procesar formatos para obtener solo MP4 con audio
             formats = video_info.get('formats', [])
@@ -0,0 +1,160 @@
+"""Caché negativa de medios de Instagram que exigen login.
+
+Desde 2026 la mayoría de los reels devuelven "empty media response" sin
+sesión: cada /api/extract pagaba primero el intento anónimo de yt-dlp (varios
+segundos) para recién después probar con cookies, aunque ese mismo reel ya
+hubiera fallado igual hace un minuto. Acá se recuerda el resultado:
+
+- Por medio (``MediaRef.key``: shortcode o id de story) y por cuenta (el
+  usuario que aparece en la URL o que devolvió yt-dlp), con TTL.
+- La URL canónica de un reel (``instagram.com/reel/<id>/``) no trae el
+  usuario: el servidor anota con ``remember_account`` la cuenta de la URL
+  original del pedido, y así ``status`` encuentra la marca de la cuenta
+  aunque el extractor solo vea la URL canónica.
+- ``login_required``: el anónimo falla; se salta directo a cookies/embed.
+- ``local_failed``: tampoco funcionó nada local (cookies vencidas o IP
+  bloqueada); el servidor reenvía directo al backend residencial. Vence antes
+  (INSTAGRAM_LOCAL_FAIL_TTL) porque las cookies se pueden renovar.
+- Un éxito anónimo borra la marca del medio.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from common.url_normalizer import normalize
+
+INSTAGRAM_LOGIN_GATE_TTL = int(os.environ.get('INSTAGRAM_LOGIN_GATE_TTL', str(6 * 60 * 60)))
+INSTAGRAM_LOCAL_FAIL_TTL = int(os.environ.get('INSTAGRAM_LOCAL_FAIL_TTL', '900'))
+INSTAGRAM_LOGIN_GATE_MAX = int(os.environ.get('INSTAGRAM_LOGIN_GATE_MAX', '5000'))
+
+LOGIN_REQUIRED = 'login_required'
+LOCAL_FAILED = 'local_failed'
+
+_ACCOUNT_RE = re.compile(r'instagram\.com/(?:stories/)?([\w.]+)/(?:reels?/|p/|tv/|\d)', re.I)
+_NOT_ACCOUNTS = {'reel', 'reels', 'p', 'tv', 'stories', 'explore'}
+
+
+def account_from_url(url):
+    """Usuario presente en la URL (instagram.com/<user>/reel/..., stories)."""
+    m = _ACCOUNT_RE.search(url or '')
+    if m and m.group(1).lower() not in _NOT_ACCOUNTS:
+        return m.group(1).lower()
+    return None
+
+
+class LoginGate:
+    def __init__(self, ttl=INSTAGRAM_LOGIN_GATE_TTL, local_fail_ttl=INSTAGRAM_LOCAL_FAIL_TTL,
+                 max_entries=INSTAGRAM_LOGIN_GATE_MAX):
+        self.ttl = ttl
+        self.local_fail_ttl = local_fail_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # 'media:<key>' / 'account:<user>' -> (estado, epoch)
+        self._owners = OrderedDict()   # clave del medio -> usuario dueño
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.skipped_anonymous = 0
+        self.direct_forwards = 0
+
+    def _keys(self, url, account=None):
+        """[clave del medio, claves de cuenta...] (con el lock): la de la URL,
+        la anotada para el medio y, si se pasa, la que devolvió yt-dlp (sin
+        repetir)."""
+        media = normalize(url).key
+        keys = [f'media:{media}']
+        for name in (account_from_url(url), self._owners.get(media), account):
+            key = f'account:{name.lower()}' if name else None
+            if key and key not in keys:
+                keys.append(key)
+        return keys
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        state, at = entry
+        ttl = self.local_fail_ttl if state == LOCAL_FAILED else self.ttl
+        if time.time() - at > ttl:
+            # Un local_failed vencido sigue diciendo que hace falta login.
+            if state == LOCAL_FAILED and time.time() - at <= self.ttl:
+                return LOGIN_REQUIRED
+            del self._entries[key]
+            return None
+        return state
+
+    def status(self, url):
+        """Estado conocido del medio (o de su cuenta), o None."""
+        with self._lock:
+            media_key, *account_keys = self._keys(url)
+            state = self._get(media_key)
+            # Una cuenta con contenido bloqueado: sus otros medios también.
+            for key in account_keys:
+                if state is not None:
+                    break
+                state = self._get(key) and LOGIN_REQUIRED
+            if state is not None:
+                self.hits += 1
+            return state
+
+    def _set_owner(self, url, account):
+        media = normalize(url).key
+        self._owners[media] = account.lower()
+        self._owners.move_to_end(media)
+        while len(self._owners) > self.max_entries:
+            self._owners.popitem(last=False)
+
+    def remember_account(self, url, account=None):
+        """Anota el dueño del medio: el usuario de la URL original del pedido
+        (o ``account``). No hace nada si no hay ninguno."""
+        account = account or account_from_url(url)
+        if account:
+            with self._lock:
+                self._set_owner(url, account)
+
+    def _set(self, key, state):
+        self._entries[key] = (state, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def record_login_required(self, url, account=None):
+        with self._lock:
+            if account:
+                self._set_owner(url, account)
+            for key in self._keys(url, account):
+                self._set(key, LOGIN_REQUIRED)
+
+    def record_local_failed(self, url):
+        with self._lock:
+            self._set(self._keys(url)[0], LOCAL_FAILED)
+
+    def record_public(self, url):
+        """El anónimo funcionó: el medio no exige login."""
+        with self._lock:
+            self._entries.pop(self._keys(url)[0], None)
+
+    def count_skip(self):
+        with self._lock:
+            self.skipped_anonymous += 1
+
+    def count_forward(self):
+        with self._lock:
+            self.direct_forwards += 1
+
+    def stats(self):
+        with self._lock:
+            states = [state for state, _ in self._entries.values()]
+            return {
+                'entries': len(self._entries),
+                'owners': len(self._owners),
+                'login_required': states.count(LOGIN_REQUIRED),
+                'local_failed': states.count(LOCAL_FAILED),
+                'hits': self.hits,
+                'skipped_anonymous': self.skipped_anonymous,
+                'direct_forwards': self.direct_forwards,
+            }
+
+
+login_gate = LoginGate()
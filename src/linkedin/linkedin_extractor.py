@@ -1,5 +1,8 @@
 from typing import Dict, Any
 
+from common import http_client
+from common.ytdlp_pool import ytdlp_pool
+
 
 class LinkedInExtractor:
     def extract_info(self, url: str) -> Dict[str, Any]:
@@ -26,46 +29,43 @@ class LinkedInExtractor:
                 }
 
             try:
-                import yt_dlp
                 ydl_opts = {
                     'quiet': True,
                     'skip_download': True,
                     'timeout': 10
                 }
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    
-                    video_url = None
-                    if 'url' in info: video_url = info['url']
-                    elif 'video_url' in info: video_url = info['video_url']
-                    elif 'webpage_url' in info: video_url = info['webpage_url']
+                info = ytdlp_pool.extract_info(url, ydl_opts)
 
-                    if video_url:
-                        print(f"✅ Video extraído: {video_url[:50]}...")
-                        return {
-                            "success": True,
-                            "data": {
-                                "videoUrl": video_url,
-                                "title": info.get('title', 'Video de LinkedIn'),
-                                "uploader": info.get('uploader', ''),
-                                "duration": info.get('duration'),
-                                "description": info.get('description', ''),
-                                "thumbnail": info.get('thumbnail'),
-                                "type": "video"
-                            }
+                video_url = None
+                if 'url' in info: video_url = info['url']
+                elif 'video_url' in info: video_url = info['video_url']
+                elif 'webpage_url' in info: video_url = info['webpage_url']
+
+                if video_url:
+                    print(f"✅ Video extraído: {video_url[:50]}...")
+                    return {
+                        "success": True,
+                        "data": {
+                            "videoUrl": video_url,
+                            "title": info.get('title', 'Video de LinkedIn'),
+                            "uploader": info.get('uploader', ''),
+                            "duration": info.get('duration'),
+                            "description": info.get('description', ''),
+                            "thumbnail": info.get('thumbnail'),
+                            "type": "video"
                         }
+                    }
             except Exception as e:
                 print(f"⚠️ yt-dlp falló, intentando scraping manual: {str(e)}")
 
             # Fallback: Scraping manual para Imágenes o PDF
-            import requests
             import re
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.get(url, headers=headers, timeout=10)
             if response.status_code == 200:
                 html = response.text
                 
@@ -147,7 +147,7 @@ class LinkedInExtractor:
                             print(f"📄 Manifiesto encontrado: {manifest_url[:50]}...")
                             # Descargar el manifesto para obtener la URL real del PDF
                             print(f"⬇️ Descargando manifesto...")
-                            m_resp = requests.get(manifest_url, headers=headers, timeout=10)
+                            m_resp = http_client.get(manifest_url, headers=headers, timeout=10)
                             
                             if m_resp.status_code == 200:
                                 m_json = m_resp.json()
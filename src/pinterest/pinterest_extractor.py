@@ -2,8 +2,9 @@
 import json
 import logging
 import re
-import requests
-from yt_dlp import YoutubeDL
+
+from common import http_client
+from common.ytdlp_pool import ytdlp_pool
 
 logger = logging.getLogger(__name__)
 
@@ -34,9 +35,8 @@ class PinterestExtractor:
             'ignoreerrors': True, # Importante para evitar crash total si falla algo interno
         }
 
-        with YoutubeDL(ydl_opts) as ydl:
-            # Si yt-dlp no encuentra video, suele lanzar excepción DownloadError
-            info = ydl.extract_info(url, download=False)
+        # Si yt-dlp no encuentra video, suele lanzar excepción (YtdlpError)
+        info = ytdlp_pool.extract_info(url, ydl_opts)
         
         if not info:
             raise Exception("No info returned form yt-dlp")
@@ -101,7 +101,7 @@ class PinterestExtractor:
                 'Referer': 'https://www.google.com/'
             }
             
-            session = requests.Session()
+            session = http_client.new_session()
             response = session.get(url, headers=headers, allow_redirects=True, timeout=15)
             html = response.text
             final_url = response.url 
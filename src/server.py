@@ -10,14 +10,13 @@ import logging
 from urllib.parse import parse_qs, urlparse, unquote
 from socketserver import ThreadingMixIn
 from http.server import HTTPServer, BaseHTTPRequestHandler
-import requests
 import subprocess
 import uuid
+import queue
 import imageio_ffmpeg
 from yt_dlp import YoutubeDL
 import threading
 import mimetypes
-import zipfile
 import base64
 import tempfile
 import time
@@ -39,15 +38,35 @@ if _cookies_b64 and not os.environ.get('INSTAGRAM_COOKIES_FILE'):
 
 
 # Importar utilidades y extractores
-from common.cookies_util import combined_cookies_file
+from common import http_client
+from common.async_http import AsyncHTTPServer
+from common.cookies_util import combined_cookies_file, cookie_store
+from common.download_cache import download_cache
+from common.download_scheduler import download_scheduler
+from common.gallery import GalleryFetch, fetch_gallery_to_zip, item_filename
+from common.http_files import ChunkedWriter, send_file
+from common.link_resolver import link_resolver
+from common.remote_backend import REMOTE_TIMEOUT, remote_backend
+from common.routing import HEDGE, LOCAL, REMOTE, routing_policy
+from common.task_registry import FINAL_STATUSES, TaskRegistry
+from common.extract_cache import extract_cache
+from common.single_flight import SingleFlight
+from common.static_assets import etag_matches, static_assets
+from common.worker_queue import WORKER_POLL_WAIT, job_queue
+from common.ytdlp_pool import ytdlp_pool
+from common.url_normalizer import detect_platform
+from common.zip_stream import ZipStreamWriter
 from instagram.insta_extractor import InstagramExtractor
+from instagram.login_gate import LOCAL_FAILED, login_gate
 from linkedin.linkedin_extractor import LinkedInExtractor
 from x.x_extractor import XExtractor
 from tiktok.tiktok_extractor import TikTokExtractor
-from facebook.facebook_extractor import FacebookExtractor
+from facebook.facebook_extractor import FacebookExtractor, facebook_hedge
 from youtube.youtube_extractor import YouTubeExtractor
 from twitch.twitch_extractor import TwitchExtractor
 from pinterest.pinterest_extractor import PinterestExtractor
+from threads.browser_pool import browser_pool
+from threads.graphql_replay import graphql_replay
 from threads.threads_extractor import ThreadsExtractor
 
 # Fix Windows Unicode Output
@@ -66,6 +85,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Extractor por plataforma (ver common/url_normalizer.detect_platform).
+EXTRACTORS = {
+    'threads': ThreadsExtractor,
+    'instagram': InstagramExtractor,
+    'twitch': TwitchExtractor,
+    'linkedin': LinkedInExtractor,
+    'x': XExtractor,
+    'tiktok': TikTokExtractor,
+    'facebook': FacebookExtractor,
+    'youtube': YouTubeExtractor,
+    'pinterest': PinterestExtractor,
+}
+
+
 class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     """HTTP Server que maneja requests en threads separados"""
     daemon_threads = True
@@ -73,17 +106,52 @@ class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     timeout = 60
 
 
-# Global dictionary to store download tasks
-download_tasks = {}
+# 'threaded' (un hilo por conexión, HTTP/1.0) o 'async' (event loop con
+# keep-alive HTTP/1.1, ver common/async_http.py).
+SERVER_MODE = os.environ.get('SERVER_MODE', 'threaded').lower()
+# Rutas que solo leen estado en memoria: en modo async corren en el event
+# loop sin pasar por el pool de hilos.
+ASYNC_INLINE_PATHS = ('/api/download_status', '/api/download_cancel', '/api/stats', '/api/health')
+# Streams que duran toda la descarga: pool propio y acotado (no le quitan
+# hilos al resto de las rutas).
+ASYNC_STREAM_PATHS = ('/api/download_events',)
+
+
+def _release_task_file(task):
+    """Suelta el archivo de una tarea borrada o vencida: si es de la caché de
+    descargas solo baja su referencia; si no, borra el temporal. Una galería
+    en streaming que nadie pidió suelta sus pedidos en curso."""
+    stream = task.get('stream')
+    if stream:
+        stream['fetch'].close()
+    fp = task.get('file_path')
+    if not fp or download_cache.release(fp):
+        return
+    if os.path.exists(fp):
+        os.remove(fp)
+
+
+# Stream de progreso (/api/download_events): como mucho un evento cada
+# SSE_MIN_INTERVAL segundos, y un comentario keep-alive si no hay cambios.
+SSE_MIN_INTERVAL = 0.25
+SSE_KEEPALIVE = 15
+
+# Galerías: ZIP generado al vuelo en /api/download_file (1) o armado en
+# disco antes de marcar la tarea como completada (0).
+GALLERY_STREAM = os.environ.get('GALLERY_STREAM', '1') != '0'
+
+# Registro global de tareas de descarga
+download_tasks = TaskRegistry(on_evict=_release_task_file)
 
 # Backend residencial (tu PC vía túnel): cuando un video exige login y esta
 # instancia no puede (ej. Railway con IP de datacenter), reenvía el pedido a
-# esta URL, que la máquina de casa registra y refresca sola. En memoria: se
-# pierde si el proceso reinicia, y la máquina de casa la vuelve a mandar.
-_remote_fallback = {'url': None, 'updated_at': 0.0}
-# Vigencia de la URL registrada (segundos). Si la casa dejó de latir hace más
-# que esto, dejamos de reenviar (la PC probablemente está apagada).
-REMOTE_FALLBACK_TTL = 600
+# la URL que la máquina de casa registra y refresca sola. La conexión, el
+# sondeo de salud y el circuit breaker viven en common/remote_backend.py.
+
+# Pedidos concurrentes del mismo video comparten una sola extracción (y un
+# solo reenvío al backend residencial) en vez de lanzar uno por hilo.
+_extract_flight = SingleFlight()
+_forward_flight = SingleFlight()
 
 # Optional Netscape-format cookies file for Instagram authenticated downloads.
 # Works even when the browser is open and locking its cookie database.
@@ -156,13 +224,11 @@ INSTAGRAM_SESSION_REFRESH_INTERVAL = 6 * 60 * 60  # 6 horas
 def refresh_instagram_session():
     """Realiza una petición autenticada liviana a Instagram para mantener
     la sesión de la cookie compartida activa el mayor tiempo posible."""
-    if not os.path.isfile(INSTAGRAM_COOKIES_FILE):
+    jar = cookie_store.cookiejar(('instagram',))
+    if not len(jar):
         return
     try:
-        from http.cookiejar import MozillaCookieJar
-        jar = MozillaCookieJar(INSTAGRAM_COOKIES_FILE)
-        jar.load(ignore_discard=True, ignore_expires=True)
-        resp = requests.get(
+        resp = http_client.get(
             'https://www.instagram.com/',
             cookies=jar,
             headers={
@@ -228,65 +294,89 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                     return
                 
                 task_id = str(uuid.uuid4())
-                download_tasks[task_id] = {
-                    'status': 'starting',
-                    'progress': 0,
-                    'file_path': None,
-                    'filename': filename,
-                    'error': None
-                }
+                download_tasks.create(task_id, filename)
                 
-                # Start background thread
-                thread = threading.Thread(target=self.process_download_task, args=(task_id, url, filename))
-                thread.daemon = True
-                thread.start()
+                # Encolar en el pool fijo de workers de descarga
+                try:
+                    download_scheduler.submit(task_id, self.process_download_task, task_id, url, filename)
+                except queue.Full:
+                    download_tasks.pop(task_id, None)
+                    self.send_json_response({'error': 'Servidor ocupado, intentá de nuevo en unos minutos'}, 503)
+                    return
                 
                 self.send_json_response({'task_id': task_id})
 
             elif clean_path == '/api/download_cancel':
                 task_id = params.get('id', [''])[0]
                 if task_id in download_tasks:
-                    download_tasks[task_id]['status'] = 'cancelled'
-                    download_tasks[task_id]['error'] = 'Descarga cancelada por el usuario'
+                    download_scheduler.cancel(task_id)
+                    download_tasks.update(task_id, status='cancelled',
+                                          error='Descarga cancelada por el usuario')
                     self.send_json_response({'status': 'cancelled'})
                 else:
                     self.send_json_response({'error': 'Task not found'}, 404)
 
             elif clean_path == '/api/download_status':
                 task_id = params.get('id', [''])[0]
-                if task_id in download_tasks:
-                    self.send_json_response(download_tasks[task_id])
+                task = download_tasks.get(task_id)
+                if task:
+                    if task['status'] == 'queued':
+                        task['queue_position'] = download_scheduler.position(task_id)
+                    self.send_json_response(task)
                 else:
                     self.send_json_response({'error': 'Task not found'}, 404)
             
-            elif clean_path == '/api/download_file':
+            # Progreso por Server-Sent Events (el polling queda de respaldo)
+            elif clean_path == '/api/download_events':
                 task_id = params.get('id', [''])[0]
-                if task_id in download_tasks and download_tasks[task_id]['status'] == 'completed':
-                    file_path = download_tasks[task_id]['file_path']
-                    filename = download_tasks[task_id]['filename']
-
-                    if os.path.exists(file_path):
-                        self.serve_downloaded_file(file_path, filename)
-                    else:
-                        self.send_error(404, "File not found on server")
+                if task_id in download_tasks:
+                    self.serve_task_events(task_id)
                 else:
-                    self.send_error(404, "Download not ready")
+                    self.send_json_response({'error': 'Task not found'}, 404)
+
+            elif clean_path == '/api/download_file':
+                self.serve_task_file(params.get('id', [''])[0])
 
             # Borra el archivo temporal tras compartir (el navegador ya lo tomó
             # como blob). Así el temporal no se acumula cuando solo se comparte.
             elif clean_path == '/api/download_delete':
                 task_id = params.get('id', [''])[0]
-                task = download_tasks.get(task_id)
+                task = download_tasks.pop(task_id)
                 if task:
-                    fp = task.get('file_path')
                     try:
-                        if fp and os.path.exists(fp):
-                            os.remove(fp)
+                        _release_task_file(task)
                     except Exception as e:
                         logger.warning(f"No se pudo borrar temporal {task_id}: {e}")
-                    download_tasks.pop(task_id, None)
                 self.send_json_response({'success': True})
 
+            # Sondeo de salud (lo usa Railway para saber si la casa responde).
+            elif clean_path == '/api/health':
+                self.send_json_response({'success': True, 'status': 'ok'})
+
+            # Métricas internas (caché de extracción, etc.) para diagnóstico.
+            elif clean_path == '/api/stats':
+                self.send_json_response({
+                    'extract_cache': extract_cache.stats(),
+                    'extract_flight': _extract_flight.stats(),
+                    'forward_flight': _forward_flight.stats(),
+                    'ytdlp_pool': ytdlp_pool.stats(),
+                    'download_scheduler': download_scheduler.stats(),
+                    'download_tasks': download_tasks.stats(),
+                    'download_cache': download_cache.stats(),
+                    'static_assets': static_assets.stats(),
+                    'http_client': http_client.stats(),
+                    'link_resolver': link_resolver.stats(),
+                    'instagram_login_gate': login_gate.stats(),
+                    'cookie_store': cookie_store.stats(),
+                    'threads_browser': browser_pool.stats(),
+                    'threads_replay': graphql_replay.stats(),
+                    'facebook_hedge': facebook_hedge.stats(),
+                    'remote_backend': remote_backend.stats(),
+                    'routing': routing_policy.stats(),
+                    'worker_queue': job_queue.stats(),
+                    'http_server': self.server.stats() if hasattr(self.server, 'stats') else None,
+                })
+
             # Legacy/Direct download (keep for fallback)
             elif clean_path == '/api/download':
                 self.handle_download()
@@ -307,13 +397,17 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
         if not os.path.exists(temp_dir):
             os.makedirs(temp_dir)
             
+        # Cancelada mientras esperaba en la cola
+        if download_tasks.is_cancelled(task_id):
+            return
+
         try:
-            download_tasks[task_id]['status'] = 'downloading'
+            download_tasks.update(task_id, status='downloading')
             
             # Progress Hook for yt-dlp
             def progress_hook(d):
                 # Check for cancellation
-                if download_tasks.get(task_id, {}).get('status') == 'cancelled':
+                if download_tasks.is_cancelled(task_id):
                     raise Exception('DownloadCancelled')
 
                 if d['status'] == 'downloading':
@@ -331,18 +425,16 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                            ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
                            p = ansi_escape.sub('', p_str)
 
-                        download_tasks[task_id]['progress'] = float(p)
+                        download_tasks.update(task_id, progress=float(p))
                     except Exception as e: 
                         pass
                 elif d['status'] == 'finished':
-                     download_tasks[task_id]['status'] = 'download_complete'
-                     download_tasks[task_id]['progress'] = 100
+                     download_tasks.update(task_id, status='download_complete', progress=100)
 
             # Post-processor Hook
             def pp_hook(d):
                 if d['status'] == 'started':
-                    download_tasks[task_id]['status'] = 'processing'
-                    download_tasks[task_id]['progress'] = 0
+                    download_tasks.update(task_id, status='processing', progress=0)
 
             # ------------------------------------------------------------------
             # Gallery Download Logic (JSON List of URLs)
@@ -361,73 +453,39 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                 
             if is_gallery:
                 logger.info(f"📦 Processing Gallery Download: {len(gallery_urls)} items")
+                # Links de compartir en la lista: un solo lote en paralelo (y
+                # los ya conocidos salen del mapa persistente, sin red).
+                gallery_urls = link_resolver.resolve_many(gallery_urls)
                 # Ensure base filename doesn't have extension
                 base_name = os.path.splitext(filename)[0]
                 zip_filename = f"{base_name}.zip"
-                zip_path = os.path.join(temp_dir, zip_filename)
-                
-                downloaded_files = []
-                total_items = len(gallery_urls)
-                
-                try:
-                    for idx, img_url in enumerate(gallery_urls):
-                        if download_tasks.get(task_id, {}).get('status') == 'cancelled':
-                             raise Exception('DownloadCancelled')
-                             
-                        # Determine extension
-                        parsed_url = urlparse(img_url)
-                        ext = os.path.splitext(parsed_url.path)[1]
-                        if not ext: ext = ".jpg"
-                        
-                        # Naming: base-1.jpg, base-2.jpg ...
-                        item_filename = f"{base_name}-{idx+1}{ext}"
-                        item_path = os.path.join(temp_dir, item_filename)
-                        
-                        # Download item
-                        # Use generic headers or platform specific if needed
-                        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
-                        
-                        # Special handling for X/Twitter/LinkedIn if needed
-                        if 'twimg.com' in img_url:
-                             pass 
-                        
-                        r = requests.get(img_url, stream=True, headers=headers, timeout=30)
-                        
-                        if r.status_code == 200:
-                            with open(item_path, 'wb') as f:
-                                for chunk in r.iter_content(chunk_size=8192):
-                                    if chunk: f.write(chunk)
-                            downloaded_files.append((item_path, item_filename))
-                        else:
-                            logger.warning(f"Failed to download gallery item {idx}: {img_url} ({r.status_code})")
-                        
-                        # Update progress
-                        progress = int(((idx + 1) / total_items) * 90) # Leave 10% for zipping
-                        download_tasks[task_id]['progress'] = progress
-                    
-                    # Create Zip
-                    if downloaded_files:
-                        with zipfile.ZipFile(zip_path, 'w') as zipf:
-                            for file_p, file_n in downloaded_files:
-                                zipf.write(file_p, file_n)
-                        
-                        # Cleanup individual files
-                        for file_p, _ in downloaded_files:
-                            try:
-                                os.remove(file_p)
-                            except:
-                                pass
-                                
-                        download_tasks[task_id]['file_path'] = zip_path
-                        download_tasks[task_id]['filename'] = zip_filename
-                        download_tasks[task_id]['status'] = 'completed'
-                        download_tasks[task_id]['progress'] = 100
-                        return
-                    else:
+                if GALLERY_STREAM:
+                    # Acá se baja hasta el primer ítem (con progreso) y la
+                    # tarea queda lista; el resto pasa en memoria al ZIP
+                    # mientras /api/download_file lo envía.
+                    fetch = GalleryFetch(gallery_urls,
+                                         is_cancelled=lambda: download_tasks.is_cancelled(task_id))
+                    if not fetch.start(on_progress=lambda p: download_tasks.update(task_id, progress=p)):
                         raise Exception("No images could be downloaded from gallery")
-                        
+                    if not download_tasks.update(task_id, stream={'fetch': fetch, 'urls': gallery_urls,
+                                                                  'base_name': base_name},
+                                                 filename=zip_filename, status='completed', progress=100):
+                        fetch.close()  # la borraron mientras se bajaba
+                    return
+
+                zip_path = os.path.join(temp_dir, f"gallery_{task_id}.zip")
+
+                try:
+                    fetch_gallery_to_zip(
+                        gallery_urls, zip_path, base_name,
+                        on_progress=lambda p: download_tasks.update(task_id, progress=p),
+                        is_cancelled=lambda: download_tasks.is_cancelled(task_id))
+                    download_tasks.update(task_id, file_path=zip_path, filename=zip_filename,
+                                          status='completed', progress=100)
+                    return
                 except Exception as e:
-                     logger.error(f"Gallery download error: {str(e)}")
+                     if str(e) != 'DownloadCancelled':
+                         logger.error(f"Gallery download error: {str(e)}")
                      raise e
 
             # Validar e iniciar descarga similar a handle_download pero actualizando task
@@ -435,6 +493,24 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
             is_direct_download = any(filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif', '.pdf'])
             
             is_supported_hq = any(d in url for d in ['youtube.com', 'youtu.be', 'tiktok.com', 'vm.tiktok.com', 'twitch.tv', 'pinterest.com', 'pin.it', 'pinimg.com', 'linkedin.com', 'facebook.com', 'fb.watch', 'twitter.com', 'x.com', 'instagram.com', 'cdninstagram.com', 'twimg.com'])
+
+            # Mismo medio + mismo perfil de formato = mismo archivo: si ya se
+            # bajó hace poco, la tarea termina al instante con el cacheado.
+            profile = 'hq-mp4' if is_supported_hq and not is_direct_download else 'direct'
+            cache_key = (link_resolver.resolve_ref(url).key, profile)
+
+            def complete(path):
+                download_cache.put(cache_key, path)
+                if not download_tasks.update(task_id, file_path=path, status='completed', progress=100):
+                    # La tarea se borró mientras tanto: soltar la referencia.
+                    download_cache.release(path)
+
+            cached_path = download_cache.acquire(cache_key)
+            if cached_path:
+                logger.info(f"Descarga servida desde caché: {cache_key[0]} ({profile})")
+                if not download_tasks.update(task_id, file_path=cached_path, status='completed', progress=100):
+                    download_cache.release(cached_path)
+                return
             
             if is_supported_hq and not is_direct_download:
                 unique_id = str(uuid.uuid4())
@@ -475,9 +551,7 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                      if files: final_path = os.path.join(temp_dir, files[0])
                 
                 if os.path.exists(final_path):
-                     download_tasks[task_id]['file_path'] = final_path
-                     download_tasks[task_id]['status'] = 'completed'
-                     download_tasks[task_id]['progress'] = 100
+                     complete(final_path)
                 else:
                      raise Exception("File not found after download")
 
@@ -485,24 +559,25 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                 # Manejo de imágenes, PDFs o fallbacks
                 if is_direct_download:
                     headers = {'User-Agent': 'Mozilla/5.0'}
-                    r = requests.get(url, stream=True, headers=headers, timeout=60)
+                    r = http_client.get(url, stream=True, headers=headers, timeout=60)
                     if r.status_code == 200:
-                        file_path = os.path.join(temp_dir, filename)
+                        # Nombre único: el archivo puede quedar en caché y otro
+                        # pedido con el mismo nombre no debe pisarlo.
+                        ext = os.path.splitext(filename)[1]
+                        file_path = os.path.join(temp_dir, f"direct_{task_id}{ext}")
                         total_length = r.headers.get('content-length')
                         dl = 0
                         with open(file_path, 'wb') as f:
                             for chunk in r.iter_content(chunk_size=8192):
-                                if download_tasks.get(task_id, {}).get('status') == 'cancelled':
+                                if download_tasks.is_cancelled(task_id):
                                     r.close()
                                     raise Exception('DownloadCancelled')
                                 f.write(chunk)
                                 dl += len(chunk)
                                 if total_length:
-                                    download_tasks[task_id]['progress'] = int(dl * 100 / int(total_length))
+                                    download_tasks.update(task_id, progress=int(dl * 100 / int(total_length)))
                         
-                        download_tasks[task_id]['file_path'] = file_path
-                        download_tasks[task_id]['status'] = 'completed'
-                        download_tasks[task_id]['progress'] = 100
+                        complete(file_path)
                     else:
                         raise Exception(f"Error descargando imagen: {r.status_code}")
 
@@ -514,7 +589,7 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                     }
                     
                     logger.info(f"Fallback download via requests: {url}")
-                    r = requests.get(url, stream=True, headers=headers, timeout=60)
+                    r = http_client.get(url, stream=True, headers=headers, timeout=60)
                     
                     if r.status_code != 200:
                         logger.error(f"Failed to download: {r.status_code}")
@@ -528,27 +603,147 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                     dl = 0
                     with open(final_path, 'wb') as f:
                         for chunk in r.iter_content(chunk_size=8192):
-                            if download_tasks.get(task_id, {}).get('status') == 'cancelled':
+                            if download_tasks.is_cancelled(task_id):
                                 r.close()
                                 raise Exception('DownloadCancelled')
                             if chunk:
                                 dl += len(chunk)
                                 f.write(chunk)
                                 if total_length:
-                                    download_tasks[task_id]['progress'] = int(dl * 100 / int(total_length))
+                                    download_tasks.update(task_id, progress=int(dl * 100 / int(total_length)))
                     
-                    download_tasks[task_id]['file_path'] = final_path
-                    download_tasks[task_id]['status'] = 'completed'
+                    complete(final_path)
         
         except Exception as e:
             if str(e) == 'DownloadCancelled':
                 logger.info(f"Tarea {task_id} cancelada.")
             else:
                 logger.error(f"Task error {task_id}: {e}")
-                download_tasks[task_id]['status'] = 'error'
-                download_tasks[task_id]['error'] = str(e)
+                download_tasks.update(task_id, status='error', error=str(e))
+
+    def serve_task_events(self, task_id):
+        """Stream SSE con el estado de la tarea hasta que termine.
+
+        Los cambios se agrupan: como mucho un evento cada SSE_MIN_INTERVAL
+        (yt-dlp llama al progress_hook decenas de veces por segundo).
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.send_header('Access-Control-Allow-Origin', self.headers.get('Origin', '*'))
+        self.end_headers()
+
+        version = 0
+        last_position = None
+        try:
+            while True:
+                task = download_tasks.get(task_id)
+                # En cola la posición cambia sin tocar la tarea: revisar seguido.
+                timeout = 1 if task and task['status'] == 'queued' else SSE_KEEPALIVE
+                task, new_version = download_tasks.wait_for_change(task_id, version, timeout)
+                if task is None:
+                    self.wfile.write(b'event: gone\ndata: {}\n\n')
+                    break
+                position = download_scheduler.position(task_id) if task['status'] == 'queued' else None
+                if new_version != version or position != last_position:
+                    version, last_position = new_version, position
+                    if position is not None:
+                        task['queue_position'] = position
+                    data = json.dumps(task, ensure_ascii=False)
+                    self.wfile.write(f'data: {data}\n\n'.encode('utf-8'))
+                else:
+                    self.wfile.write(b': keepalive\n\n')
+                self.wfile.flush()
+                if task['status'] in FINAL_STATUSES:
+                    break
+                time.sleep(SSE_MIN_INTERVAL)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # el cliente cerró la pestaña o cayó a polling
+
+    def do_HEAD(self):
+        """Solo headers: archivos de tareas (reanudar/consultar tamaño) y estáticos."""
+        try:
+            clean_path = self.path.split('?')[0]
+            params = parse_qs(urlparse(self.path).query)
+
+            if clean_path == '/' or clean_path == '/index.html':
+                self.serve_file('index.html', head_only=True)
+            elif clean_path.endswith(('.js', '.css', '.ico', '.svg')):
+                self.serve_file(clean_path.lstrip('/'), head_only=True)
+            elif clean_path == '/api/download_file':
+                self.serve_task_file(params.get('id', [''])[0], head_only=True)
+            else:
+                self.send_error(405)
+        except Exception as e:
+            logger.error(f"Error en do_HEAD: {str(e)}")
+            self.send_error(500)
+
+    def serve_task_file(self, task_id, head_only=False):
+        task = download_tasks.get(task_id)
+        if task and task['status'] == 'completed':
+            stream = download_tasks.stream(task_id)
+            if stream:
+                self.serve_gallery_stream(stream, task['filename'], head_only)
+                return
+            file_path = task['file_path']
+            filename = task['filename']
+
+            if os.path.exists(file_path):
+                self.serve_downloaded_file(file_path, filename, head_only)
+            else:
+                self.send_error(404, "File not found on server")
+        else:
+            self.send_error(404, "Download not ready")
 
-    def serve_downloaded_file(self, path, filename):
+    def serve_gallery_stream(self, stream, filename, head_only=False):
+        """Envía la galería como ZIP a medida que llegan los ítems: chunked
+        en HTTP/1.1, o delimitado por el cierre de la conexión en HTTP/1.0."""
+        urls = stream['urls']
+        chunked = self.request_version == 'HTTP/1.1' and self.protocol_version == 'HTTP/1.1'
+
+        def send_headers():
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/zip')
+            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+            if chunked:
+                self.send_header('Transfer-Encoding', 'chunked')
+            else:
+                self.close_connection = True
+            self.end_headers()
+
+        if head_only:
+            send_headers()
+            return
+
+        # La tarea está lista recién con el primer ítem bajado: los que
+        # faltan se esperan mientras se envían los anteriores.
+        items = stream['fetch'].items()
+        try:
+            first = next(items, None)
+            if first is None:
+                self.send_error(502, "No images could be downloaded from gallery")
+                return
+
+            send_headers()
+            out = ChunkedWriter(self.wfile) if chunked else self.wfile
+            zip_writer = ZipStreamWriter(out.write)
+            idx, data = first
+            zip_writer.add(item_filename(stream['base_name'], idx, urls[idx]), data)
+            for idx, data in items:
+                zip_writer.add(item_filename(stream['base_name'], idx, urls[idx]), data)
+            zip_writer.close()
+            if chunked:
+                out.close()
+            logger.info(f"📦 Galería enviada en streaming: {filename} ({len(urls)} ítems)")
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info(f"Cliente cortó la galería en streaming: {filename}")
+        except OSError as e:
+            logger.warning(f"Galería en streaming interrumpida: {filename}: {e}")
+        finally:
+            items.close()
+
+    def serve_downloaded_file(self, path, filename, head_only=False):
          try:
             # Snyk Path Validation
             safe_base = os.path.realpath(os.getcwd())
@@ -559,19 +754,13 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                  self.send_error(403)
                  return
             
-            with open(requested_path, 'rb') as f:
-                self.send_response(200)
-                # Adivinar MIME type
-                content_type, _ = mimetypes.guess_type(filename)
-                if not content_type: content_type = 'application/octet-stream'
-                self.send_header('Content-Type', content_type)
-                self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-                self.send_header('Content-Length', str(os.path.getsize(requested_path)))
-                self.end_headers()
-                while True:
-                    chunk = f.read(8192)
-                    if not chunk: break
-                    self.wfile.write(chunk)
+            # Adivinar MIME type
+            content_type, _ = mimetypes.guess_type(filename)
+            if not content_type: content_type = 'application/octet-stream'
+            # Range/If-Range/HEAD: reanudar descargas y adelantar en <video>
+            send_file(self, requested_path, content_type,
+                      {'Content-Disposition': f'attachment; filename="{filename}"'},
+                      head_only=head_only)
          except Exception as e:
             logger.error(f"Error serving file: {e}")
 
@@ -681,21 +870,10 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                             raise Exception("Descarga completada pero no se encontró el archivo final.")
 
 
-                    # Enviar el archivo
-                    with open(final_path, 'rb') as f:
-                        self.send_response(200)
-                        self.send_header('Content-Type', 'video/mp4')
-                        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-                        self.send_header('Content-Length', str(os.path.getsize(final_path)))
-                        self.end_headers()
-                        
-                        # Streaming para evitar cargar archivos gigantes en RAM
-                        while True:
-                            chunk = f.read(8192)
-                            if not chunk: break
-                            self.wfile.write(chunk)
-                        
-                        logger.info(f"📤 Video enviado (HQ): {filename}")
+                    # Enviar el archivo (streaming, con soporte de Range)
+                    send_file(self, final_path, 'video/mp4',
+                              {'Content-Disposition': f'attachment; filename="{filename}"'})
+                    logger.info(f"📤 Video enviado (HQ): {filename}")
                     return
 
                 except Exception as e:
@@ -715,16 +893,23 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                 headers = {
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
                 }
-                r = requests.get(url, stream=True, headers=headers, timeout=30)
+                # Los rangos los resuelve el CDN: se reenvían tal cual y se
+                # devuelve su 206/416 con sus Content-Range/ETag.
+                for name in ('Range', 'If-Range'):
+                    if self.headers.get(name):
+                        headers[name] = self.headers[name]
+                r = http_client.get(url, stream=True, headers=headers, timeout=30)
                 
-                self.send_response(200)
+                status = r.status_code if r.status_code in (206, 416) else 200
+                self.send_response(status)
                 self.send_header('Content-Type', r.headers.get('Content-Type', 'video/mp4'))
                 self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-                if 'Content-Length' in r.headers:
-                    self.send_header('Content-Length', r.headers['Content-Length'])
+                for name in ('Content-Length', 'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified'):
+                    if name in r.headers:
+                        self.send_header(name, r.headers[name])
                 self.end_headers()
                 
-                for chunk in r.iter_content(chunk_size=8192):
+                for chunk in r.iter_content(chunk_size=256 * 1024):
                     if chunk:
                         self.wfile.write(chunk)
 
@@ -747,6 +932,10 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                 self.handle_admin_cookies_save()
             elif path == 'api/admin/set-fallback':
                 self.handle_set_fallback()
+            elif path == 'api/worker/claim':
+                self.handle_worker_claim()
+            elif path == 'api/worker/result':
+                self.handle_worker_result()
             else:
                 logger.warning(f"Endpoint no encontrado: {path}")
                 self.send_error(404)
@@ -757,7 +946,7 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
             self.send_json_response(
                 {'success': False, 'error': 'Error del servidor'}, 500)
 
-    def serve_file(self, filename):
+    def serve_file(self, filename, head_only=False):
         """Sirve archivos estáticos con headers apropiados y protección de Path Traversal"""
         try:
             # Decodificar URL (ej. %20 -> espacio)
@@ -802,29 +991,29 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
                  self.send_error(403)
                  return
 
-            with open(requested_path, 'rb') as f:
-                content = f.read()
-
-            # Determinar content-type
-            if filename.endswith('.html'):
-                content_type = 'text/html; charset=utf-8'
-            elif filename.endswith('.js'):
-                content_type = 'application/javascript; charset=utf-8'
-            elif filename.endswith('.css'):
-                content_type = 'text/css; charset=utf-8'
-            elif filename.endswith('.ico'):
-                content_type = 'image/x-icon'
-            elif filename.endswith('.svg'):
-                content_type = 'image/svg+xml'
-            else:
-                content_type = 'application/octet-stream'
+            # Desde la caché en memoria (se recarga sola si cambia en disco)
+            asset = static_assets.get(requested_path)
+            encoding, body, etag = asset.select(self.headers.get('Accept-Encoding'))
+
+            if etag_matches(self.headers.get('If-None-Match'), etag):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return
 
             self.send_response(200)
-            self.send_header('Content-Type', content_type)
-            self.send_header('Content-Length', str(len(content)))
+            self.send_header('Content-Type', asset.content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if encoding != 'identity':
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('ETag', etag)
             self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
             self.end_headers()
-            self.wfile.write(content)
+            if not head_only:
+                self.wfile.write(body)
 
             logger.debug(f"Archivo servido: {filename}")
 
@@ -890,24 +1079,24 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
 
             logger.info(f"Extrayendo video de: {url}")
 
-            # Determinar plataforma y extraer
-            result = self.extract_video_info(url)
-
-            # Si falló por exigir login (o es Threads, que necesita el navegador
-            # de casa) y hay un backend residencial vigente, reenviamos el pedido
-            # allá. El header X-No-Forward evita que la casa reenvíe de vuelta.
-            if (not result.get('success')
-                    and self.headers.get('X-No-Forward') != '1'
-                    and (result.get('needs_remote')
-                         or self._looks_login_gated(result.get('error', '')))):
-                forwarded = self._forward_to_remote(url)
-                if forwarded is not None:
-                    result = forwarded
-                else:
-                    # Se necesitaba el backend residencial (PC de casa) y no está
-                    # disponible: marcarlo explícito para que el front muestre
-                    # "Servidor OFF" en vez de un error genérico.
-                    result['server_off'] = True
+            # Todas las variantes del mismo video (tracking, m./www., links
+            # cortos de YouTube...) comparten clave y URL canónica. Los links
+            # de compartir (share/v, fb.watch, vm.tiktok, pin.it) se traducen
+            # con el mapa persistente: repetidos no tocan la red.
+            ref = link_resolver.resolve_ref(url)
+            if ref.platform == 'instagram':
+                # La URL canónica pierde el usuario (instagram.com/<user>/reel/...):
+                # anotarlo para que el login_gate reconozca cuentas con login.
+                login_gate.remember_account(url)
+
+            # Un resultado reciente para el mismo video evita repetir yt-dlp /
+            # scraping mientras sus URLs firmadas del CDN sigan vigentes.
+            result = extract_cache.get(ref.key)
+            if result is not None:
+                logger.info(f"⚡ Resultado servido desde caché: {ref.key}")
+            else:
+                result = self._resolve_extraction(ref)
+                extract_cache.put(ref.key, result)
 
             if result['success']:
                 # Log detallado con información de video
@@ -940,6 +1129,81 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
             self.send_json_response(
                 {'success': False, 'error': f'Error del servidor: {str(e)}'}, 500)
 
+    def _resolve_extraction(self, ref):
+        """Extrae localmente y, si hace falta, reenvía al backend residencial."""
+        url = ref.canonical_url
+        can_forward = self.headers.get('X-No-Forward') != '1'
+        forward_tried = False
+
+        def forward():
+            return _forward_flight.do(ref.key, lambda: self._forward_to_remote(url))
+
+        def extract():
+            # Dentro del vuelo: una muestra por extracción real, no por cada
+            # pedido coalescido que recibe el mismo resultado.
+            local_result = self.extract_video_info(url)
+            routing_policy.record(ref, self._needs_remote(local_result))
+            return local_result
+
+        def local():
+            return _extract_flight.do(ref.key, extract)
+
+        # Instagram que ya falló localmente (ni cookies ni embed): ir directo
+        # a la casa en vez de repetir todos los intentos locales.
+        if (ref.platform == 'instagram' and can_forward
+                and login_gate.status(url) == LOCAL_FAILED):
+            forwarded = forward()
+            if forwarded is not None:
+                login_gate.count_forward()
+                return forwarded
+            forward_tried = True
+
+        # Lo que por forma de URL o por estadística va a terminar en la casa
+        # (stories, Threads sin Playwright...) se reenvía sin pasar por los
+        # intentos locales condenados.
+        route = LOCAL
+        if can_forward and not forward_tried and self._remote_available():
+            route = routing_policy.decide(ref)
+        result = None
+        if route == REMOTE:
+            forwarded = forward()
+            if forwarded is not None:
+                return forwarded
+            forward_tried = True
+        elif route == HEDGE:
+            winner, outcome = routing_policy.hedge(forward, local, timeout=REMOTE_TIMEOUT + 10)
+            if winner is not None:
+                return outcome
+            if outcome.get('remote') is not None:
+                return outcome['remote']
+            forward_tried = True
+            result = outcome.get('local')
+
+        # Determinar plataforma y extraer
+        if result is None:
+            result = local()
+
+        # Si falló por exigir login (o es Threads, que necesita el navegador
+        # de casa) y hay un backend residencial vigente, reenviamos el pedido
+        # allá. El header X-No-Forward evita que la casa reenvíe de vuelta.
+        if can_forward and self._needs_remote(result):
+            forwarded = None if forward_tried else forward()
+            if forwarded is not None:
+                result = forwarded
+            else:
+                # Se necesitaba el backend residencial (PC de casa) y no está
+                # disponible: marcarlo explícito para que el front muestre
+                # "Servidor OFF" en vez de un error genérico.
+                result['server_off'] = True
+        return result
+
+    @classmethod
+    def _needs_remote(cls, result):
+        """True si la extracción local falló por algo que la casa sí resuelve."""
+        return (not result.get('success')
+                and bool(result.get('needs_remote')
+                         or cls._looks_login_gated(result.get('error', ''))))
+
     @staticmethod
     def _looks_login_gated(error_msg):
         """True si el error indica que el contenido exige iniciar sesión."""
@@ -950,39 +1214,46 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
             'registered users', 'requiere sesión', 'requiere sesion',
         ))
 
+    @staticmethod
+    def _remote_available():
+        """True si hay un backend residencial (worker pull o túnel) para reenviar."""
+        return job_queue.available() or remote_backend.available()
+
     def _forward_to_remote(self, url):
-        """Reenvía la extracción al backend residencial (PC de casa) si hay una
-        URL vigente registrada. Devuelve el JSON de resultado o None."""
-        fb_url = _remote_fallback.get('url')
-        fresh = (time.time() - _remote_fallback.get('updated_at', 0)) < REMOTE_FALLBACK_TTL
-        if not fb_url or not fresh:
-            return None
-        try:
-            logger.info(f"↪️ Reenviando a backend residencial: {fb_url}")
-            r = requests.post(
-                fb_url.rstrip('/') + '/api/extract',
-                json={'url': url},
-                headers={'X-No-Forward': '1'},
-                timeout=90,
-            )
-            return r.json()
-        except Exception as e:
-            logger.warning(f"⚠️ Falló el reenvío al backend residencial: {e}")
+        """Reenvía la extracción al backend residencial (PC de casa): por la
+        cola si hay un worker en modo pull, si no por la URL de túnel vigente
+        (con el circuito cerrado). Devuelve el JSON de resultado o None (al
+        instante si la casa viene sin responder)."""
+        if job_queue.available():
+            logger.info("↪️ Encolando para el worker residencial (pull)")
+            return job_queue.submit('/api/extract', {'url': url}, timeout=REMOTE_TIMEOUT)
+        if not remote_backend.available():
             return None
+        logger.info(f"↪️ Reenviando a backend residencial: {remote_backend.url}")
+        return remote_backend.forward('/api/extract', {'url': url},
+                                      headers={'X-No-Forward': '1'})
 
-    def handle_set_fallback(self):
-        """La PC de casa registra/renueva su URL de túnel acá (protegido por
-        ADMIN_SECRET). Railway la usa para reenviar el contenido con login."""
+    def _read_admin_json(self):
+        """Cuerpo JSON de un endpoint de la PC de casa, validando ADMIN_SECRET.
+        Si algo falla responde el error y devuelve None."""
         try:
             content_length = int(self.headers['Content-Length'])
             data = json.loads(self.rfile.read(content_length).decode('utf-8'))
         except (json.JSONDecodeError, KeyError, ValueError):
             self.send_json_response({'success': False, 'error': 'JSON inválido'}, 400)
-            return
+            return None
 
-        secret = data.get('secret', '')
-        if not ADMIN_SECRET or not hmac.compare_digest(secret, ADMIN_SECRET):
+        secret = data.get('secret', '') if isinstance(data, dict) else ''
+        if not ADMIN_SECRET or not hmac.compare_digest(str(secret), ADMIN_SECRET):
             self.send_json_response({'success': False, 'error': 'Clave incorrecta'}, 403)
+            return None
+        return data
+
+    def handle_set_fallback(self):
+        """La PC de casa registra/renueva su URL de túnel acá (protegido por
+        ADMIN_SECRET). Railway la usa para reenviar el contenido con login."""
+        data = self._read_admin_json()
+        if data is None:
             return
 
         fb_url = (data.get('url') or '').strip()
@@ -991,11 +1262,45 @@ class VideoDownloaderHandler(BaseHTTPRequestHandler):
             self.send_json_response({'success': False, 'error': 'URL inválida'}, 400)
             return
 
-        _remote_fallback['url'] = fb_url
-        _remote_fallback['updated_at'] = time.time()
+        remote_backend.register(fb_url)
         logger.info(f"🏠 Backend residencial registrado: {fb_url}")
         self.send_json_response({'success': True})
 
+    def handle_worker_claim(self):
+        """Long-poll del worker residencial (home_tunnel.py --pull): devuelve
+        los trabajos pendientes apenas aparece alguno, o una lista vacía al
+        vencer la espera."""
+        data = self._read_admin_json()
+        if data is None:
+            return
+        try:
+            jobs = job_queue.claim(str(data.get('worker') or self.client_address[0]),
+                                   max_jobs=data.get('max', 1),
+                                   wait=data.get('wait', WORKER_POLL_WAIT))
+        except (TypeError, ValueError):
+            self.send_json_response({'success': False, 'error': 'Parámetros inválidos'}, 400)
+            return
+        self.send_json_response({
+            'success': True,
+            'jobs': [{'id': job_id, 'path': path, 'payload': payload}
+                     for job_id, path, payload in jobs],
+        })
+
+    def handle_worker_result(self):
+        """Resultados de trabajos reclamados (uno o varios por pedido)."""
+        data = self._read_admin_json()
+        if data is None:
+            return
+        results = data.get('results')
+        if not isinstance(results, list):
+            self.send_json_response({'success': False, 'error': 'results requerido'}, 400)
+            return
+        accepted = 0
+        for item in results:
+            if isinstance(item, dict) and isinstance(item.get('result'), dict):
+                accepted += job_queue.complete(str(item.get('id')), item['result'])
+        self.send_json_response({'success': True, 'accepted': accepted})
+
     def serve_admin_cookies_page(self):
         """Sirve un formulario simple para actualizar la cookie compartida
         de Instagram sin necesitar acceso a Railway/terminal."""
@@ -1118,38 +1423,14 @@ async function save() {
         """Extrae información del video según la plataforma"""
         try:
             # Detectar plataforma e inicializar extractor
-            if 'threads.com' in url or 'threads.net' in url:
-                extractor = ThreadsExtractor()
-                platform = 'threads'
-            elif 'instagram.com' in url or 'cdninstagram.com' in url:
-                extractor = InstagramExtractor()
-                platform = 'instagram'
-            elif 'twitch.tv' in url or 'twitch.com' in url:
-                extractor = TwitchExtractor()
-                platform = 'twitch'
-            elif 'linkedin.com' in url:
-                extractor = LinkedInExtractor()
-                platform = 'linkedin'
-            elif 'x.com' in url or 'twitter.com' in url:
-                extractor = XExtractor()
-                platform = 'x'
-            elif 'tiktok.com' in url:
-                extractor = TikTokExtractor()
-                platform = 'tiktok'
-            elif 'facebook.com' in url or 'fb.watch' in url:
-                extractor = FacebookExtractor()
-                platform = 'facebook'
-            elif 'youtube.com' in url or 'youtu.be' in url or 'm.youtube.com' in url:
-                extractor = YouTubeExtractor()
-                platform = 'youtube'
-            elif 'pinterest.com' in url or 'pin.it' in url:
-                extractor = PinterestExtractor()
-                platform = 'pinterest'
-            else:
+            platform = detect_platform(url)
+            extractor_cls = EXTRACTORS.get(platform)
+            if extractor_cls is None:
                 return {
                     'success': False,
                     'error': 'Plataforma no soportada. Verifica que el enlace sea correcto.'
                 }
+            extractor = extractor_cls()
 
             # Extraer video usando el método extract_info del extractor
             result = extractor.extract_info(url)
@@ -1215,15 +1496,24 @@ def run_server():
         host = '0.0.0.0'  # Escucha en todas las interfaces
         port = int(os.environ.get('PORT', 8000))  # Puerto dinámico para Railway/Heroku
 
-        server = ThreadedHTTPServer((host, port), VideoDownloaderHandler)
-        server.timeout = 60
+        if SERVER_MODE == 'async':
+            server = AsyncHTTPServer((host, port), VideoDownloaderHandler,
+                                     inline_paths=ASYNC_INLINE_PATHS,
+                                     stream_paths=ASYNC_STREAM_PATHS)
+        else:
+            server = ThreadedHTTPServer((host, port), VideoDownloaderHandler)
+            server.timeout = 60
 
         start_instagram_session_refresh()
+        ytdlp_pool.warm()
+        download_tasks.start_reaper()
+        download_cache.start_sweeper()
+        static_assets.preload(os.getcwd())
 
         logger.info("=" * 60)
         logger.info("Video Downloader Server - High Quality Fix")
         logger.info("=" * 60)
-        logger.info(f"Servidor iniciado en http://{host}:{port}")
+        logger.info(f"Servidor iniciado en http://{host}:{port} (modo {SERVER_MODE})")
         logger.info(f"Acceso local: http://localhost:{port}")
         logger.info(f"Acceso red: http://192.168.1.50:{port}")
         logger.info("Endpoints disponibles:")
@@ -0,0 +1,222 @@
+"""Chromium caliente con páginas pre-autenticadas para el extractor de Threads.
+
+Antes cada link de Threads lanzaba un Chromium nuevo, creaba un contexto y
+volvía a convertir las cookies: 1-3 s de arranque en frío y cientos de MB de
+RSS transitorios por pedido en la PC de casa. Acá:
+
+- Un único navegador vive en un hilo propio con su event loop (Playwright
+  async): los hilos del servidor le mandan trabajos con
+  ``run_coroutine_threadsafe``, igual que el front-end de common/async_http.py.
+- Pool de (contexto, página) creados con el storage state de las cookies de
+  Meta (armado una vez por huella del almacén de cookies). Si las cookies
+  cambian, los contextos viejos se descartan al devolverse.
+- Cada extracción toma prestada una página, la usa y la devuelve reseteada
+  (about:blank); como mucho THREADS_BROWSER_MAX_PAGES a la vez.
+- Cada contexto bloquea a nivel de ruta imágenes, fuentes, media y
+  analytics (THREADS_BLOCK_RESOURCES): el video sale del GraphQL, no hace
+  falta bajar el resto de la página por el enlace de casa.
+- Sin uso durante THREADS_BROWSER_IDLE segundos, se cierra el navegador (la
+  memoria vuelve al sistema); el siguiente pedido lo relanza.
+
+Playwright se importa recién al lanzar el navegador (en Railway no está).
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from common.cookies_util import cookie_store
+
+THREADS_BROWSER_MAX_PAGES = int(os.environ.get('THREADS_BROWSER_MAX_PAGES', '3'))
+THREADS_BROWSER_IDLE = int(os.environ.get('THREADS_BROWSER_IDLE', '300'))
+THREADS_BLOCK_RESOURCES = os.environ.get('THREADS_BLOCK_RESOURCES', '1') != '0'
+
+# Lo que el navegador no necesita bajar para que dispare el GraphQL del post.
+_BLOCKED_TYPES = frozenset({'image', 'font', 'media'})
+_BLOCKED_URL_PARTS = ('/ajax/bz', '/ajax/qm', '/logging_client_events', '/api/v1/logging',
+                      'google-analytics.com', 'googletagmanager.com', 'doubleclick.net',
+                      'connect.facebook.net', 'facebook.com/tr')
+
+UA = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+      '(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36')
+_LAUNCH_ARGS = ['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu',
+                '--disable-blink-features=AutomationControlled']
+_COOKIE_DOMAINS = ('threads', 'instagram', 'facebook')
+
+
+class _Lease:
+    __slots__ = ('context', 'page', 'fingerprint')
+
+    def __init__(self, context, page, fingerprint):
+        self.context = context
+        self.page = page
+        self.fingerprint = fingerprint
+
+
+class BrowserPool:
+    def __init__(self, max_pages=THREADS_BROWSER_MAX_PAGES, idle_timeout=THREADS_BROWSER_IDLE):
+        self.max_pages = max(max_pages, 1)
+        self.idle_timeout = idle_timeout
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # Todo lo que sigue se toca solo desde el hilo del loop.
+        self._playwright = None
+        self._browser = None
+        self._slots = None
+        self._idle = []
+        self._in_use = 0
+        self._last_used = 0.0
+        self._storage = (None, None)  # (huella de cookies, storage_state)
+        self.launches = 0
+        self.leases = 0
+        self.pages_created = 0
+        self.idle_shutdowns = 0
+        self.blocked_requests = 0
+
+    # -- hilo del event loop -------------------------------------------------
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name='threads-browser', daemon=True)
+                self._thread.start()
+                asyncio.run_coroutine_threadsafe(self._reaper(), self._loop)
+            return self._loop
+
+    def run(self, job, timeout=60):
+        """Corre ``await job(page)`` con una página prestada y devuelve su
+        resultado. Lanza TimeoutError si no termina en ``timeout`` segundos."""
+        future = asyncio.run_coroutine_threadsafe(self._run(job), self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    async def _run(self, job):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pages)
+        async with self._slots:
+            self._in_use += 1
+            self.leases += 1
+            try:
+                lease = await self._checkout()
+                ok = False
+                try:
+                    result = await job(lease.page)
+                    ok = True
+                    return result
+                finally:
+                    await self._checkin(lease, ok)
+            finally:
+                self._in_use -= 1
+                self._last_used = time.monotonic()
+
+    async def _start_browser(self):
+        from playwright.async_api import async_playwright
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True, args=_LAUNCH_ARGS)
+        self.launches += 1
+        print("🌐 Chromium de Threads lanzado (pool caliente)")
+
+    def _storage_state(self):
+        """Storage state con las cookies de Meta, rearmado solo si cambió la
+        huella del almacén de cookies."""
+        fingerprint = cookie_store.fingerprint()
+        if self._storage[0] != fingerprint or self._storage[1] is None:
+            cookies = cookie_store.playwright_cookies(_COOKIE_DOMAINS)
+            self._storage = (fingerprint, {'cookies': cookies, 'origins': []})
+        return self._storage
+
+    async def _checkout(self):
+        if self._browser is None or not self._browser.is_connected():
+            await self._shutdown()
+            await self._start_browser()
+        fingerprint, storage = self._storage_state()
+        while self._idle:
+            lease = self._idle.pop()
+            if lease.fingerprint == fingerprint and not lease.page.is_closed():
+                return lease
+            await self._discard(lease)
+        context = await self._browser.new_context(
+            user_agent=UA, locale='en-US', viewport={'width': 1280, 'height': 900},
+            storage_state=storage,
+        )
+        if THREADS_BLOCK_RESOURCES:
+            await context.route('**/*', self._route)
+        page = await context.new_page()
+        self.pages_created += 1
+        return _Lease(context, page, fingerprint)
+
+    async def _route(self, route):
+        request = route.request
+        if (request.resource_type in _BLOCKED_TYPES
+                or any(part in request.url for part in _BLOCKED_URL_PARTS)):
+            self.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _checkin(self, lease, ok):
+        if ok:
+            try:
+                # Resetear: fuera del post (corta videos/requests pendientes).
+                await lease.page.goto('about:blank', timeout=5000)
+                self._idle.append(lease)
+                return
+            except Exception:
+                pass
+        await self._discard(lease)
+
+    @staticmethod
+    async def _discard(lease):
+        try:
+            await lease.context.close()
+        except Exception:
+            pass
+
+    async def _shutdown(self):
+        for lease in self._idle:
+            await self._discard(lease)
+        self._idle.clear()
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        except Exception:
+            pass
+        try:
+            if self._playwright is not None:
+                await self._playwright.stop()
+        except Exception:
+            pass
+        self._browser = None
+        self._playwright = None
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(max(min(self.idle_timeout / 4, 30), 1))
+            if (self._browser is not None and not self._in_use
+                    and time.monotonic() - self._last_used > self.idle_timeout):
+                await self._shutdown()
+                self.idle_shutdowns += 1
+                print("💤 Chromium de Threads cerrado por inactividad")
+
+    def stats(self):
+        return {
+            'running': self._browser is not None,
+            'max_pages': self.max_pages,
+            'in_use': self._in_use,
+            'idle_pages': len(self._idle),
+            'launches': self.launches,
+            'leases': self.leases,
+            'pages_created': self.pages_created,
+            'idle_shutdowns': self.idle_shutdowns,
+            'blocked_requests': self.blocked_requests,
+        }
+
+
+browser_pool = BrowserPool()
@@ -0,0 +1,200 @@
+"""Camino rápido de Threads: repetir el GraphQL del post sin navegador.
+
+El video de un post de Threads sale de UNA llamada GraphQL (POST form con
+``doc_id``, ``variables`` con el id numérico del post y los tokens LSD /
+fb_dtsg de la sesión). Cuando el navegador ya mostró cuál es esa llamada, se
+puede repetir con HTTP plano + la cookie de Meta y saltearse Chromium:
+
+- ``capture``: en una extracción con navegador, la respuesta GraphQL que
+  trajo el mp4 se guarda como plantilla (URL, form, headers útiles) si sus
+  variables contienen el id del post (el shortcode decodificado).
+- ``replay``: para otro post se reemplaza ese id en las variables y se hace
+  el POST por los pools de common/http_client.py con las cookies del almacén.
+- Las plantillas vencen (THREADS_REPLAY_TTL: los tokens y el doc_id rotan) y
+  se descartan tras THREADS_REPLAY_MAX_FAILURES fallos seguidos; entonces el
+  extractor vuelve al navegador, que captura una nueva. Falla la llamada
+  (HTTP no 200, cuerpo vacío o GraphQL sin ``data``), no el post: uno de
+  solo texto o imágenes no trae mp4 y la plantilla sigue sirviendo.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qsl
+
+from common import http_client
+from common.cookies_util import cookie_store
+
+THREADS_REPLAY = os.environ.get('THREADS_REPLAY', '1') != '0'
+THREADS_REPLAY_TTL = int(os.environ.get('THREADS_REPLAY_TTL', '3600'))
+THREADS_REPLAY_MAX_FAILURES = 2
+REPLAY_TIMEOUT = 8
+
+_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+_SHORTCODE_RE = re.compile(r'/post/([A-Za-z0-9_-]+)')
+# Headers de la llamada original que Meta valida (el resto los pone requests).
+_KEEP_HEADERS = ('x-fb-lsd', 'x-ig-app-id', 'x-asbd-id', 'x-fb-friendly-name',
+                 'x-bloks-version-id', 'x-csrftoken', 'content-type', 'user-agent')
+
+
+def shortcode_from_url(url):
+    m = _SHORTCODE_RE.search(url or '')
+    return m.group(1) if m else None
+
+
+def valid_body(body):
+    """True si body es una respuesta GraphQL utilizable (JSON con ``data``).
+    Meta antepone ``for (;;);`` a algunas y puede mandar varias líneas JSON;
+    alcanza con la primera."""
+    if not body:
+        return False
+    text = body.strip()
+    if text.startswith('for (;;);'):
+        text = text[len('for (;;);'):]
+    try:
+        payload = json.loads(text.split('\n', 1)[0])
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and payload.get('data') is not None
+
+
+def shortcode_to_pk(shortcode):
+    """Id numérico del post (mismo esquema base64 que Instagram; los códigos
+    largos de posts privados solo usan los primeros 11 caracteres)."""
+    pk = 0
+    for ch in shortcode[:11]:
+        pk = pk * 64 + _ALPHABET.index(ch)
+    return str(pk)
+
+
+class _Template:
+    __slots__ = ('url', 'form', 'headers', 'id_key', 'captured_at', 'failures')
+
+    def __init__(self, url, form, headers, id_key):
+        self.url = url
+        self.form = form
+        self.headers = headers
+        self.id_key = id_key
+        self.captured_at = time.time()
+        self.failures = 0
+
+
+def _find_key(value, target):
+    """Clave (en las variables) cuyo valor es target, o None."""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if isinstance(v, (str, int)) and str(v) == target:
+                return k
+    return None
+
+
+class GraphQLReplay:
+    def __init__(self, ttl=THREADS_REPLAY_TTL):
+        self.ttl = ttl
+        self._template = None
+        self._lock = threading.Lock()
+        self.captures = 0
+        self.replays = 0
+        self.hits = 0
+        self.failures = 0
+
+    def capture(self, post_url, request_url, method, post_data, headers):
+        """Guarda la llamada que trajo el video del post (desde el navegador).
+        True si quedó como plantilla."""
+        shortcode = shortcode_from_url(post_url)
+        if method != 'POST' or not post_data or not shortcode:
+            return False
+        form = dict(parse_qsl(post_data, keep_blank_values=True))
+        if 'doc_id' not in form or 'variables' not in form:
+            return False
+        try:
+            variables = json.loads(form['variables'])
+            id_key = _find_key(variables, shortcode_to_pk(shortcode))
+        except (ValueError, TypeError):
+            return False
+        if not id_key:
+            return False
+        kept = {k: v for k, v in (headers or {}).items() if k.lower() in _KEEP_HEADERS}
+        with self._lock:
+            self._template = _Template(request_url, form, kept, id_key)
+            self.captures += 1
+        print(f"📼 Plantilla GraphQL de Threads capturada (doc_id={form['doc_id']})")
+        return True
+
+    def _current(self):
+        with self._lock:
+            template = self._template
+            if template is not None and time.time() - template.captured_at > self.ttl:
+                self._template = template = None
+            return template
+
+    def available(self):
+        return THREADS_REPLAY and self._current() is not None
+
+    def replay(self, post_url):
+        """(cuerpo de la respuesta GraphQL para post_url, plantilla usada).
+        El cuerpo es None si la llamada falló; la plantilla es None si no
+        había una vigente. La plantilla se le devuelve a ``record``."""
+        template = self._current()
+        shortcode = shortcode_from_url(post_url)
+        if not THREADS_REPLAY or template is None or not shortcode:
+            return None, None
+        with self._lock:
+            self.replays += 1
+        form = dict(template.form)
+        variables = json.loads(form['variables'])
+        pk = shortcode_to_pk(shortcode)
+        # Mismo tipo que en la llamada original (string o número).
+        variables[template.id_key] = pk if isinstance(variables.get(template.id_key), str) else int(pk)
+        form['variables'] = json.dumps(variables, separators=(',', ':'))
+
+        jar = cookie_store.cookiejar(('threads', 'instagram'))
+        headers = dict(template.headers)
+        csrf = next((c.value for c in jar if c.name == 'csrftoken'), None)
+        if csrf:
+            headers['x-csrftoken'] = csrf
+        headers['Origin'] = 'https://www.threads.com'
+        headers['Referer'] = post_url
+        try:
+            r = http_client.post(template.url, data=form, headers=headers,
+                                 cookies=jar, timeout=REPLAY_TIMEOUT)
+            body = r.text if r.status_code == 200 else None
+        except Exception as e:
+            print(f"⚠️ Replay GraphQL de Threads falló: {e}")
+            body = None
+        return body, template
+
+    def record(self, template, ok):
+        """Resultado del replay hecho con ``template``: ¿devolvió una respuesta
+        GraphQL válida? (que el post tenga video o no es otra cosa). Si otro
+        hilo ya capturó una plantilla nueva, el fallo no se le cuenta a esa."""
+        if template is None:
+            return
+        with self._lock:
+            if ok:
+                self.hits += 1
+                template.failures = 0
+                return
+            self.failures += 1
+            template.failures += 1
+            if (template.failures >= THREADS_REPLAY_MAX_FAILURES
+                    and self._template is template):
+                self._template = None
+
+    def stats(self):
+        with self._lock:
+            template = self._template
+            return {
+                'enabled': THREADS_REPLAY,
+                'template': bool(template),
+                'template_age': int(time.time() - template.captured_at) if template else None,
+                'captures': self.captures,
+                'replays': self.replays,
+                'hits': self.hits,
+                'failures': self.failures,
+            }
+
+
+graphql_replay = GraphQLReplay()
@@ -5,22 +5,29 @@ llamada GraphQL autenticada. Igual que hacen los servicios online, abrimos la
 página en un Chromium real (con la cookie de Meta), y capturamos la URL del
 video interceptando las respuestas de red.
 
+El navegador no se lanza por pedido: threads/browser_pool.py mantiene un
+Chromium caliente con páginas ya autenticadas y cada extracción toma una
+prestada. Y ni siquiera hace falta siempre: la llamada GraphQL que trajo el
+video queda como plantilla (threads/graphql_replay.py) y los posts siguientes
+se resuelven repitiéndola por HTTP; el navegador queda solo como respaldo.
+
 Playwright se importa PEREZOSAMENTE: en Railway (sin Playwright) la extracción
 falla con needs_remote=True y el servidor reenvía el pedido al backend
 residencial (la PC de casa), que sí tiene Playwright + cookie + IP buena.
 """
 
-import os
+import asyncio
 import re
 import json
 from typing import Dict, Any
 
-from common.cookies_util import combined_cookies_file
+from threads.browser_pool import browser_pool
+from threads.graphql_replay import graphql_replay, valid_body
 
 # Claves de Meta que contienen URLs de video progresivo (.mp4).
 _VIDEO_KEYS = ('browser_native_hd_url', 'browser_native_sd_url', 'video_url', 'progressive_url')
-_UA = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
-       '(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36')
+# Tope de una extracción con navegador (incluye el arranque en frío).
+THREADS_EXTRACT_TIMEOUT = 75
 
 
 def _unescape(u: str) -> str:
@@ -30,10 +37,70 @@ def _unescape(u: str) -> str:
         return u.replace('\\/', '/')
 
 
+def _harvest(body: str, candidates: list):
+    """Agrega a candidates las URLs mp4 (prioridad, url) que haya en body."""
+    for key in _VIDEO_KEYS:
+        for m in re.findall(r'"' + key + r'"\s*:\s*"([^"]+\.mp4[^"]*)"', body):
+            pr = 0 if 'hd' in key else 1
+            candidates.append((pr, _unescape(m)))
+    # video_versions: lista con {"url": "...mp4..."}
+    for block in re.findall(r'"video_versions"\s*:\s*\[(.*?)\]', body, re.S):
+        for uu in re.findall(r'"url"\s*:\s*"([^"]+\.mp4[^"]*)"', block):
+            candidates.append((2, _unescape(uu)))
+
+
+def _caption(body: str) -> str:
+    m = re.search(r'"caption"\s*:\s*\{[^{}]*?"text"\s*:\s*"((?:[^"\\]|\\.)*)"', body)
+    return _unescape(m.group(1)).strip()[:80] if m else ''
+
+
+def _success(candidates: list, title: str) -> Dict[str, Any]:
+    # Mejor calidad primero (prioridad más baja = HD), deduplicado.
+    candidates.sort(key=lambda c: c[0])
+    seen, ordered = set(), []
+    for _, u in candidates:
+        base = u.split('?')[0]
+        if base in seen:
+            continue
+        seen.add(base)
+        ordered.append(u)
+
+    return {
+        "success": True,
+        "data": {
+            "title": title or "Threads Video",
+            "uploader": "Threads",
+            "duration": 0,
+            "description": "Video de Threads",
+            "video_formats": [{"url": ordered[0], "width": 720, "height": 1280,
+                               "format_note": "Threads"}],
+        },
+    }
+
+
 class ThreadsExtractor:
+    def _extract_replay(self, url: str):
+        """Camino rápido: repetir la llamada GraphQL aprendida (sin navegador)."""
+        body, template = graphql_replay.replay(url)
+        ok = valid_body(body)
+        graphql_replay.record(template, ok)
+        candidates = []
+        if ok:
+            _harvest(body, candidates)
+        if not candidates:
+            print("⚠️ Replay GraphQL de Threads sin video: uso el navegador")
+            return None
+        print(f"⚡ Threads resuelto por replay GraphQL: {url}")
+        return _success(candidates, _caption(body))
+
     def extract_info(self, url: str) -> Dict[str, Any]:
+        if graphql_replay.available():
+            result = self._extract_replay(url)
+            if result is not None:
+                return result
+
         try:
-            from playwright.sync_api import sync_playwright
+            import playwright.async_api  # noqa: F401
         except Exception:
             # Sin Playwright (ej. Railway): que el servidor reenvíe a la casa.
             # El texto NO debe contener frases de "login" para no disparar el
@@ -47,66 +114,77 @@ class ThreadsExtractor:
         print(f"🔍 Extrayendo Threads con navegador: {url}")
         candidates = []  # (prioridad, url)
 
-        def harvest(body: str):
-            for key in _VIDEO_KEYS:
-                for m in re.findall(r'"' + key + r'"\s*:\s*"([^"]+\.mp4[^"]*)"', body):
-                    pr = 0 if 'hd' in key else 1
-                    candidates.append((pr, _unescape(m)))
-            # video_versions: lista con {"url": "...mp4..."}
-            for block in re.findall(r'"video_versions"\s*:\s*\[(.*?)\]', body, re.S):
-                for uu in re.findall(r'"url"\s*:\s*"([^"]+\.mp4[^"]*)"', block):
-                    candidates.append((2, _unescape(uu)))
-
-        def on_response(resp):
-            try:
-                ct = resp.headers.get('content-type', '')
-                if 'json' in ct or 'javascript' in ct:
-                    if 'graphql' in resp.url or '/api/' in resp.url or 'threads' in resp.url:
-                        harvest(resp.text())
-            except Exception:
-                pass
+        async def job(page):
+            # Se dispara con el primer candidato mp4: las esperas de abajo
+            # son solo plazos máximos, no demoras fijas.
+            found = asyncio.Event()
 
-        try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu',
-                          '--disable-blink-features=AutomationControlled'],
-                )
-                context = browser.new_context(user_agent=_UA, locale='en-US',
-                                              viewport={'width': 1280, 'height': 900})
-                cookies = self._playwright_cookies()
-                if cookies:
-                    context.add_cookies(cookies)
-                page = context.new_page()
-                page.on('response', on_response)
+            async def on_response(resp):
+                try:
+                    ct = resp.headers.get('content-type', '')
+                    if 'json' in ct or 'javascript' in ct:
+                        if 'graphql' in resp.url or '/api/' in resp.url or 'threads' in resp.url:
+                            before = len(candidates)
+                            _harvest(await resp.text(), candidates)
+                            if len(candidates) > before:
+                                found.set()
+                                # La llamada que trajo el video: plantilla
+                                # para repetirla sin navegador.
+                                if 'graphql' in resp.url:
+                                    req = resp.request
+                                    graphql_replay.capture(url, resp.url, req.method,
+                                                           req.post_data, req.headers)
+                except Exception:
+                    pass
+
+            def nav_done(task):
+                # Con el video ya encontrado, la navegación se corta al
+                # resetear la página: ese error no interesa.
+                if not task.cancelled() and task.exception() is not None and not found.is_set():
+                    print(f"⚠️ goto Threads: {task.exception()}")
+
+            async def wait_found(seconds):
                 try:
-                    page.goto(url, timeout=45000, wait_until='domcontentloaded')
-                except Exception as e:
-                    print(f"⚠️ goto Threads: {e}")
+                    await asyncio.wait_for(found.wait(), seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+            page.on('response', on_response)
+            try:
+                # El GraphQL del post suele llegar antes que domcontentloaded:
+                # la navegación corre en paralelo con la espera del candidato.
+                nav = asyncio.ensure_future(page.goto(url, timeout=45000, wait_until='domcontentloaded'))
+                nav.add_done_callback(nav_done)
+                waiter = asyncio.ensure_future(found.wait())
+                await asyncio.wait({nav, waiter}, timeout=45, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
                 # Dar tiempo a que dispare el GraphQL del post y, si hace falta,
                 # forzar reproducción para que pida el media.
-                page.wait_for_timeout(3000)
+                await wait_found(3)
                 if not candidates:
                     try:
-                        page.mouse.click(640, 450)
+                        await page.mouse.click(640, 450)
                     except Exception:
                         pass
-                    page.wait_for_timeout(4000)
+                    await wait_found(4)
                 # Fallback: leer el src del <video> por si quedó progresivo.
                 if not candidates:
                     try:
-                        src = page.eval_on_selector('video', 'v => v.currentSrc || v.src')
+                        src = await page.eval_on_selector('video', 'v => v.currentSrc || v.src')
                         if src and '.mp4' in src:
                             candidates.append((3, src))
                     except Exception:
                         pass
-                title = ''
                 try:
-                    title = (page.title() or '').split(' on Threads')[0][:80]
+                    return ((await page.title()) or '').split(' on Threads')[0][:80]
                 except Exception:
-                    pass
-                browser.close()
+                    return ''
+            finally:
+                # La página vuelve al pool: sin el listener de este pedido.
+                page.remove_listener('response', on_response)
+
+        try:
+            title = browser_pool.run(job, timeout=THREADS_EXTRACT_TIMEOUT)
         except Exception as e:
             print(f"❌ Error Threads extractor: {e}")
             return {"success": False, "error": f"Error al extraer de Threads: {str(e)[:120]}"}
@@ -118,50 +196,4 @@ class ThreadsExtractor:
                 "suggestion": "Verificá que el post tenga video y que la cookie de Meta esté cargada.",
             }
 
-        # Mejor calidad primero (prioridad más baja = HD), deduplicado.
-        candidates.sort(key=lambda c: c[0])
-        seen, ordered = set(), []
-        for _, u in candidates:
-            base = u.split('?')[0]
-            if base in seen:
-                continue
-            seen.add(base)
-            ordered.append(u)
-
-        return {
-            "success": True,
-            "data": {
-                "title": title or "Threads Video",
-                "uploader": "Threads",
-                "duration": 0,
-                "description": "Video de Threads",
-                "video_formats": [{"url": ordered[0], "width": 720, "height": 1280,
-                                   "format_note": "Threads"}],
-            },
-        }
-
-    @staticmethod
-    def _playwright_cookies():
-        """Convierte el archivo Netscape combinado a cookies de Playwright para
-        los dominios de Meta (threads, instagram, facebook)."""
-        path = combined_cookies_file()
-        if not path or not os.path.isfile(path):
-            return []
-        out = []
-        for line in open(path, encoding='utf-8', errors='ignore'):
-            if line.startswith('#') or not line.strip():
-                continue
-            parts = line.rstrip('\r\n').split('\t')
-            if len(parts) < 7:
-                continue
-            domain, _flag, cpath, secure, expiry, name, value = parts[:7]
-            if not any(d in domain for d in ('threads', 'instagram', 'facebook')):
-                continue
-            cookie = {
-                'name': name, 'value': value, 'domain': domain, 'path': cpath or '/',
-                'secure': secure.upper() == 'TRUE', 'httpOnly': False,
-            }
-            if expiry.isdigit() and int(expiry) > 0:
-                cookie['expires'] = int(expiry)
-            out.append(cookie)
-        return out
+        return _success(candidates, title)
@@ -8,6 +8,8 @@ import time
 from typing import Dict, Any
 from urllib.parse import urlparse
 
+from common.ytdlp_pool import ytdlp_pool
+
 
 class TikTokExtractor:
     def extract_info(self, url: str) -> Dict[str, Any]:
@@ -16,7 +18,6 @@ class TikTokExtractor:
         """
         try:
             print(f"🔍 Extrayendo video de TikTok con yt-dlp: {url}")
-            import yt_dlp
 
             # Configurar yt-dlp
             ydl_opts = {
@@ -26,43 +27,42 @@ class TikTokExtractor:
                 'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
             }
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-
-                video_url = None
-                if 'url' in info:
-                    video_url = info['url']
-                elif 'video_url' in info:
-                    video_url = info['video_url']
-
-                if video_url:
-                    print(f"✅ Video TikTok extraído: {video_url[:50]}...")
-                    # Get best thumbnail from list if implied 'thumbnail' is missing
-                    thumbnail = info.get('thumbnail')
-                    if not thumbnail and 'thumbnails' in info:
-                         # Get last one (usually best quality)
-                         try: thumbnail = info['thumbnails'][-1]['url']
-                         except: pass
-
-                    return {
-                        "success": True,
-                        "data": {
-                            "videoUrl": video_url,
-                            "title": info.get('title', 'Video de TikTok'),
-                            "uploader": info.get('uploader', 'TikTok User'),
-                            "duration": info.get('duration'),
-                            "thumbnail": thumbnail,
-                            "description": info.get('description', ''),
-                            "view_count": info.get('view_count', 0),
-                            "like_count": info.get('like_count', 0),
-                            "original_url": url
-                        }
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "No se encontraron enlaces de video en yt-dlp"
+            info = ytdlp_pool.extract_info(url, ydl_opts)
+
+            video_url = None
+            if 'url' in info:
+                video_url = info['url']
+            elif 'video_url' in info:
+                video_url = info['video_url']
+
+            if video_url:
+                print(f"✅ Video TikTok extraído: {video_url[:50]}...")
+                # Get best thumbnail from list if implied 'thumbnail' is missing
+                thumbnail = info.get('thumbnail')
+                if not thumbnail and 'thumbnails' in info:
+                     # Get last one (usually best quality)
+                     try: thumbnail = info['thumbnails'][-1]['url']
+                     except: pass
+
+                return {
+                    "success": True,
+                    "data": {
+                        "videoUrl": video_url,
+                        "title": info.get('title', 'Video de TikTok'),
+                        "uploader": info.get('uploader', 'TikTok User'),
+                        "duration": info.get('duration'),
+                        "thumbnail": thumbnail,
+                        "description": info.get('description', ''),
+                        "view_count": info.get('view_count', 0),
+                        "like_count": info.get('like_count', 0),
+                        "original_url": url
                     }
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": "No se encontraron enlaces de video en yt-dlp"
+                }
 
         except Exception as e:
             print(f"❌ Error TikTok extractor (yt-dlp): {str(e)}")
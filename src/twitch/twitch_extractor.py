@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import yt_dlp
 from typing import Dict, Any
 
+from common.ytdlp_pool import ytdlp_pool
+
 class TwitchExtractor:
     def extract_info(self, url: str) -> Dict[str, Any]:
         """
@@ -20,34 +21,33 @@ class TwitchExtractor:
                 # Twitch specific optimization if needed
             }
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
+            info = ytdlp_pool.extract_info(url, ydl_opts)
 
-                # Twitch VODs usually have 'url' pointing to the m3u8 playlist or similar
-                video_url = info.get('url') or info.get('webpage_url')
+            # Twitch VODs usually have 'url' pointing to the m3u8 playlist or similar
+            video_url = info.get('url') or info.get('webpage_url')
+            
+            if video_url:
+                print(f"✅ Video Twitch extraído: {info.get('title', 'Sin título')}")
                 
-                if video_url:
-                    print(f"✅ Video Twitch extraído: {info.get('title', 'Sin título')}")
-                    
-                    return {
-                        "success": True,
-                        "data": {
-                            "videoUrl": video_url,
-                            "original_url": info.get('webpage_url', url), # Crucial for server.py to use yt-dlp for download
-                            "title": info.get('title', 'Video de Twitch'),
-                            "uploader": info.get('uploader', 'Twitch Streamer'),
-                            "duration": info.get('duration'),
-                            "thumbnail": info.get('thumbnail'),
-                            "description": info.get('description', ''),
-                            "view_count": info.get('view_count', 0),
-                            "platform": "twitch"
-                        }
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "No se encontraron enlaces de video en Twitch"
+                return {
+                    "success": True,
+                    "data": {
+                        "videoUrl": video_url,
+                        "original_url": info.get('webpage_url', url), # Crucial for server.py to use yt-dlp for download
+                        "title": info.get('title', 'Video de Twitch'),
+                        "uploader": info.get('uploader', 'Twitch Streamer'),
+                        "duration": info.get('duration'),
+                        "thumbnail": info.get('thumbnail'),
+                        "description": info.get('description', ''),
+                        "view_count": info.get('view_count', 0),
+                        "platform": "twitch"
                     }
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": "No se encontraron enlaces de video en Twitch"
+                }
 
         except Exception as e:
             print(f"❌ Error Twitch extractor: {str(e)}")
@@ -1,12 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import subprocess
-import json
 import sys
 import os
 
-from common.ytdlp_cmd import YTDLP_CMD
+from common.ytdlp_pool import ytdlp_pool
 
 
 class YouTubeExtractor:
@@ -29,12 +27,10 @@ class YouTubeExtractor:
 
     def _extract_with_ytdlp(self, url):
         """
-        Extrae video usando yt-dlp como librería (NO subprocess) para mayor precisión
-        y detección de formatos DASH.
+        Extrae video usando yt-dlp como librería (worker caliente del pool, sin
+        lanzar un proceso por pedido) para mayor precisión y detección de
+        formatos DASH.
         """
-        from yt_dlp import YoutubeDL
-        import logging
-
         # Configuración para obtener TODOS los formatos, incluyendo DASH
         ydl_opts = {
             'quiet': True,
@@ -46,8 +42,7 @@ class YouTubeExtractor:
 
         try:
             print(f"🔍 Analizando video con YT-DLP (Full Scan) de: {url}")
-            with YoutubeDL(ydl_opts) as ydl:
-                video_info = ydl.extract_info(url, download=False)
+            video_info = ytdlp_pool.extract_info(url, ydl_opts, timeout=60)
 
             if not video_info:
                 return self._extract_basic_format(url)
@@ -159,21 +154,12 @@ class YouTubeExtractor:
         try:
             print("🔄 Usando extracción básica como fallback...")
 
-            cmd = YTDLP_CMD + [
-                '--dump-json',
-                '--no-warnings',
-                '--no-playlist',
-                '--format', 'best[ext=mp4]/best',
-                url
-            ]
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=45,
-                encoding='utf-8'
-            )
+            ydl_opts = {
+                'noplaylist': True,
+                'format': 'best[ext=mp4]/best',
+            }
+
+            result = ytdlp_pool.run(url, ydl_opts, timeout=45)
 
             print(f"📊 Basic extraction return code: {result.returncode}")
 
@@ -186,10 +172,9 @@ class YouTubeExtractor:
                     "suggestion": "El video podría no estar disponible o tener restricciones"
                 }
 
-            try:
-                video_info = json.loads(result.stdout)
-            except json.JSONDecodeError as e:
-                print(f"❌ Error JSON en básico: {e}")
+            video_info = result.info
+            if not video_info:
+                print("❌ yt-dlp no devolvió información en básico")
                 return {
                     "success": False,
                     "error": "Error al procesar respuesta del video",
@@ -0,0 +1,76 @@
+"""login_gate: la marca por cuenta tiene que valer para otros reels de la
+misma cuenta aunque el extractor solo reciba la URL canónica (sin usuario).
+
+Uso:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from common.url_normalizer import normalize  # noqa: E402
+from common.ytdlp_pool import YtdlpResult  # noqa: E402
+from instagram import insta_extractor  # noqa: E402
+from instagram.login_gate import LOGIN_REQUIRED, LoginGate  # noqa: E402
+
+FIRST = 'https://www.instagram.com/natgeo/reel/AAA111/'
+SECOND = 'https://www.instagram.com/natgeo/reel/BBB222/?igsh=xyz'
+
+
+def canonical(url):
+    return normalize(url).canonical_url
+
+
+class LoginGateAccountTest(unittest.TestCase):
+    def test_account_mark_reaches_canonical_url(self):
+        gate = LoginGate()
+        gate.record_login_required(canonical(FIRST), account='natgeo')
+        # Sin la URL original no hay forma de saber la cuenta.
+        self.assertIsNone(gate.status(canonical(SECOND)))
+        gate.remember_account(SECOND)
+        self.assertEqual(gate.status(canonical(SECOND)), LOGIN_REQUIRED)
+
+    def test_account_from_original_url(self):
+        gate = LoginGate()
+        gate.record_login_required(FIRST)
+        gate.remember_account(SECOND)
+        self.assertEqual(gate.status(canonical(SECOND)), LOGIN_REQUIRED)
+
+
+class SkipAnonymousTest(unittest.TestCase):
+    def test_second_reel_of_gated_account_skips_anonymous(self):
+        gate = LoginGate()
+        calls = []
+
+        def fake_run(url, opts=None, timeout=60, cancelled=None):
+            calls.append((url, dict(opts or {})))
+            if 'cookiefile' not in (opts or {}):
+                return YtdlpResult(1, stderr='ERROR: empty media response')
+            return YtdlpResult(0, info={'channel': 'natgeo', 'title': 'reel', 'formats': []})
+
+        with mock.patch.object(insta_extractor, 'login_gate', gate), \
+                mock.patch.object(insta_extractor.ytdlp_pool, 'run', side_effect=fake_run), \
+                mock.patch.object(insta_extractor, 'combined_cookies_file',
+                                  return_value='/tmp/cookies.txt'):
+            extractor = insta_extractor.InstagramExtractor()
+            # Primer reel (URL canónica, sin usuario): anónimo falla, cookies
+            # funcionan y yt-dlp devuelve la cuenta.
+            extractor.extract_info(canonical(FIRST))
+            self.assertEqual(['cookiefile' in opts for _, opts in calls], [False, True])
+
+            # Segundo reel: el servidor anota la cuenta de la URL original y
+            # el extractor va directo a cookies.
+            calls.clear()
+            gate.remember_account(SECOND)
+            extractor.extract_info(canonical(SECOND))
+            self.assertTrue(calls)
+            self.assertTrue(all('cookiefile' in opts for _, opts in calls))
+            self.assertEqual(gate.stats()['skipped_anonymous'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()